@@ -0,0 +1,105 @@
+"""
+Холодный старт и накладные расходы на запрос в профилях
+development и production (YATUBE_PROFILE).
+
+    python benchmarks/bench_profiles.py [--requests 2000] [--starts 5]
+
+Каждый замер идёт в отдельном процессе на временной базе SQLite.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'yatube_api'
+PROFILES = ('development', 'production')
+
+COLD_START = '''
+import time
+started = time.perf_counter()
+from yatube_api.wsgi import application
+print(time.perf_counter() - started)
+'''
+
+PER_REQUEST = '''
+import json, statistics, sys, time
+from yatube_api.wsgi import application
+from django.contrib.auth import get_user_model
+from django.test import Client
+from rest_framework.authtoken.models import Token
+from posts.models import Group, Post
+
+user, _ = get_user_model().objects.get_or_create(username='bench')
+token, _ = Token.objects.get_or_create(user=user)
+group, _ = Group.objects.get_or_create(slug='bench', title='Bench')
+post = Post.objects.create(text='bench', author=user, group=group)
+client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+results = {}
+for name, url in (('group_list', '/api/v1/groups/'),
+                  ('post_detail', f'/api/v1/posts/{post.id}/')):
+    for _ in range(50):
+        client.get(url)
+    timings = []
+    for _ in range(int(sys.argv[1])):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    timings.sort()
+    results[name] = {
+        'median_us': statistics.median(timings) * 1e6,
+        'p99_us': timings[int(len(timings) * 0.99)] * 1e6,
+    }
+print(json.dumps(results))
+'''
+
+
+def run(code, env, *args):
+    output = subprocess.run(
+        [sys.executable, '-c', code, *args],
+        cwd=PROJECT_DIR, env=env, check=True,
+        capture_output=True, text=True,
+    ).stdout
+    return output.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--starts', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'yatube_api.settings',
+            'YATUBE_DB_PATH': str(Path(tmp) / 'bench.sqlite3'),
+            'YATUBE_SECRET_KEY': 'bench-' + 'x' * 50,
+            'YATUBE_ALLOWED_HOSTS': 'testserver',
+        }
+        subprocess.run(
+            [sys.executable, 'manage.py', 'migrate', '-v0'],
+            cwd=PROJECT_DIR, env=base_env, check=True,
+        )
+        print(f'{"profile":<12} {"cold start":>11}  '
+              f'{"groups med/p99, us":>19}  {"post med/p99, us":>17}')
+        for profile in PROFILES:
+            env = {**base_env, 'YATUBE_PROFILE': profile}
+            starts = [
+                float(run(COLD_START, env)) for _ in range(args.starts)
+            ]
+            requests = json.loads(run(PER_REQUEST, env, str(args.requests)))
+            groups, post = requests['group_list'], requests['post_detail']
+            print(
+                f'{profile:<12} {statistics.median(starts) * 1000:>8.0f} ms  '
+                f'{groups["median_us"]:>9.0f}/{groups["p99_us"]:<9.0f}  '
+                f'{post["median_us"]:>8.0f}/{post["p99_us"]:<8.0f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Goodput и p99 под перегрузкой с LoadSheddingMiddleware и без неё.
+
+    python benchmarks/bench_shedding.py [--workers 2] [--overload 3]
+
+Сервер - manage.py serve на временной базе. Сначала замкнутым циклом
+измеряется пропускная способность, затем запросы подаются по
+расписанию с частотой в --overload раз выше. Каждый запрос несёт
+X-Request-Start со временем по расписанию, как его проставил бы
+прокси, а задержка считается от того же времени. Goodput - успешные
+ответы быстрее --deadline секунд.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'yatube_api'
+PATHS = ('/api/v1/posts/?limit=20', '/api/v1/groups/?limit=20')
+SETUP = '''
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+user = get_user_model().objects.create_user('bench')
+print(Token.objects.create(user=user).key)
+'''
+NO_SHEDDING = 'from yatube_api.settings import *\nLOAD_SHEDDING = {}\n'
+
+
+def fetch(url, token, started, timeout):
+    request = urllib.request.Request(url, headers={
+        'Authorization': f'Token {token}',
+        'X-Request-Start': f't={started:.6f}',
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    except OSError:
+        status = None
+    return status, time.time() - started
+
+
+def measure_capacity(base_url, token, seconds=5, concurrency=8):
+    done = []
+    stop = time.time() + seconds
+
+    def loop(index):
+        while time.time() < stop:
+            path = PATHS[len(done) % len(PATHS)]
+            status, _ = fetch(base_url + path, token, time.time(), 10)
+            if status == 200:
+                done.append(1)
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(loop, range(concurrency)))
+    return len(done) / seconds
+
+
+def overload(base_url, token, rate, seconds, deadline):
+    results = []
+    lock = threading.Lock()
+
+    def task(started, path):
+        # Запрос ждёт своего времени по расписанию, а не свободного потока.
+        delay = started - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        result = fetch(base_url + path, token, started, deadline * 2)
+        with lock:
+            results.append(result)
+
+    begin = time.time() + 0.5
+    total = int(rate * seconds)
+    with ThreadPoolExecutor(512) as executor:
+        for number in range(total):
+            executor.submit(
+                task, begin + number / rate, PATHS[number % len(PATHS)]
+            )
+    good = sorted(
+        latency for status, latency in results
+        if status == 200 and latency <= deadline
+    )
+    ok = sorted(latency for status, latency in results if status == 200)
+    return {
+        'goodput': len(good) / seconds,
+        'p99': ok[int(len(ok) * 0.99)] if ok else float('nan'),
+        'median': statistics.median(ok) if ok else float('nan'),
+        'shed': sum(status == 503 for status, _ in results),
+        'failed': sum(status is None for status, _ in results),
+        'total': total,
+    }
+
+
+def start_server(env, workers):
+    process = subprocess.Popen(
+        [sys.executable, 'manage.py', 'serve', '127.0.0.1:0',
+         '--workers', str(workers), '--max-requests', '0'],
+        cwd=PROJECT_DIR, env=env, text=True,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    address = process.stdout.readline().split()[1].rstrip(',')
+    return process, f'http://{address}'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--overload', type=float, default=3.0)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--deadline', type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, 'bench_no_shedding.py').write_text(NO_SHEDDING)
+        env = {
+            **os.environ,
+            'PYTHONUNBUFFERED': '1',
+            'PYTHONPATH': os.pathsep.join([tmp, str(PROJECT_DIR)]),
+            'YATUBE_DB_PATH': str(Path(tmp) / 'bench.sqlite3'),
+            'YATUBE_THROTTLE_PATH': str(Path(tmp) / 'throttle.sqlite3'),
+        }
+        for command in (['migrate', '-v0'],
+                        ['seed', '--users', '20', '--posts', '2000',
+                         '--comments', '5000']):
+            subprocess.run(
+                [sys.executable, 'manage.py', *command],
+                cwd=PROJECT_DIR, env=env, check=True,
+                stdout=subprocess.DEVNULL,
+            )
+        token = subprocess.run(
+            [sys.executable, 'manage.py', 'shell', '-c', SETUP],
+            cwd=PROJECT_DIR, env=env, check=True,
+            capture_output=True, text=True,
+        ).stdout.split()[-1]
+
+        capacity = None
+        print(f'{"shedding":<9} {"offered":>8} {"goodput":>8} '
+              f'{"median":>8} {"p99":>8} {"shed":>6} {"failed":>6}')
+        for name, settings in (('off', 'bench_no_shedding'),
+                               ('on', 'yatube_api.settings')):
+            process, base_url = start_server(
+                {**env, 'DJANGO_SETTINGS_MODULE': settings}, args.workers
+            )
+            try:
+                if capacity is None:
+                    capacity = measure_capacity(base_url, token)
+                    print(f'capacity: {capacity:.0f} req/s')
+                    # Дать серверу разобрать хвост очереди.
+                    time.sleep(1)
+                rate = capacity * args.overload
+                result = overload(
+                    base_url, token, rate, args.duration, args.deadline
+                )
+            finally:
+                process.terminate()
+                process.wait()
+            print(
+                f'{name:<9} {rate:>6.0f}/s {result["goodput"]:>6.0f}/s '
+                f'{result["median"] * 1000:>6.0f}ms '
+                f'{result["p99"] * 1000:>6.0f}ms '
+                f'{result["shed"]:>6} {result["failed"]:>6}'
+            )
+
+
+if __name__ == '__main__':
+    main()
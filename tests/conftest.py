@@ -1,6 +1,8 @@
 import sys
 import os
 
+import pytest
+
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(root_dir)
@@ -33,3 +35,30 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def throttle_store(settings, tmp_path):
+    """Свои вёдра троттлинга на каждый тест."""
+    settings.THROTTLE_STORE_PATH = str(tmp_path / 'throttle.sqlite3')
+
+
+@pytest.fixture(autouse=True)
+def slow_query_log(settings, tmp_path):
+    """Свой журнал медленных запросов на каждый тест."""
+    from yatube_api.slow_queries import slow_query_log
+
+    settings.SLOW_QUERY_LOG_PATH = str(tmp_path / 'slow_queries.sqlite3')
+    slow_query_log.checked.clear()
+    return slow_query_log
+
+
+@pytest.fixture(autouse=True)
+def cache_store(settings, tmp_path):
+    """Свой файл общего кэша на каждый тест."""
+    settings.CACHES = {
+        'default': {
+            **settings.CACHES['default'],
+            'LOCATION': str(tmp_path / 'cache.sqlite3'),
+        },
+    }
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone as django_timezone
+
+from posts.activity import (change_activity, change_activity_bulk,
+                             rebuild_activity)
+from posts.deletion import hide
+from posts.models import ActivityBucket, Comment, Post
+
+
+def hour_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def buckets():
+    return set(ActivityBucket.objects.exclude(
+        posts=0, comments=0
+    ).values_list('size', 'scope', 'start', 'posts', 'comments'))
+
+
+@pytest.mark.django_db
+class TestActivity:
+    url = '/api/v1/stats/activity/'
+
+    def test_hourly_series(self, user_client, post, post_2, group_1,
+                           comment_1_post):
+        response = user_client.get(self.url)
+        assert response.status_code == 200, (
+            'Проверьте, что `/api/v1/stats/activity/` доступен.'
+        )
+        data = response.json()
+        assert data['bucket'] == 'hour' and data['step'] == 3600
+        assert len(data['posts']) == len(data['comments']) == 25, (
+            'Проверьте, что по умолчанию отдаются сутки по часам.'
+        )
+        assert sum(data['posts']) == 2 and sum(data['comments']) == 1, (
+            'Проверьте, что новые посты и комментарии попадают в ряды.'
+        )
+        data = user_client.get(
+            self.url, {'group': group_1.slug, 'bucket': 'day'}
+        ).json()
+        assert sum(data['posts']) == 1 and sum(data['comments']) == 0, (
+            'Проверьте, что ?group= отдаёт активность только этой группы.'
+        )
+
+    def test_range_and_author(self, user_client, user, another_user, post,
+                              another_post):
+        now = hour_start(django_timezone.now())
+        response = user_client.get(self.url, {
+            'author': another_user.username,
+            'from': (now - timedelta(hours=2)).isoformat(),
+            'to': now.replace(tzinfo=None).isoformat(),
+        })
+        data = response.json()
+        assert datetime.fromisoformat(data['from']) == (
+            now - timedelta(hours=2)
+        )
+        assert data['posts'] == [0, 0, 1], (
+            'Проверьте, что диапазон from-to включает оба интервала, '
+            'а ?author= отдаёт только посты автора.'
+        )
+
+    def test_read_is_bounded_by_buckets(self, user_client, user):
+        for _ in range(20):
+            Post.objects.create(text='Пост', author=user)
+        with CaptureQueriesContext(connection) as queries:
+            user_client.get(self.url, {'bucket': 'day'})
+        assert not [
+            query for query in queries.captured_queries
+            if 'posts_post' in query['sql']
+            or 'posts_comment' in query['sql']
+        ], 'Проверьте, что эндпоинт не читает таблицы постов и комментариев.'
+
+    def test_delete_and_hide(self, user_client, post, another_post,
+                             comment_1_post):
+        comment_1_post.delete()
+        post.delete()
+        hide(another_post)
+        data = user_client.get(self.url).json()
+        assert sum(data['posts']) == 0 and sum(data['comments']) == 0, (
+            'Проверьте, что удаление и скрытие вычитаются из рядов.'
+        )
+
+    def test_rebuild_matches_incremental(self, user, post, post_2,
+                                         comment_1_post, comment_2_post):
+        moment = datetime(2024, 3, 1, 10, 30, tzinfo=timezone.utc)
+        Post.objects.filter(pk=post.pk).update(pub_date=moment)
+        Comment.objects.filter(pk=comment_1_post.pk).update(created=moment)
+        call_command('rebuild_activity', stdout=StringIO())
+        rebuilt = buckets()
+        start = int(hour_start(moment).timestamp())
+        assert ('hour', f'author={user.pk}', start, 1, 1) in rebuilt, (
+            'Проверьте, что rebuild_activity пересчитывает ряды по датам.'
+        )
+        # Ряды, набранные сигналами, совпадают с пересчитанными.
+        ActivityBucket.objects.all().delete()
+        for instance in (post, post_2, comment_1_post, comment_2_post):
+            instance.refresh_from_db()
+        for instance in (post, post_2, comment_1_post, comment_2_post):
+            change_activity(instance, 1)
+        assert buckets() == rebuilt
+        assert rebuild_activity() == len(rebuilt)
+
+    def test_bulk_many_buckets(self, user):
+        moment = datetime(2024, 3, 1, tzinfo=timezone.utc)
+        posts = [
+            Post(author=user, text='Пост', pub_date=moment + timedelta(
+                hours=number
+            ))
+            for number in range(1500)
+        ]
+        change_activity_bulk(posts, 1)
+        hours = ActivityBucket.objects.filter(size='hour', scope='')
+        assert hours.filter(posts=1).count() == 1500, (
+            'Проверьте, что ряды активности меняются для тысяч интервалов '
+            'одним вызовом.'
+        )
+        change_activity_bulk(posts, -1)
+        assert buckets() == set()
+
+    def test_bad_params(self, user_client, group_1, user):
+        for params in (
+            {'bucket': 'week'},
+            {'from': 'вчера'},
+            {'group': group_1.slug, 'author': user.username},
+            {'from': '2024-01-02', 'to': '2024-01-01'},
+            {'from': '2000-01-01', 'to': '2024-01-01'},
+            {'to': '0001-01-01'},
+            {'from': '9999-12-31T23:00:00-05:00'},
+        ):
+            response = user_client.get(self.url, params)
+            assert response.status_code == 400, (
+                f'Проверьте, что параметры {params} дают ошибку 400.'
+            )
+        assert user_client.get(
+            self.url, {'group': 'nope'}
+        ).status_code == 404
+        assert user_client.get(
+            self.url, {'to': '1970-01-01', 'bucket': 'day'}
+        ).status_code == 200
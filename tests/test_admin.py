@@ -0,0 +1,183 @@
+import csv
+import io
+import json
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+
+from posts import exports
+from posts.models import Comment, Post
+
+
+@pytest.fixture
+def admin_client_with_comments(admin_client, post, user):
+    Comment.objects.bulk_create(
+        Comment(author=user, post=post, text=f'Коммент {number}')
+        for number in range(150)
+    )
+    return admin_client
+
+
+@pytest.mark.django_db
+class TestCommentAdmin:
+    URL = '/admin/posts/comment/'
+
+    def test_changelist_queries_do_not_grow(self, admin_client_with_comments):
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client_with_comments.get(self.URL)
+        assert response.status_code == HTTPStatus.OK
+        assert len(queries) <= 6, (
+            'Проверьте, что список комментариев в админке загружает автора '
+            'и пост одним запросом, а не отдельным запросом на строку.'
+        )
+
+    def test_changelist_keyset_pages(self, admin_client_with_comments):
+        response = admin_client_with_comments.get(self.URL)
+        first_page = response.context['cl']
+        assert first_page.next_cursor is not None
+        response = admin_client_with_comments.get(
+            self.URL, {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['cl']
+        first_ids = {comment.pk for comment in first_page.result_list}
+        second_ids = {comment.pk for comment in second_page.result_list}
+        assert len(second_ids) == 50
+        assert not first_ids & second_ids, (
+            'Проверьте, что страницы списка комментариев, полученные по '
+            'курсору, не пересекаются.'
+        )
+        assert second_page.next_cursor is None
+
+    def test_changelist_post_filter(self, admin_client_with_comments,
+                                    another_post, user):
+        Comment.objects.create(author=user, post=another_post, text='Другой')
+        response = admin_client_with_comments.get(
+            self.URL, {'post': another_post.id}
+        )
+        assert [
+            comment.post_id for comment in response.context['cl'].result_list
+        ] == [another_post.id]
+        for value in ('²', 'abc'):
+            response = admin_client_with_comments.get(
+                self.URL, {'post': value}
+            )
+            assert response.status_code == HTTPStatus.OK, (
+                'Проверьте, что фильтр по посту игнорирует '
+                'нечисловое значение.'
+            )
+
+
+@pytest.mark.django_db
+class TestExport:
+    URL = '/admin/posts/comment/'
+
+    def export(self, client, action, params='', **data):
+        response = client.post(
+            f'{self.URL}{params}', {'action': action, **data}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.streaming, (
+            'Проверьте, что выгрузка отдаётся StreamingHttpResponse.'
+        )
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_whole_filtered_list(self, admin_client_with_comments, post,
+                                     another_post, user, monkeypatch):
+        monkeypatch.setattr(exports, 'CHUNK_SIZE', 40)
+        Comment.objects.create(author=user, post=another_post, text='Другой')
+        with CaptureQueriesContext(connection) as queries:
+            content = self.export(
+                admin_client_with_comments, 'export_csv',
+                # Курсор страницы не ограничивает выгрузку всего списка.
+                params=f'?post={post.pk}&cursor=100',
+                select_across=1, index=0,
+                _selected_action=Comment.objects.first().pk
+            )
+        rows = list(csv.reader(io.StringIO(content)))
+        assert rows[0] == ['id', 'post', 'author', 'created', 'text']
+        assert len(rows) == 151, (
+            'Проверьте, что с «выбрать все» выгружается весь '
+            'отфильтрованный список.'
+        )
+        assert {row[2] for row in rows[1:]} == {user.username}
+        assert len(queries) < 12, (
+            'Проверьте, что строки читаются партиями, а имя автора '
+            'приходит JOIN в том же запросе.'
+        )
+
+    def test_ndjson_selected(self, admin_client, post, user):
+        comments = Comment.objects.bulk_create(
+            Comment(author=user, post=post, text=f'Коммент {number}')
+            for number in range(3)
+        )
+        content = self.export(
+            admin_client, 'export_ndjson',
+            _selected_action=[comment.pk for comment in comments[:2]]
+        )
+        items = [json.loads(line) for line in content.splitlines()]
+        assert sorted(item['text'] for item in items) == [
+            'Коммент 0', 'Коммент 1'
+        ], 'Проверьте, что без «выбрать все» выгружаются выбранные строки.'
+
+    def test_posts_and_groups(self, admin_client, post_2, group_1):
+        response = admin_client.post('/admin/posts/post/', {
+            'action': 'export_ndjson', '_selected_action': post_2.pk,
+        })
+        item = json.loads(b''.join(response.streaming_content))
+        assert item['group'] == group_1.slug
+        assert item['author'] == post_2.author.username
+        response = admin_client.post('/admin/posts/group/', {
+            'action': 'export_csv', '_selected_action': group_1.pk,
+        })
+        assert response['Content-Disposition'].startswith(
+            'attachment; filename="group-'
+        )
+
+    def test_asgi_streams_async(self, admin_user, post_2, monkeypatch):
+        monkeypatch.setattr(exports, 'CHUNK_SIZE', 1)
+        client = AsyncClient()
+        client.force_login(admin_user)
+
+        async def export():
+            response = await client.post('/admin/posts/post/', {
+                'action': 'export_ndjson', '_selected_action': post_2.pk,
+            })
+            assert response.is_async, (
+                'Проверьте, что под ASGI выгрузка отдаётся асинхронным '
+                'итератором, а не собирается в память.'
+            )
+            return [part async for part in response.streaming_content]
+
+        parts = async_to_sync(export)()
+        assert json.loads(b''.join(parts))['id'] == post_2.pk
+
+
+@pytest.mark.django_db
+class TestDeleteAdmin:
+
+    def test_cascade_needs_delete_permission(self, client, django_user_model,
+                                             post, comment_1_post):
+        staff = django_user_model.objects.create_user(
+            username='Moderator', password='1234567', is_staff=True
+        )
+        staff.user_permissions.set(Permission.objects.filter(
+            codename__in=('view_post', 'delete_post')
+        ))
+        client.force_login(staff)
+        url = f'/admin/posts/post/{post.id}/delete/'
+        response = client.post(url, {'post': 'yes'})
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что удаление поста требует права удалять '
+            'его комментарии.'
+        )
+        assert Post.objects.filter(pk=post.id).exists()
+        staff.user_permissions.add(
+            Permission.objects.get(codename='delete_comment')
+        )
+        client.post(url, {'post': 'yes'})
+        assert not Post.all_objects.filter(pk=post.id).exists()
@@ -0,0 +1,132 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from posts.activity import rebuild_activity
+from posts.archive import archive_posts
+from posts.counters import rebuild_counters
+from posts.models import (ActivityBucket, ArchivedComment, ArchivedPost,
+                          Change, Comment, Counter, Post)
+
+
+def make_old(*posts, days=400):
+    Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+        pub_date=timezone.now() - timedelta(days=days)
+    )
+
+
+def buckets():
+    return set(ActivityBucket.objects.exclude(
+        posts=0, comments=0
+    ).values_list('size', 'scope', 'start', 'posts', 'comments'))
+
+
+@pytest.mark.django_db
+class TestArchive:
+
+    def test_moves_old_posts_with_comments(self, post, post_2, another_post,
+                                           comment_1_post, comment_2_post):
+        make_old(post, post_2)
+        rebuild_activity()
+        activity = buckets()
+        output = StringIO()
+        call_command('archive_posts', stdout=output)
+        assert 'Перенесено в архив постов: 2' in output.getvalue()
+        assert list(Post.objects.values_list('pk', flat=True)) == [
+            another_post.pk
+        ], 'Проверьте, что в горячей таблице остаются только свежие посты.'
+        assert not Comment.objects.exists()
+        assert set(ArchivedPost.objects.values_list('pk', flat=True)) == {
+            post.pk, post_2.pk
+        }
+        assert ArchivedComment.objects.filter(post_id=post.pk).count() == 2
+        counters = dict(Counter.objects.values_list('key', 'value'))
+        rebuild_counters()
+        assert counters == dict(Counter.objects.values_list('key', 'value')), (
+            'Проверьте, что перенос в архив поправляет счётчики строк.'
+        )
+        assert buckets() == activity
+        rebuild_activity()
+        assert buckets() == activity, (
+            'Проверьте, что пересчёт рядов активности учитывает архив.'
+        )
+
+    def test_changes_feed(self, user_client, post, another_post,
+                          comment_1_post):
+        since = Change.objects.last().id
+        make_old(post)
+        archive_posts()
+        changes = user_client.get(
+            '/api/v1/changes/', {'since': since}
+        ).json()['changes']
+        assert {
+            (change['model'], change['id'], change['action'])
+            for change in changes
+        } == {
+            ('comment', comment_1_post.id, 'delete'),
+            ('post', post.id, 'delete'),
+        }, (
+            'Проверьте, что перенос в архив записывает в журнал изменений '
+            'удаление постов и их комментариев.'
+        )
+
+    def test_rerun_overwrites_archive(self, post):
+        make_old(post)
+        archive_posts()
+        ArchivedPost.objects.update(text='старый')
+        Post.objects.bulk_create([
+            Post(pk=post.pk, text=post.text, author=post.author)
+        ])
+        make_old(post)
+        assert archive_posts() == 1
+        assert ArchivedPost.objects.get().text == post.text, (
+            'Проверьте, что повторный перенос перезаписывает архив.'
+        )
+
+    def test_detail_fallback(self, user_client, post, comment_1_post):
+        url = f'/api/v1/posts/{post.pk}/'
+        before = user_client.get(url).json()
+        comments = user_client.get(f'{url}comments/').json()
+        comment = user_client.get(
+            f'{url}comments/{comment_1_post.pk}/'
+        ).json()
+        make_old(post)
+        archive_posts()
+        before['pub_date'] = user_client.get(url).json()['pub_date']
+        assert user_client.get(url).json() == before, (
+            'Проверьте, что пост из архива отдаётся так же, как из '
+            'горячей таблицы.'
+        )
+        assert user_client.get(f'{url}comments/').json() == comments
+        assert user_client.get(
+            f'{url}comments/{comment_1_post.pk}/'
+        ).json() == comment
+        assert user_client.get(
+            f'{url}comments/', {'limit': 1}
+        ).json()['results'] == comments
+        assert user_client.delete(url).status_code == 404, (
+            'Проверьте, что архив доступен только для чтения.'
+        )
+        assert user_client.post(
+            f'{url}comments/', {'text': 'Новый'}
+        ).status_code == 404
+        assert user_client.get('/api/v1/posts/0/').status_code == 404
+        assert user_client.get(f'{url}comments/abc/').status_code == 404
+
+    def test_user_and_group_delete(self, user, post_2, group_1,
+                                   comment_1_another_post):
+        make_old(post_2, comment_1_another_post.post)
+        archive_posts()
+        group_1.delete()
+        assert ArchivedPost.objects.get(pk=post_2.pk).group_id is None
+        user.delete()
+        assert not ArchivedPost.objects.filter(author_id=user.pk).exists()
+        assert not ArchivedComment.objects.filter(
+            author_id=user.pk
+        ).exists(), (
+            'Проверьте, что удаление пользователя удаляет его записи '
+            'в архиве.'
+        )
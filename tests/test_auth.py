@@ -1,5 +1,11 @@
+import pickle
 from http import HTTPStatus
 
+import pytest
+
+from api.authentication import CachedTokenAuthentication
+from posts.caching import get_cache, get_prefix
+
 
 class TestAuthAPI:
 
@@ -29,3 +35,19 @@ class TestAuthAPI:
             'Проверьте, что POST-запрос к `/api/v1/api-token-auth/` '
             'с некорректными данными возвращает ответ со статусовм 400.'
         )
+
+
+@pytest.mark.django_db
+def test_cached_token_without_password(user, token, password):
+    authentication = CachedTokenAuthentication()
+    authentication.authenticate_credentials(token)
+    cached_user, cached_token = authentication.authenticate_credentials(token)
+    assert (cached_user.pk, cached_token.key) == (user.pk, token)
+    cached = get_cache().get(f'{get_prefix("tokens")}:{token}')
+    assert user.password.encode() not in pickle.dumps(cached), (
+        'Проверьте, что хеш пароля не попадает в кэш токенов.'
+    )
+    assert 'password' in cached_user.get_deferred_fields()
+    assert cached_user.check_password(password), (
+        'Проверьте, что пароль пользователя из кэша догружается из базы.'
+    )
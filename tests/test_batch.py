@@ -0,0 +1,65 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.views import MAX_BATCH_SIZE
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBatchAPI:
+
+    def test_posts_by_ids(self, user_client, post, post_2, another_post,
+                          comment_1_post, comment_2_post,
+                          django_assert_max_num_queries):
+        ids = f'{another_post.id},999999,{post.id}'
+        with django_assert_max_num_queries(6):
+            response = user_client.get('/api/v1/posts/', {'ids': ids})
+        assert response.status_code == HTTPStatus.OK
+        test_data = response.json()
+        assert [item['id'] for item in test_data['results']] == [
+            another_post.id, post.id
+        ], (
+            'Проверьте, что GET-запрос к `/api/v1/posts/?ids=` возвращает '
+            'посты в порядке запрошенных id.'
+        )
+        assert test_data['missing'] == [999999], (
+            'Проверьте, что GET-запрос к `/api/v1/posts/?ids=` сообщает '
+            'о ненайденных id.'
+        )
+        assert len(test_data['results'][1]['comments']) == 2
+
+    def test_posts_by_ids_limits(self, user_client, post):
+        ids = ','.join(str(pk) for pk in range(1, MAX_BATCH_SIZE + 2))
+        response = user_client.get('/api/v1/posts/', {'ids': ids})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что `/api/v1/posts/?ids=` ограничивает число id.'
+        )
+        for ids in ('1,abc', '1,²', '1,' * 100000):
+            response = user_client.get('/api/v1/posts/', {'ids': ids})
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                'Проверьте, что `/api/v1/posts/?ids=` отвечает 400 '
+                'на некорректный список id.'
+            )
+
+    def test_comments_by_posts(self, user_client, post, another_post,
+                               comment_1_post, comment_2_post,
+                               comment_1_another_post,
+                               django_assert_max_num_queries):
+        ids = f'{another_post.id},{post.id},999999'
+        with django_assert_max_num_queries(4):
+            response = user_client.get(
+                '/api/v1/comments/', {'post__in': ids}
+            )
+        assert response.status_code == HTTPStatus.OK
+        test_data = response.json()
+        assert [item['post'] for item in test_data['results']] == [
+            another_post.id, post.id, post.id
+        ], (
+            'Проверьте, что `/api/v1/comments/?post__in=` возвращает '
+            'комментарии, сгруппированные по постам в порядке запроса.'
+        )
+        assert test_data['missing'] == [999999]
+
+    def test_comments_by_posts_required(self, user_client):
+        response = user_client.get('/api/v1/comments/')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
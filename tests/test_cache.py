@@ -0,0 +1,155 @@
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from yatube_api.cache import TwoTierCache
+
+
+def make_cache(path, **options):
+    return TwoTierCache(str(path), {
+        'OPTIONS': {'SYNC_INTERVAL': 0.05, **options},
+    })
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Два процесса-воркера с общим L2."""
+    path = tmp_path / 'shared.sqlite3'
+    return make_cache(path), make_cache(path)
+
+
+class TestTwoTierCache:
+
+    def test_hits_from_l1(self, tmp_path):
+        cache = make_cache(tmp_path / 'cache.sqlite3')
+        cache.set('key', b'value')
+        assert cache.get('key') == b'value'
+        assert cache.stats()['hits'] == 1 and cache.stats()['l2_hits'] == 0, (
+            'Проверьте, что записанное значение читается из L1.'
+        )
+
+    def test_mutable_values_are_copied(self, tmp_path):
+        cache = make_cache(tmp_path / 'cache.sqlite3')
+        value = {'items': [1]}
+        cache.set('key', value)
+        value['items'].append(2)
+        cache.get('key')['items'].append(3)
+        assert cache.get('key') == {'items': [1]}, (
+            'Проверьте, что изменяемые значения в L1 не разделяются '
+            'с вызывающим кодом.'
+        )
+
+    def test_lru_eviction_and_ttl(self, tmp_path):
+        cache = make_cache(
+            tmp_path / 'cache.sqlite3', L1_MAX_ENTRIES=2, L1_TIMEOUT=0.05
+        )
+        cache.set_many({'a': 1, 'b': 2})
+        cache.get('a')
+        cache.set('c', 3)
+        assert set(cache.l1.entries) == {':1:a', ':1:c'}, (
+            'Проверьте, что L1 вытесняет давно не читанные ключи.'
+        )
+        assert cache.stats()['evictions'] == 1
+        assert cache.get('b') == 2, (
+            'Проверьте, что вытесненный из L1 ключ читается из L2.'
+        )
+        time.sleep(0.06)
+        assert cache.get('c') == 3
+        assert cache.stats()['expirations'] >= 1 and (
+            cache.stats()['l2_hits'] == 2
+        ), 'Проверьте, что записи L1 живут не дольше L1_TIMEOUT.'
+
+    def test_writes_reach_other_worker(self, workers):
+        first, second = workers
+        first.set('key', 'old')
+        assert second.get('key') == 'old'
+        first.set('key', 'new')
+        first.set('other', 1)
+        assert second.get('key') in ('old', 'new')
+        time.sleep(0.06)
+        assert second.get('key') == 'new', (
+            'Проверьте, что запись видна в L1 другого воркера '
+            'не позже SYNC_INTERVAL.'
+        )
+        assert second.stats()['invalidations'] == 1
+
+    def test_delete_and_clear_reach_other_worker(self, workers):
+        first, second = workers
+        first.set_many({'a': 1, 'b': 2})
+        assert second.get_many(['a', 'b']) == {'a': 1, 'b': 2}
+        assert first.delete('a') and not first.delete('a')
+        time.sleep(0.06)
+        assert second.get('a') is None, (
+            'Проверьте, что удаление видно другому воркеру.'
+        )
+        first.clear()
+        time.sleep(0.06)
+        assert second.get('b') is None, (
+            'Проверьте, что очистка кэша видна другому воркеру.'
+        )
+
+    def test_add_incr_and_expiry(self, workers):
+        first, second = workers
+        assert first.add('lock', 1) and not second.add('lock', 2), (
+            'Проверьте, что add общий для всех воркеров.'
+        )
+        first.delete('lock')
+        assert second.add('lock', 2)
+        assert first.incr('lock', 5) == 7 and second.incr('lock') == 8
+        with pytest.raises(ValueError):
+            first.incr('missing')
+        first.set('short', 1, timeout=0.05)
+        time.sleep(0.06)
+        assert first.get('short') is None and second.get('short') is None
+        assert first.add('short', 2)
+
+
+@pytest.mark.django_db
+class TestApiCaches:
+
+    def test_token_from_cache(self, user_client, user, token):
+        user_client.get('/api/v1/groups/')
+        with CaptureQueriesContext(connection) as queries:
+            user_client.get('/api/v1/groups/')
+        assert not any(
+            'authtoken_token' in query['sql']
+            for query in queries.captured_queries
+        ), 'Проверьте, что токен берётся из кэша.'
+        user.is_active = False
+        user.save()
+        assert user_client.get('/api/v1/groups/').status_code == 401, (
+            'Проверьте, что блокировка пользователя сбрасывает кэш токенов.'
+        )
+
+    def test_groups_from_cache(self, user_client, group_1):
+        url = f'/api/v1/groups/{group_1.id}/'
+        user_client.get('/api/v1/groups/')
+        user_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            user_client.get('/api/v1/groups/')
+            user_client.get(url)
+        assert not queries.captured_queries, (
+            'Проверьте, что группы отдаются из кэша.'
+        )
+        group_1.title = 'Новое название'
+        group_1.save()
+        assert user_client.get(url).json()['title'] == 'Новое название'
+        assert user_client.get('/api/v1/groups/').json()[0]['title'] == (
+            'Новое название'
+        ), 'Проверьте, что запись в группу сбрасывает кэш групп.'
+
+    def test_fragments_from_cache(self, user_client, post):
+        url = f'/api/v1/posts/{post.id}/'
+        user_client.get(url)
+        user_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            user_client.get(url)
+        assert not any(
+            'posts_postfragment' in query['sql']
+            for query in queries.captured_queries
+        ), 'Проверьте, что готовые фрагменты берутся из кэша.'
+        post.text = 'Новый текст'
+        post.save()
+        assert user_client.get(url).json()['text'] == 'Новый текст'
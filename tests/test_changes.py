@@ -0,0 +1,86 @@
+from http import HTTPStatus
+
+import pytest
+
+from posts.models import Change
+
+
+@pytest.mark.django_db(transaction=True)
+class TestChangesAPI:
+    URL = '/api/v1/changes/'
+
+    def test_changes_not_auth(self, client):
+        response = client.get(self.URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что GET-запрос неавторизованного пользователя к '
+            '`/api/v1/changes/` возвращает ответ со статусом 401.'
+        )
+
+    def test_changes_bad_cursor(self, user_client):
+        for value in ('²', '-1', 'abc'):
+            response = user_client.get(self.URL, {'since': value})
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                'Проверьте, что `/api/v1/changes/` отвечает 400 на '
+                'некорректный `since`.'
+            )
+
+    def test_changes_cursor(self, user_client, post):
+        response = user_client.get(self.URL)
+        assert response.status_code == HTTPStatus.OK
+        since = response.json()['last_seq']
+
+        response = user_client.get(self.URL, {'since': since})
+        assert response.json()['changes'] == []
+
+        user_client.post(
+            f'/api/v1/posts/{post.id}/comments/', data={'text': 'Коммент'}
+        )
+        user_client.patch(f'/api/v1/posts/{post.id}/', data={'text': 'Новый'})
+        response = user_client.get(self.URL, {'since': since})
+        test_data = response.json()
+        assert [
+            (change['model'], change['action'])
+            for change in test_data['changes']
+        ] == [('comment', 'create'), ('post', 'update')], (
+            'Проверьте, что `/api/v1/changes/?since=` возвращает изменения '
+            'после курсора в порядке их номеров.'
+        )
+        assert test_data['changes'][1]['data']['text'] == 'Новый'
+        assert test_data['last_seq'] == test_data['changes'][-1]['seq']
+
+    def test_changes_tombstones(self, user_client, post, comment_1_post):
+        since = Change.objects.last().id
+        user_client.patch(f'/api/v1/posts/{post.id}/', data={'text': 'Новый'})
+        user_client.delete(f'/api/v1/posts/{post.id}/')
+        response = user_client.get(self.URL, {'since': since})
+        changes = response.json()['changes']
+        assert {
+            (change['model'], change['id'], change['action'])
+            for change in changes
+        } == {
+            ('comment', comment_1_post.id, 'delete'),
+            ('post', post.id, 'delete'),
+        }, (
+            'Проверьте, что удаление поста отдаётся в журнале как удаление '
+            'поста и его комментариев, а промежуточные изменения '
+            'схлопываются.'
+        )
+        assert all('data' not in change for change in changes)
+
+    def test_changes_batches(self, user_client, post, comment_1_post,
+                             comment_2_post):
+        since = Change.objects.first().id - 1
+        response = user_client.get(self.URL, {'since': since, 'limit': 2})
+        test_data = response.json()
+        assert len(test_data['changes']) == 2
+        assert test_data['has_more'] is True
+        response = user_client.get(
+            self.URL, {'since': test_data['last_seq'], 'limit': 2}
+        )
+        assert response.json()['has_more'] is False
+
+    def test_changes_pruned(self, user_client, post, comment_1_post):
+        since = Change.objects.first().id - 1
+        Change.objects.filter(model='post').delete()
+        response = user_client.get(self.URL, {'since': since})
+        assert response.status_code == HTTPStatus.GONE
@@ -0,0 +1,86 @@
+import importlib
+from types import SimpleNamespace
+
+import pytest
+from django.apps import apps
+from django.db import connection
+
+from posts import fields
+from posts.models import Comment, Post
+
+LONG_TEXT = 'Очень длинный пост про лето и море. ' * 500
+
+migration = importlib.import_module('posts.migrations.0009_compressed_text')
+
+
+def stored(model, pk):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT typeof(text), length(text) FROM {model._meta.db_table} '
+            'WHERE id = %s', [pk]
+        )
+        return cursor.fetchone()
+
+
+@pytest.mark.django_db
+class TestCompressedText:
+
+    def test_large_text_compressed(self, user, post):
+        big = Post.objects.create(text=LONG_TEXT, author=user)
+        kind, size = stored(Post, big.pk)
+        assert kind == 'blob' and size < len(LONG_TEXT.encode()) / 10, (
+            'Проверьте, что длинный текст поста хранится сжатым.'
+        )
+        assert Post.objects.get(pk=big.pk).text == LONG_TEXT
+        assert list(
+            Post.objects.filter(pk=big.pk).values_list('text', flat=True)
+        ) == [LONG_TEXT]
+        assert stored(Post, post.pk)[0] == 'text', (
+            'Проверьте, что короткий текст хранится как есть.'
+        )
+
+    def test_comment_text_and_update(self, user, post):
+        comment = Comment.objects.create(text='коротко', author=user,
+                                         post=post)
+        Comment.objects.filter(pk=comment.pk).update(text=LONG_TEXT)
+        assert stored(Comment, comment.pk)[0] == 'blob', (
+            'Проверьте, что update() тоже сжимает текст комментария.'
+        )
+        comment.refresh_from_db()
+        assert comment.text == LONG_TEXT
+
+    def test_threshold_from_settings(self, user, settings):
+        settings.COMPRESSED_TEXT = {'MIN_SIZE': len(LONG_TEXT) * 4}
+        post = Post.objects.create(text=LONG_TEXT, author=user)
+        assert stored(Post, post.pk)[0] == 'text', (
+            'Проверьте, что текст короче COMPRESSED_TEXT["MIN_SIZE"] '
+            'не сжимается.'
+        )
+
+    def test_deferred_text_not_decompressed(self, user, monkeypatch):
+        Post.objects.create(text=LONG_TEXT, author=user)
+
+        def decompress(value):
+            raise AssertionError('Текст не должен распаковываться.')
+
+        monkeypatch.setattr(fields, 'decompress', decompress)
+        assert [post.author_id for post in Post.objects.defer('text')] == [
+            user.pk
+        ], 'Проверьте, что выборка с defer("text") не распаковывает текст.'
+
+    def test_migration_compresses_existing_rows(self, user):
+        post = Post.objects.create(text='коротко', author=user)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE posts_post SET text = %s WHERE id = %s',
+                [LONG_TEXT, post.pk]
+            )
+        schema_editor = SimpleNamespace(connection=connection)
+        migration.compress_texts(apps, schema_editor)
+        assert stored(Post, post.pk)[0] == 'blob', (
+            'Проверьте, что миграция сжимает уже сохранённые тексты.'
+        )
+        migration.decompress_texts(apps, schema_editor)
+        assert stored(Post, post.pk)[0] == 'text'
+        post.refresh_from_db()
+        assert post.text == LONG_TEXT
@@ -0,0 +1,55 @@
+import gzip
+import zlib
+
+import pytest
+
+from api.middleware import parse_accept_encoding
+from posts.models import Post
+
+
+@pytest.fixture
+def many_posts(user):
+    Post.objects.bulk_create(
+        Post(text=f'Длинный текст поста номер {number} ' * 5, author=user)
+        for number in range(30)
+    )
+
+
+@pytest.mark.django_db
+class TestCompression:
+
+    def test_gzip(self, user_client, many_posts):
+        plain = user_client.get('/api/v1/posts/')
+        response = user_client.get(
+            '/api/v1/posts/', HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        assert response['Content-Encoding'] == 'gzip', (
+            'Проверьте, что большие JSON-ответы сжимаются gzip, если клиент '
+            'его принимает.'
+        )
+        assert 'Accept-Encoding' in response['Vary']
+        assert gzip.decompress(response.content) == plain.content
+        assert len(response.content) < len(plain.content) / 3
+
+    def test_deflate_and_weights(self, user_client, many_posts):
+        response = user_client.get(
+            '/api/v1/posts/', HTTP_ACCEPT_ENCODING='gzip;q=0, deflate'
+        )
+        assert response['Content-Encoding'] == 'deflate'
+        assert zlib.decompress(response.content)
+
+    def test_small_and_unaccepted(self, user_client, post):
+        response = user_client.get(
+            f'/api/v1/posts/{post.id}/', HTTP_ACCEPT_ENCODING='gzip'
+        )
+        assert not response.has_header('Content-Encoding'), (
+            'Проверьте, что короткие ответы не сжимаются.'
+        )
+        response = user_client.get('/api/v1/posts/')
+        assert not response.has_header('Content-Encoding')
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding('gzip;q=0.5, br, *;q=0') == {
+        'gzip': 0.5, 'br': 1.0, '*': 0.0
+    }
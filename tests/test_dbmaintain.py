@@ -0,0 +1,58 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from posts import maintenance
+from posts.models import Change, Post
+
+
+def run(*args):
+    stdout = StringIO()
+    call_command('dbmaintain', *args, stdout=stdout)
+    return stdout.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestDbMaintain:
+
+    def test_analyze_and_report(self, post):
+        output = run()
+        assert 'Проанализировано таблиц' in output
+        assert maintenance.pragma('analysis_limit') == 1000
+        assert 'incremental vacuum выключен' in output, (
+            'Проверьте, что без auto_vacuum = INCREMENTAL команда '
+            'только сообщает число свободных страниц.'
+        )
+        lines = {line.split()[0]: line for line in output.splitlines()}
+        assert 'в планах' in lines['pub_date_desc_idx']
+        assert 'не используется' not in lines['pub_date_desc_idx'], (
+            'Проверьте, что индекс ленты найден в планах частых запросов.'
+        )
+        assert 'повторяет начало' in lines['post_idx'], (
+            'Проверьте, что отчёт находит индексы с одинаковыми колонками.'
+        )
+
+    def test_incremental_vacuum(self, user):
+        run('--enable-incremental-vacuum')
+        assert maintenance.pragma('auto_vacuum') == 2
+        Change.objects.bulk_create(
+            Change(model='post', object_id=pk, action=Change.CREATE)
+            for pk in range(20000)
+        )
+        Change.objects.all().delete()
+        assert maintenance.pragma('freelist_count') > 0
+        output = run('--skip-analyze', '--skip-report')
+        assert 'Освобождено страниц' in output
+        assert maintenance.pragma('freelist_count') == 0, (
+            'Проверьте, что incremental vacuum освобождает все свободные '
+            'страницы.'
+        )
+
+    def test_budget(self, post):
+        output = run('--budget', '0')
+        assert 'Проанализировано таблиц: 0' in output
+        assert 'Бюджет времени исчерпан' in output, (
+            'Проверьте, что команда останавливается по --budget.'
+        )
+        assert Post.objects.count() == 1
@@ -0,0 +1,140 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from posts.counters import count_rows
+from posts.deletion import BatchSizer, delete_or_defer, process_deletions
+from posts.models import Change, Comment, Deletion, Group, Post
+
+
+@pytest.fixture
+def deferred(settings):
+    settings.DELETION_INLINE_LIMIT = 2
+
+
+@pytest.fixture
+def many_comments(post, user, another_user):
+    for number in range(5):
+        Comment.objects.create(
+            author=another_user, post=post, text=f'Коммент {number}'
+        )
+
+
+class TestBatchSizer:
+
+    def test_adjusts_to_budget(self):
+        sizer = BatchSizer(budget=0.1, size=100)
+        sizer.adjust(0.4)
+        assert sizer.size == 25, (
+            'Проверьте, что партия уменьшается пропорционально '
+            'превышению бюджета.'
+        )
+        sizer.adjust(0.01)
+        assert sizer.size == 50, (
+            'Проверьте, что быстрая партия увеличивается.'
+        )
+
+
+@pytest.mark.django_db
+class TestDeferredDeletion:
+
+    def test_small_post_deleted_inline(self, user_client, post,
+                                       comment_1_post):
+        response = user_client.delete(f'/api/v1/posts/{post.id}/')
+        assert response.status_code == 204
+        assert not Post.all_objects.filter(pk=post.id).exists(), (
+            'Проверьте, что пост с малым каскадом удаляется сразу.'
+        )
+        assert not Deletion.objects.exists()
+
+    def test_large_post_hidden_then_purged(self, user_client, post,
+                                           many_comments, deferred):
+        posts_before = count_rows(Post.objects.all()).value
+        response = user_client.delete(f'/api/v1/posts/{post.id}/')
+        assert response.status_code == 204
+        assert not Post.objects.filter(pk=post.id).exists(), (
+            'Проверьте, что пост с большим каскадом сразу скрывается.'
+        )
+        assert Comment.objects.filter(post_id=post.id).count() == 5, (
+            'Проверьте, что комментарии не удаляются в запросе.'
+        )
+        assert user_client.get(
+            f'/api/v1/posts/{post.id}/comments/'
+        ).status_code == 404, (
+            'Проверьте, что комментарии скрытого поста недоступны.'
+        )
+        assert count_rows(Post.objects.all()).value == posts_before - 1, (
+            'Проверьте, что скрытый пост сразу вычитается из счётчика.'
+        )
+        deletion = Deletion.objects.get()
+        assert (deletion.model, deletion.total) == ('post', 5)
+
+        assert process_deletions(BatchSizer(size=2)) == 1
+        deletion.refresh_from_db()
+        assert deletion.status == Deletion.DONE, (
+            'Проверьте, что задание удаления завершается.'
+        )
+        assert deletion.processed == 5, (
+            'Проверьте, что задание сообщает число обработанных строк.'
+        )
+        assert not Post.all_objects.filter(pk=post.id).exists()
+        assert not Comment.objects.filter(post_id=post.id).exists()
+        assert count_rows(Post.objects.all()).value == posts_before - 1, (
+            'Проверьте, что пост не вычитается из счётчика дважды.'
+        )
+        assert Change.objects.filter(
+            model='post', object_id=post.id, action=Change.DELETE
+        ).count() == 1
+
+    def test_hidden_post_not_served_by_ids(self, user_client, post,
+                                           post_2, many_comments, deferred):
+        ids = f'{post.id},{post_2.id}'
+        response = user_client.get('/api/v1/posts/', {'ids': ids})
+        assert response.json()['missing'] == []
+        response = user_client.delete(f'/api/v1/posts/{post.id}/')
+        assert response.status_code == 204
+        assert Deletion.objects.exists()
+        response = user_client.get('/api/v1/posts/', {'ids': ids})
+        test_data = response.json()
+        assert [item['id'] for item in test_data['results']] == [
+            post_2.id
+        ], (
+            'Проверьте, что `/api/v1/posts/?ids=` не отдаёт скрытый пост '
+            'из готовых фрагментов.'
+        )
+        assert test_data['missing'] == [post.id], (
+            'Проверьте, что скрытый пост попадает в `missing`.'
+        )
+
+    def test_group_posts_unset_in_background(self, post_2, group_1, user,
+                                             deferred):
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=user, group=group_1)
+            for number in range(4)
+        )
+        delete_or_defer(group_1)
+        assert not Group.objects.filter(pk=group_1.pk).exists(), (
+            'Проверьте, что группа скрывается сразу.'
+        )
+        assert Post.objects.filter(group=group_1).count() == 5
+        call_command('process_deletions', verbosity=0)
+        assert not Group.all_objects.filter(pk=group_1.pk).exists()
+        assert not Post.objects.filter(group_id=group_1.pk).exists(), (
+            'Проверьте, что фоновое удаление группы снимает её с постов.'
+        )
+        assert Change.objects.filter(
+            model='post', action=Change.UPDATE
+        ).count() >= 5
+
+    def test_user_deletion(self, post, many_comments, user, deferred):
+        delete_or_defer(user)
+        user_model = get_user_model()
+        assert not user_model.objects.get(pk=user.pk).is_active, (
+            'Проверьте, что удаляемый пользователь сразу деактивируется.'
+        )
+        process_deletions()
+        assert not user_model.objects.filter(pk=user.pk).exists()
+        assert not Post.all_objects.filter(author=user).exists()
+        assert not Comment.objects.filter(post=post).exists(), (
+            'Проверьте, что удаляются и комментарии к постам пользователя.'
+        )
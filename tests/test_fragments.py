@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.serializers import PostSerializer
+from posts.fragments import load_fragments, store_fragments
+from posts.models import Post, PostFragment
+
+
+@pytest.mark.django_db
+class TestPostFragments:
+    url = '/api/v1/posts/'
+
+    def get(self, client, url=None, **params):
+        response = client.get(url or self.url, params)
+        assert response.status_code == 200
+        return response
+
+    def test_cached_response_matches_serializer(self, user_client, post,
+                                                another_post, comment_1_post,
+                                                comment_2_post):
+        first = self.get(user_client)
+        expected = PostSerializer(
+            Post.objects.all(), many=True,
+            context={'request': first.wsgi_request}
+        ).data
+        with CaptureQueriesContext(connection) as queries:
+            second = self.get(user_client).json()
+        assert second == first.json() == json.loads(json.dumps(expected)), (
+            'Проверьте, что ответ из фрагментов совпадает с сериализатором.'
+        )
+        assert [item['id'] for item in second] == [another_post.id, post.id]
+        assert not any(
+            'posts_comment' in query['sql']
+            for query in queries.captured_queries
+        ), 'Проверьте, что неизменённые посты не сериализуются повторно.'
+
+    def test_paginated_and_detail(self, user_client, post, another_post):
+        self.get(user_client)
+        data = self.get(user_client, limit=1).json()
+        assert data['count'] == 2 and len(data['results']) == 1, (
+            'Проверьте, что пагинация работает с фрагментами.'
+        )
+        assert data['results'][0]['id'] == another_post.id
+        detail = self.get(user_client, f'{self.url}{post.id}/').json()
+        assert detail['id'] == post.id and detail['text'] == post.text
+
+    def test_comment_refreshes_fragment(self, user_client, post):
+        self.get(user_client)
+        user_client.post(f'{self.url}{post.id}/comments/', {'text': 'Новый'})
+        data = self.get(user_client, f'{self.url}{post.id}/').json()
+        assert [c['text'] for c in data['comments']] == ['Новый'], (
+            'Проверьте, что новый комментарий сбрасывает фрагмент поста.'
+        )
+
+    def test_username_change_refreshes_fragment(self, user_client, user,
+                                                post):
+        self.get(user_client)
+        user.username = 'Renamed'
+        user.save()
+        data = self.get(user_client, f'{self.url}{post.id}/').json()
+        assert data['author'] == 'Renamed', (
+            'Проверьте, что смена имени автора сбрасывает его фрагменты.'
+        )
+
+    def test_write_during_render_is_not_overwritten(self, user_client,
+                                                    post):
+        self.get(user_client)
+        Post.objects.filter(pk=post.pk).update(text='Старый')
+        PostFragment.objects.filter(pk=post.pk).update(data=None)
+        _, _, stamps = load_fragments([post.pk], '')
+        post.text = 'Новый'
+        post.save()
+        store_fragments({post.pk: ('', b'{"stale":true}')}, stamps)
+        assert PostFragment.objects.get(pk=post.pk).is_stale, (
+            'Проверьте, что фрагмент, отрисованный до записи, '
+            'не сохраняется.'
+        )
+        data = self.get(user_client, f'{self.url}{post.id}/').json()
+        assert data['text'] == 'Новый'
+
+    def test_browsable_api(self, user_client, post):
+        response = user_client.get(self.url, HTTP_ACCEPT='text/html')
+        assert response.status_code == 200
+        assert post.text in response.content.decode()
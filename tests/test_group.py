@@ -125,3 +125,12 @@ class TestGroupAPI:
             'виде словаря.'
         )
         self.check_group_info(test_data, '/api/v1/groups/{group_id}/')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_page_bad_id(self, user_client, group_1):
+        for pk in ('abc', '²'):
+            response = user_client.get(f'/api/v1/groups/{pk}/')
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                'Проверьте, что GET-запрос к `/api/v1/groups/{group_id}/` '
+                'с нечисловым id возвращает ответ со статусом 404.'
+            )
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from api.middleware import parse_request_start
+
+
+def test_parse_request_start():
+    now = 1_700_000_000.5
+    for header in ('t=1700000000.25', 't=1700000000250', '1700000000250000'):
+        assert parse_request_start(header, now) == pytest.approx(
+            1_700_000_000.25
+        ), (
+            'Проверьте, что X-Request-Start разбирается в секундах, '
+            'миллисекундах и микросекундах.'
+        )
+    assert parse_request_start('t=abc', now) is None
+
+
+@pytest.mark.django_db
+class TestLoadShedding:
+
+    def queued_for(self, seconds):
+        return {'HTTP_X_REQUEST_START': f't={time.time() - seconds:.3f}'}
+
+    def test_sheds_low_priority_after_queue_delay(self, user_client, post,
+                                                  settings):
+        settings.LOAD_SHEDDING = {
+            **settings.LOAD_SHEDDING, 'OVERLOAD_INTERVAL': 60,
+        }
+        response = user_client.get('/api/v1/posts/', **self.queued_for(2))
+        assert response.status_code == 503, (
+            'Проверьте, что большой список, долго ждавший в очереди, '
+            'отклоняется с кодом 503.'
+        )
+        assert response['Retry-After'] == '1', (
+            'Проверьте, что ответ 503 содержит заголовок Retry-After.'
+        )
+        response = user_client.get(
+            '/api/v1/posts/?limit=10', **self.queued_for(0.5)
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что небольшие страницы отклоняются позже больших.'
+        )
+
+    def test_bad_limit_is_low_priority(self, user_client, post):
+        for limit in ('²', 'abc', '-5'):
+            response = user_client.get(
+                '/api/v1/posts/', {'limit': limit}, **self.queued_for(0.5)
+            )
+            assert response.status_code == 503, (
+                'Проверьте, что список с некорректным `limit` считается '
+                'тяжёлым, а не падает с ошибкой 500.'
+            )
+
+    def test_keeps_cheap_and_write_requests(self, user_client, post):
+        response = user_client.get(
+            f'/api/v1/posts/{post.id}/', **self.queued_for(2)
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что чтение одного объекта не отклоняется первым.'
+        )
+        response = user_client.post(
+            '/api/v1/posts/', {'text': 'Текст'}, **self.queued_for(2)
+        )
+        assert response.status_code == 201, (
+            'Проверьте, что запись не отклоняется первой.'
+        )
+
+    def test_sheds_admin_export(self, admin_client, post):
+        data = {'action': 'export_csv', '_selected_action': post.id}
+        response = admin_client.post(
+            '/admin/posts/post/', data, **self.queued_for(0.5)
+        )
+        assert response.status_code == 503, (
+            'Проверьте, что выгрузка из админки отклоняется под нагрузкой '
+            'как запрос с низким приоритетом.'
+        )
+        response = admin_client.post('/admin/posts/post/', data)
+        assert response.status_code == 200
+
+    def test_sheds_by_in_flight(self, user_client, client, post, settings):
+        settings.LOAD_SHEDDING = {'MAX_IN_FLIGHT': {'low': 0}}
+        assert client.get('/api/v1/posts/').status_code == 503, (
+            'Проверьте, что анонимные запросы отклоняются при превышении '
+            'числа запросов в работе.'
+        )
+        assert user_client.get('/api/v1/posts/?limit=5').status_code == 200
+
+    def test_standing_queue_uses_overload_limits(self, user_client, post,
+                                                 settings):
+        settings.LOAD_SHEDDING = {
+            **settings.LOAD_SHEDDING, 'OVERLOAD_INTERVAL': 0,
+        }
+        response = user_client.get(
+            '/api/v1/posts/?limit=10', **self.queued_for(0.5)
+        )
+        assert response.status_code == 503, (
+            'Проверьте, что при стоячей очереди действуют короткие пороги '
+            'OVERLOAD_QUEUE_DELAY.'
+        )
@@ -0,0 +1,84 @@
+from http import HTTPStatus
+
+import pytest
+from rest_framework.authtoken.models import Token
+
+from api import login
+
+URL = '/api/v1/api-token-auth/'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLogin:
+
+    def test_wrong_credentials(self, client, user, password):
+        for data in (
+            {'username': user.username, 'password': 'wrong'},
+            {'username': 'nobody', 'password': password},
+        ):
+            response = client.post(URL, data)
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+            assert 'non_field_errors' in response.json(), (
+                'Проверьте, что неверные имя или пароль дают ошибку 400.'
+            )
+        assert client.get(URL).status_code == HTTPStatus.METHOD_NOT_ALLOWED
+
+    def test_inactive_user(self, client, user, password):
+        user.is_active = False
+        user.save()
+        response = client.post(
+            URL, {'username': user.username, 'password': password}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что заблокированный пользователь не получает токен.'
+        )
+
+    def test_existing_token_fast_path(self, client, user, token, monkeypatch):
+        def check_password(*args):
+            raise AssertionError('Пароль не должен проверяться.')
+
+        monkeypatch.setattr(login, 'check_password', check_password)
+        response = client.post(
+            URL, {'username': user.username, 'password': 'any'},
+            HTTP_AUTHORIZATION=f'Token {token}'
+        )
+        assert response.json() == {'token': token}, (
+            'Проверьте, что клиент с действующим токеном получает его '
+            'без проверки пароля.'
+        )
+
+    def test_rehash_with_configured_iterations(self, settings, client, user,
+                                               password):
+        settings.PASSWORD_ITERATIONS = 1000
+        user.set_password(password)
+        user.save()
+        settings.PASSWORD_ITERATIONS = 2000
+        response = client.post(
+            URL, {'username': user.username, 'password': password}
+        )
+        assert response.json() == {
+            'token': Token.objects.get(user=user).key
+        }
+        user.refresh_from_db()
+        assert user.password.startswith('pbkdf2_sha256$2000$'), (
+            'Проверьте, что при входе хеш с меньшим числом итераций '
+            'пересчитывается с числом из PASSWORD_ITERATIONS.'
+        )
+        settings.PASSWORD_ITERATIONS = 1000
+        client.post(URL, {'username': user.username, 'password': password})
+        user.refresh_from_db()
+        assert user.password.startswith('pbkdf2_sha256$2000$'), (
+            'Проверьте, что хеш с большим числом итераций при входе '
+            'не ослабляется.'
+        )
+
+    def test_overloaded_pool(self, settings, client, user, password):
+        settings.LOGIN_HASHING = {'MAX_PENDING': 0, 'RETRY_AFTER': 3}
+        response = client.post(
+            URL, {'username': user.username, 'password': password}
+        )
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE, (
+            'Проверьте, что при полной очереди к пулу хеширования '
+            'возвращается 503.'
+        )
+        assert response['Retry-After'] == '3'
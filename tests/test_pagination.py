@@ -0,0 +1,72 @@
+from http import HTTPStatus
+
+import pytest
+
+from posts.counters import count_rows, get_counter_key
+from posts.models import Comment, Post
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCountedPagination:
+
+    def test_posts_limit_offset(self, user_client, post, another_post):
+        response = user_client.get('/api/v1/posts/', {'limit': 1})
+        assert response.status_code == HTTPStatus.OK
+        test_data = response.json()
+        for field in ('count', 'count_exact', 'next', 'previous', 'results'):
+            assert field in test_data, (
+                'Проверьте, что GET-запрос к `/api/v1/posts/` с параметром '
+                f'`limit` возвращает поле `{field}`.'
+            )
+        assert test_data['count'] == Post.objects.count()
+        assert test_data['count_exact'] is True
+        assert len(test_data['results']) == 1
+        assert test_data['next'] is not None
+
+        response = user_client.get(
+            '/api/v1/posts/', {'limit': 1, 'offset': 1}
+        )
+        assert response.json()['next'] is None
+
+    def test_comment_counters_follow_writes(self, user_client, post,
+                                            comment_1_post):
+        url = f'/api/v1/posts/{post.id}/comments/'
+        user_client.post(url, data={'text': 'Новый комментарий'})
+        response = user_client.get(url, {'limit': 10})
+        assert response.json()['count'] == 2, (
+            'Проверьте, что счётчик комментариев поста учитывает '
+            'созданные комментарии.'
+        )
+        user_client.delete(f'{url}{comment_1_post.id}/')
+        response = user_client.get(url, {'limit': 10})
+        assert response.json()['count'] == 1, (
+            'Проверьте, что счётчик комментариев поста учитывает '
+            'удалённые комментарии.'
+        )
+
+
+@pytest.mark.django_db
+class TestCountRows:
+
+    def test_counter_keys(self, post):
+        assert get_counter_key(Post.objects.all()) == 'posts.post'
+        assert get_counter_key(
+            Comment.objects.filter(post_id=str(post.id))
+        ) == f'posts.comment:post={post.id}'
+        assert get_counter_key(Comment.objects.filter(text='x')) is None
+
+    def test_bounded_count_is_not_exact(self, settings, post, user,
+                                        comment_1_post, comment_2_post):
+        settings.COUNT_EXACT_LIMIT = 1
+        row_count = count_rows(Comment.objects.filter(author__isnull=False))
+        assert row_count == (1, False)
+        row_count = count_rows(
+            Comment.objects.filter(author__isnull=False), strategy='exact'
+        )
+        assert row_count == (2, True)
+
+    def test_counter_is_used(self, post, comment_1_post, comment_2_post,
+                             django_assert_num_queries):
+        with django_assert_num_queries(1):
+            row_count = count_rows(Comment.objects.filter(post=post))
+        assert row_count == (2, True)
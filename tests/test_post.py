@@ -153,6 +153,14 @@ class TestPostAPI:
             post
         )
 
+    def test_post_get_bad_id(self, user_client, post):
+        for pk in ('abc', '²'):
+            response = user_client.get(f'/api/v1/posts/{pk}/')
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                'Проверьте, что GET-запрос к `/api/v1/posts/{id}/` '
+                'с нечисловым id возвращает ответ со статусом 404.'
+            )
+
     @pytest.mark.django_db(transaction=True)
     @pytest.mark.parametrize('http_method', ('put', 'patch'))
     def test_post_change_auth_with_valid_data(self, user_client, post,
@@ -0,0 +1,92 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Post
+
+
+@pytest.mark.django_db
+class TestReturnPreference:
+
+    def test_post_create_minimal(self, user_client, user):
+        response = user_client.post(
+            '/api/v1/posts/', {'text': 'Новый пост'},
+            HTTP_PREFER='return=minimal'
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        post = Post.objects.get()
+        assert response.json() == {'id': post.pk}, (
+            'Проверьте, что с Prefer: return=minimal создание возвращает '
+            'только id.'
+        )
+        assert response['Location'].endswith(f'/api/v1/posts/{post.pk}/')
+        assert response['Preference-Applied'] == 'return=minimal'
+
+    def test_post_patch_minimal(self, user_client, post, comment_1_post):
+        url = f'/api/v1/posts/{post.pk}/'
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.patch(
+                url, {'text': 'Изменённый'}, HTTP_PREFER='return=minimal'
+            )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert response['Location'].endswith(url)
+        assert not [
+            query for query in queries.captured_queries
+            if 'FROM "posts_comment"' in query['sql']
+        ], 'Проверьте, что ответ без тела не загружает комментарии поста.'
+        post.refresh_from_db()
+        assert post.text == 'Изменённый'
+
+    def test_patch_updates_changed_columns(self, user_client, post):
+        url = f'/api/v1/posts/{post.pk}/'
+        with CaptureQueriesContext(connection) as queries:
+            user_client.patch(url, {'text': 'Новый', 'group': ''})
+        updates = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ]
+        assert len(updates) == 1
+        assert '"text"' in updates[0] and '"group_id"' not in updates[0], (
+            'Проверьте, что PATCH сохраняет только изменённые поля.'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.patch(url, {'text': 'Новый'})
+        assert response.status_code == HTTPStatus.OK
+        assert not [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ], 'Проверьте, что PATCH без изменений не пишет в базу.'
+
+    def test_comment_minimal_and_representation(self, user_client, post):
+        url = f'/api/v1/posts/{post.pk}/comments/'
+        response = user_client.post(
+            url, {'text': 'Коммент'}, HTTP_PREFER='return=minimal'
+        )
+        comment = Comment.objects.get()
+        assert response.json() == {'id': comment.pk}
+        assert response['Location'].endswith(f'{url}{comment.pk}/')
+        response = user_client.patch(
+            f'{url}{comment.pk}/', {'text': 'Другой'},
+            HTTP_PREFER='respond-async, return=representation'
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['text'] == 'Другой', (
+            'Проверьте, что return=representation возвращает объект.'
+        )
+        assert response['Preference-Applied'] == 'return=representation'
+
+    def test_minimal_errors_unchanged(self, user_client, another_post):
+        response = user_client.post(
+            '/api/v1/posts/', {}, HTTP_PREFER='return=minimal'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'text' in response.json()
+        response = user_client.patch(
+            f'/api/v1/posts/{another_post.pk}/', {'text': 'Чужой'},
+            HTTP_PREFER='return=minimal'
+        )
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что с return=minimal права автора проверяются.'
+        )
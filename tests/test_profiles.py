@@ -0,0 +1,100 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from django.urls import get_resolver
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'yatube_api'
+
+
+def run_check(*command, **env):
+    base_env = {
+        name: value for name, value in os.environ.items()
+        if not name.startswith('YATUBE_')
+    }
+    return subprocess.run(
+        [sys.executable, 'manage.py', *(command or ['check'])],
+        cwd=PROJECT_DIR, capture_output=True, text=True,
+        env={**base_env, **env},
+    )
+
+
+class TestProfiles:
+
+    def test_warm_up(self):
+        from yatube_api.warmup import warm_up
+
+        warm_up()
+        assert get_resolver()._populated, (
+            'Проверьте, что `warm_up` заполняет словари резолвера URL.'
+        )
+
+    def test_production_profile(self, tmp_path):
+        result = run_check(
+            YATUBE_PROFILE='production',
+            YATUBE_SECRET_KEY='test-' + 'x' * 50,
+            YATUBE_ALLOWED_HOSTS='api.example.com',
+            YATUBE_DB_PATH=str(tmp_path / 'db.sqlite3'),
+        )
+        assert result.returncode == 0, (
+            'Проверьте, что проект запускается в профиле production: '
+            f'{result.stderr}'
+        )
+
+    def test_production_password_iterations(self):
+        from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+        result = run_check(
+            'shell', '-c',
+            'from django.conf import settings; '
+            'print(settings.PASSWORD_ITERATIONS)',
+            YATUBE_PROFILE='production',
+            YATUBE_SECRET_KEY='test-' + 'x' * 50,
+            YATUBE_ALLOWED_HOSTS='api.example.com',
+            YATUBE_PASSWORD_ITERATIONS='1000',
+        )
+        assert result.stdout.strip() == str(
+            PBKDF2PasswordHasher.iterations
+        ), (
+            'Проверьте, что в профиле production число итераций хеша '
+            'паролей не ниже значения Django по умолчанию.'
+        )
+
+    def test_production_slow_query_log_off(self):
+        result = run_check(
+            'shell', '-c',
+            'from django.conf import settings; '
+            'print(settings.SLOW_QUERY_THRESHOLD)',
+            YATUBE_PROFILE='production',
+            YATUBE_SECRET_KEY='test-' + 'x' * 50,
+            YATUBE_ALLOWED_HOSTS='api.example.com',
+        )
+        assert result.stdout.strip() == 'None', (
+            'Проверьте, что в профиле production журнал медленных '
+            'запросов выключен по умолчанию.'
+        )
+
+    def test_production_requires_secret_key(self):
+        result = run_check(YATUBE_PROFILE='production')
+        assert result.returncode != 0, (
+            'Проверьте, что профиль production не запускается '
+            'без `YATUBE_SECRET_KEY`.'
+        )
+
+    def test_production_requires_allowed_hosts(self):
+        result = run_check(
+            YATUBE_PROFILE='production',
+            YATUBE_SECRET_KEY='test-' + 'x' * 50,
+            YATUBE_ALLOWED_HOSTS=' , ',
+        )
+        assert 'YATUBE_ALLOWED_HOSTS' in result.stderr, (
+            'Проверьте, что профиль production не запускается '
+            'без `YATUBE_ALLOWED_HOSTS`.'
+        )
+
+    def test_unknown_profile(self):
+        result = run_check(YATUBE_PROFILE='staging')
+        assert result.returncode != 0, (
+            'Проверьте, что неизвестный профиль отклоняется.'
+        )
@@ -0,0 +1,71 @@
+import marshal
+import pstats
+
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def staff_client(django_user_model):
+    staff = django_user_model.objects.create_user(
+        username='StaffUser', password='1234567', is_staff=True
+    )
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=staff).key}'
+    )
+    return client
+
+
+@pytest.mark.django_db
+class TestProfiling:
+    url = '/api/v1/posts/'
+
+    def test_ignored_for_regular_user(self, user_client, post):
+        response = user_client.get(self.url, {'_profile': 1})
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/json', (
+            'Проверьте, что профиль отдаётся только сотрудникам.'
+        )
+
+    def test_text_report(self, staff_client, post):
+        response = staff_client.get(self.url, {'_profile': 1})
+        assert response['Content-Type'].startswith('text/plain'), (
+            'Проверьте, что `?_profile=1` возвращает текстовый отчёт.'
+        )
+        report = response.content.decode()
+        for part in ('serializers', 'orm', 'SQL: ', 'posts_post'):
+            assert part in report, (
+                f'Проверьте, что отчёт содержит `{part}`.'
+            )
+
+    def test_pstats(self, staff_client, post, tmp_path):
+        response = staff_client.get(self.url, HTTP_X_PROFILE='pstats')
+        assert 'attachment' in response['Content-Disposition'], (
+            'Проверьте, что профиль pstats отдаётся файлом.'
+        )
+        path = tmp_path / 'profile.pstats'
+        path.write_bytes(response.content)
+        stats = pstats.Stats(str(path))
+        assert stats.total_calls > 0
+        assert isinstance(marshal.loads(response.content), dict)
+
+    def test_collapsed(self, staff_client, post):
+        response = staff_client.get(self.url, {'_profile': 'collapsed'})
+        assert response.status_code == 200
+        for line in response.content.decode().splitlines():
+            stack, count = line.rsplit(' ', 1)
+            assert int(count) > 0 and stack, (
+                'Проверьте формат свёрнутых стеков `стек количество`.'
+            )
+
+    def test_server_timing(self, staff_client, post):
+        response = staff_client.get(self.url, {'_profile': 'timing'})
+        assert response.status_code == 200
+        assert response.json()[0]['id'] == post.id, (
+            'Проверьте, что в режиме timing ответ не меняется.'
+        )
+        assert 'queries;dur=' in response['Server-Timing'], (
+            'Проверьте, что время SQL передаётся в Server-Timing.'
+        )
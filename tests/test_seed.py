@@ -0,0 +1,62 @@
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from posts.models import Comment, Group, Post
+
+
+@pytest.mark.django_db
+class TestSeedCommand:
+
+    def seed(self, **options):
+        options = {'users': 5, 'groups': 2, 'posts': 20, 'comments': 300,
+                   'batch_size': 7, 'seed': 1, **options}
+        call_command('seed', stdout=StringIO(), **options)
+
+    def test_seed_counts(self, django_user_model):
+        self.seed()
+        assert django_user_model.objects.count() == 5, (
+            'Проверьте, что команда `seed` создаёт `--users` пользователей.'
+        )
+        assert Group.objects.count() == 2
+        assert Post.objects.count() == 20
+        assert Comment.objects.count() == 300, (
+            'Проверьте, что команда `seed` создаёт `--comments` '
+            'комментариев.'
+        )
+
+    def test_seed_dates_are_spread(self):
+        self.seed(comments=50)
+        assert Post.objects.dates('pub_date', 'day').count() > 1, (
+            'Проверьте, что команда `seed` распределяет даты публикации '
+            'постов, а не ставит всем текущее время.'
+        )
+        for comment in Comment.objects.select_related('post'):
+            assert comment.created >= comment.post.pub_date
+
+    def test_seed_is_deterministic(self):
+        self.seed()
+        first = list(Comment.objects.order_by('pk').values_list(
+            'post__text', 'text'
+        ))
+        Comment.objects.all().delete()
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        self.seed(users=0)
+        second = list(Comment.objects.order_by('pk').values_list(
+            'post__text', 'text'
+        ))
+        assert first == second, (
+            'Проверьте, что команда `seed` с одинаковым `--seed` создаёт '
+            'одинаковые данные.'
+        )
+
+    def test_seed_zipf_skews_comments(self):
+        self.seed(comments=2000, zipf=1.5)
+        per_post = Counter(Comment.objects.values_list('post_id', flat=True))
+        assert max(per_post.values()) > 2000 / 20 * 3, (
+            'Проверьте, что при `--zipf` комментарии концентрируются на '
+            'популярных постах.'
+        )
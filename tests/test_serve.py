@@ -0,0 +1,82 @@
+import os
+import signal
+import subprocess
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'yatube_api'
+
+
+def get_status(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+@pytest.fixture
+def server(tmp_path):
+    env = {
+        **os.environ,
+        'PYTHONUNBUFFERED': '1',
+        'YATUBE_DB_PATH': str(tmp_path / 'db.sqlite3'),
+    }
+    subprocess.run(
+        [sys.executable, 'manage.py', 'migrate', '-v0'],
+        cwd=PROJECT_DIR, env=env, check=True,
+    )
+    process = subprocess.Popen(
+        [sys.executable, 'manage.py', 'serve', '127.0.0.1:0',
+         '--workers', '2', '--max-requests', '2',
+         '--max-requests-jitter', '0'],
+        cwd=PROJECT_DIR, env=env, text=True,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    banner = process.stdout.readline()
+    address = banner.split()[1].rstrip(',')
+    yield process, f'http://{address}'
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+
+class TestServe:
+
+    def test_serves_and_recycles_workers(self, server):
+        process, base_url = server
+        statuses = {get_status(f'{base_url}/api/v1/groups/') for _ in range(9)}
+        assert statuses == {401}, (
+            'Проверьте, что `manage.py serve` отвечает на запросы и '
+            'после исчерпания `--max-requests` заменяет воркеры.'
+        )
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=15) == 0, (
+            'Проверьте, что по SIGTERM сервер мягко завершается с кодом 0.'
+        )
+
+    def test_refuses_event_streams(self, server):
+        _, base_url = server
+        url = f'{base_url}/api/v1/posts/1/comments/stream/'
+        for _ in range(3):
+            assert get_status(url, {'Accept': 'text/event-stream'}) == 501, (
+                'Проверьте, что `manage.py serve` не занимает воркер '
+                'потоком событий, а отвечает 501.'
+            )
+        assert get_status(f'{base_url}/api/v1/groups/') == 401
+
+    def test_invalid_address(self):
+        for address in ('localhost:http', 'localhost:²'):
+            result = subprocess.run(
+                [sys.executable, 'manage.py', 'serve', address],
+                cwd=PROJECT_DIR, capture_output=True, text=True,
+            )
+            assert result.returncode != 0, (
+                'Проверьте, что `manage.py serve` отклоняет неверный адрес.'
+            )
+            assert 'Traceback' not in result.stderr
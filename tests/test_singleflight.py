@@ -0,0 +1,131 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.core.cache import cache
+
+from api.fragments import fragment_flight
+from api.singleflight import SingleFlight
+from posts.models import PostFragment
+
+
+@pytest.fixture
+def flight(settings):
+    settings.SINGLE_FLIGHT = {'WAIT_TIMEOUT': 2, 'POLL_INTERVAL': 0.001}
+    cache.clear()
+    yield SingleFlight('test')
+    cache.clear()
+
+
+class SlowCompute:
+
+    def __init__(self, delay=0.1, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, keys):
+        with self.lock:
+            self.calls.append(list(keys))
+        time.sleep(self.delay)
+        if self.error and len(self.calls) == 1:
+            raise self.error
+        return {key: f'value:{key}' for key in keys}
+
+
+class TestSingleFlight:
+
+    def run_concurrently(self, flight, compute, count=10, **kwargs):
+        with ThreadPoolExecutor(count) as pool:
+            futures = [
+                pool.submit(flight.run, ['a'], compute, **kwargs)
+                for _ in range(count)
+            ]
+            return [future.result() for future in futures]
+
+    def test_one_compute_per_key(self, flight):
+        compute = SlowCompute()
+        results = self.run_concurrently(flight, compute)
+        assert len(compute.calls) == 1, (
+            'Проверьте, что одновременные промахи считаются один раз.'
+        )
+        assert all(result == {'a': 'value:a'} for result in results)
+        assert cache.get(flight.lock_key('a')) is None, (
+            'Проверьте, что лидер снимает блокировку в кэше.'
+        )
+
+    def test_waits_for_other_worker(self, flight):
+        cache.add(flight.lock_key('a'), 1)
+        compute = SlowCompute(delay=0)
+
+        def publish():
+            time.sleep(0.05)
+            cache.set(flight.result_key('a'), 'remote')
+            cache.delete(flight.lock_key('a'))
+
+        threading.Thread(target=publish).start()
+        assert flight.run(['a'], compute) == {'a': 'remote'}, (
+            'Проверьте, что воркер ждёт результат лидера из общего кэша.'
+        )
+        assert compute.calls == []
+
+    def test_computes_when_leader_gone(self, flight):
+        cache.add(flight.lock_key('a'), 1, timeout=0.05)
+        compute = SlowCompute(delay=0)
+        assert flight.run(['a'], compute) == {'a': 'value:a'}, (
+            'Проверьте, что без результата лидера значение считается.'
+        )
+
+    def test_stale_while_revalidate(self, flight):
+        cache.add(flight.lock_key('a'), 1)
+        compute = SlowCompute(delay=0)
+        started = time.monotonic()
+        result = flight.run(['a'], compute, stale={'a': 'old'})
+        assert result == {'a': 'old'} and compute.calls == [], (
+            'Проверьте, что во время пересчёта отдаётся устаревшее значение.'
+        )
+        assert time.monotonic() - started < 0.5
+
+    def test_leader_error_releases_waiters(self, flight):
+        compute = SlowCompute(error=ValueError('boom'))
+        with ThreadPoolExecutor(4) as pool:
+            futures = [
+                pool.submit(flight.run, ['a'], compute) for _ in range(4)
+            ]
+            outcomes = []
+            for future in futures:
+                try:
+                    outcomes.append(future.result())
+                except ValueError:
+                    outcomes.append('error')
+        assert outcomes.count('error') == 1, (
+            'Проверьте, что ошибка лидера не оставляет ждущих без ответа.'
+        )
+        assert all(
+            outcome == {'a': 'value:a'}
+            for outcome in outcomes if outcome != 'error'
+        )
+        assert flight.flights == {}
+
+
+@pytest.mark.django_db
+def test_stale_fragment_served_while_rendering(settings, flight, user_client,
+                                               post):
+    settings.FRAGMENT_STALE_WHILE_REVALIDATE = True
+    url = f'/api/v1/posts/{post.id}/'
+    user_client.get(url)
+    post.text = 'Новый текст'
+    post.save()
+    stamp = PostFragment.objects.get(pk=post.pk).stamp
+    # Пост прямо сейчас отрисовывает другой воркер.
+    key = f'http://testserver/|{post.pk}:{stamp}'
+    cache.add(fragment_flight.lock_key(key), 1)
+    assert user_client.get(url).json()['text'] != 'Новый текст', (
+        'Проверьте, что с FRAGMENT_STALE_WHILE_REVALIDATE отдаётся '
+        'прежний JSON, пока пост отрисовывает другой запрос.'
+    )
+    settings.FRAGMENT_STALE_WHILE_REVALIDATE = False
+    cache.clear()
+    assert user_client.get(url).json()['text'] == 'Новый текст'
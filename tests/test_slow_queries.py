@@ -0,0 +1,79 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from yatube_api import slow_queries
+from yatube_api.slow_queries import fingerprint, slow_query_store
+from posts.models import Post
+
+
+def test_fingerprint():
+    assert fingerprint(
+        'SELECT * FROM "t" WHERE "a" = %s AND "b" IN (%s, %s, %s) '
+        "AND c = 'x' LIMIT 21"
+    ) == fingerprint(
+        'SELECT * FROM "t" WHERE "a" = %s AND "b" IN (%s, %s)\n'
+        "AND c = 'yy' LIMIT 5"
+    ), 'Проверьте, что отпечаток не зависит от значений и длины IN.'
+
+
+@pytest.mark.django_db
+class TestSlowQueries:
+
+    def test_slow_query_logged_with_view(self, settings, user_client, post):
+        settings.SLOW_QUERY_THRESHOLD = 0
+        user_client.get('/api/v1/posts/')
+        views = ' '.join(entry['views'] for entry in slow_query_store.summary(
+            limit=100
+        ))
+        assert 'GET api.views.PostViewSet.list' in views, (
+            'Проверьте, что медленный запрос записывается вместе с view.'
+        )
+
+    def test_bad_plan_logged_once(self, settings, post, another_post):
+        settings.SLOW_QUERY_THRESHOLD = 10
+        list(Post.objects.order_by('text'))
+        list(Post.objects.order_by('text'))
+        entries = slow_query_store.summary(flagged=True)
+        assert len(entries) == 1 and entries[0]['count'] == 1, (
+            'Проверьте, что запрос с плохим планом записывается один раз, '
+            'даже если он быстрый.'
+        )
+        assert 'full scan posts_post' in entries[0]['flags']
+        assert 'temp b-tree ORDER BY' in entries[0]['flags']
+        assert 'SCAN posts_post' in entries[0]['latest']['plan']
+
+    def test_disabled(self, settings, post):
+        settings.SLOW_QUERY_THRESHOLD = None
+        list(Post.objects.order_by('text'))
+        assert slow_query_store.summary() == [], (
+            'Проверьте, что SLOW_QUERY_THRESHOLD = None отключает журнал.'
+        )
+
+    def test_report_command(self, settings, post):
+        settings.SLOW_QUERY_THRESHOLD = 10
+        list(Post.objects.order_by('text'))
+        out = StringIO()
+        call_command('slow_queries', '--flagged', stdout=out)
+        assert 'full scan posts_post' in out.getvalue(), (
+            'Проверьте, что `slow_queries` печатает флаги плана.'
+        )
+        call_command('slow_queries', '--clear', stdout=StringIO())
+        assert slow_query_store.summary() == []
+
+    def test_fingerprints_evicted_lru(self, settings, monkeypatch,
+                                      slow_query_log, post):
+        settings.SLOW_QUERY_THRESHOLD = 10
+        monkeypatch.setattr(slow_queries, 'MAX_FINGERPRINTS', 4)
+        for lookup in ('pk', 'pk__gt', 'pk__lt', 'pk__gte'):
+            list(Post.objects.order_by('text'))
+            list(Post.objects.filter(**{lookup: 1}).order_by().values_list(
+                'pk'
+            ))
+        assert len(slow_query_log.checked) <= 4
+        entries = slow_query_store.summary(flagged=True)
+        assert [entry['count'] for entry in entries] == [1], (
+            'Проверьте, что при переполнении кэша отпечатков часто '
+            'встречающийся запрос не проверяется и не записывается заново.'
+        )
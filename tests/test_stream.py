@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+
+from api.streams import comment_bus
+
+
+def read_events(url, token, count, headers=None, action=None):
+    """Читает `count` событий потока, выполняя `action` после подписки."""
+    async def read():
+        response = await AsyncClient().get(url, headers={
+            'Authorization': f'Token {token}', **(headers or {})
+        })
+        if response.status_code != 200:
+            return response.status_code, []
+        stream = aiter(response.streaming_content)
+        events = []
+        if action is not None:
+            # Первый шаг генератора подписывает его на пост.
+            first = asyncio.ensure_future(anext(stream))
+            await asyncio.sleep(0.05)
+            await action()
+            events.append(await asyncio.wait_for(first, 5))
+        while len(events) < count:
+            events.append(await asyncio.wait_for(anext(stream), 5))
+        await stream.aclose()
+        return response.status_code, [
+            event.decode() if isinstance(event, bytes) else event
+            for event in events
+        ]
+    return async_to_sync(read)()
+
+
+def parse(event):
+    lines = dict(line.split(': ', 1) for line in event.strip().split('\n'))
+    return int(lines['id']), json.loads(lines['data'])
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCommentStream:
+
+    def url(self, post):
+        return f'/api/v1/posts/{post.id}/comments/stream/'
+
+    def test_stream_not_auth(self, client, post):
+        response = client.get(self.url(post))
+        assert response.status_code == 401, (
+            'Проверьте, что поток комментариев недоступен '
+            'неавторизованному пользователю.'
+        )
+
+    def test_stream_wsgi_not_implemented(self, user_client, post):
+        response = user_client.get(self.url(post))
+        assert response.status_code == 501, (
+            'Проверьте, что под WSGI поток комментариев не открывается, '
+            'а возвращает статус 501.'
+        )
+        assert not response.streaming
+        assert post.id not in comment_bus.topics
+
+    def test_stream_resume(self, token, post, comment_1_post,
+                           comment_2_post):
+        status, events = read_events(
+            self.url(post), token, 1,
+            headers={'Last-Event-ID': str(comment_1_post.id)}
+        )
+        assert status == 200
+        comment_id, data = parse(events[0])
+        assert comment_id == comment_2_post.id, (
+            'Проверьте, что при заголовке `Last-Event-ID` поток отдаёт '
+            'комментарии, созданные после указанного.'
+        )
+        assert data['text'] == comment_2_post.text
+
+    def test_stream_publishes_new_comment(self, token, post, user):
+        async def publish():
+            comment_bus.publish(post.id, 10 ** 6, {'text': 'Живой'})
+
+        status, events = read_events(self.url(post), token, 1,
+                                     action=publish)
+        assert parse(events[0]) == (10 ** 6, {'text': 'Живой'}), (
+            'Проверьте, что новый комментарий рассылается подписчикам '
+            'поста.'
+        )
+        assert post.id not in comment_bus.topics
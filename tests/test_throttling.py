@@ -0,0 +1,80 @@
+import pytest
+
+from api.throttling import BucketStore, parse_rate
+
+
+class TestTokenBucket:
+
+    def test_parse_rate(self):
+        assert parse_rate('10/min') == (10, 60), (
+            'Проверьте, что частота `10/min` разбирается в (10, 60).'
+        )
+
+    def test_burst_and_refill(self, tmp_path):
+        store = BucketStore(str(tmp_path / 'buckets.sqlite3'))
+        results = [store.take('k', 3, 1.0, now=100)[0] for _ in range(4)]
+        assert results == [True, True, True, False], (
+            'Проверьте, что ведро пропускает всплеск не больше своей ёмкости.'
+        )
+        allowed, wait = store.take('k', 3, 1.0, now=100.25)
+        assert not allowed and wait == pytest.approx(0.75), (
+            'Проверьте, что отказ сообщает точное время до нового жетона.'
+        )
+        assert store.take('k', 3, 1.0, now=101)[0], (
+            'Проверьте, что ведро пополняется со временем.'
+        )
+        assert store.take('other', 3, 1.0, now=100)[0], (
+            'Проверьте, что у разных ключей разные вёдра.'
+        )
+
+    def test_prune_keeps_partial_buckets(self, tmp_path):
+        store = BucketStore(str(tmp_path / 'buckets.sqlite3'))
+        store.take('full', 2, 1.0, now=0)
+        store.take('partial', 2, 1.0, now=10)
+        store.prune(now=10.5)
+        rows = dict(store.connection.execute('SELECT key, tokens FROM bucket'))
+        assert set(rows) == {'partial'}, (
+            'Проверьте, что очистка удаляет только заполнившиеся вёдра.'
+        )
+
+
+@pytest.mark.django_db
+class TestThrottles:
+
+    def test_token_auth_throttled_by_ip(self, client, user, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {'auth': '2/min', 'write': '120/min'},
+        }
+        data = {'username': user.username, 'password': 'wrong'}
+        statuses = [
+            client.post(
+                '/api/v1/api-token-auth/', data,
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{number}'
+            ).status_code
+            for number in range(3)
+        ]
+        assert statuses == [400, 400, 429], (
+            'Проверьте, что выдача токена ограничена по IP-адресу '
+            'и заголовок X-Forwarded-For не обходит ограничение.'
+        )
+        response = client.post('/api/v1/api-token-auth/', data)
+        assert 25 <= int(response['Retry-After']) <= 30, (
+            'Проверьте, что ответ 429 содержит точный заголовок Retry-After.'
+        )
+
+    def test_writes_throttled_per_user(self, user_client, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {'auth': '10/min', 'write': '2/min'},
+        }
+        statuses = [
+            user_client.post('/api/v1/posts/', {'text': 'Пост'}).status_code
+            for _ in range(3)
+        ]
+        assert statuses == [201, 201, 429], (
+            'Проверьте, что запись ограничена для пользователя.'
+        )
+        assert user_client.get('/api/v1/posts/').status_code == 200, (
+            'Проверьте, что чтение не ограничивается.'
+        )
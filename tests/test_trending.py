@@ -0,0 +1,92 @@
+import time
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, PostScore
+from posts.trending import decay_scores
+
+
+@pytest.mark.django_db
+class TestTrending:
+    url = '/api/v1/posts/trending/'
+
+    def comment(self, client, post, times=1):
+        for _ in range(times):
+            response = client.post(
+                f'/api/v1/posts/{post.id}/comments/', {'text': 'Коммент'}
+            )
+            assert response.status_code == 201
+
+    def test_ranked_by_comment_activity(self, user_client, post,
+                                        another_post):
+        self.comment(user_client, post, 1)
+        self.comment(user_client, another_post, 3)
+        response = user_client.get(self.url)
+        assert response.status_code == 200, (
+            'Проверьте, что `/api/v1/posts/trending/` доступен.'
+        )
+        data = response.json()
+        assert [item['id'] for item in data] == [another_post.id, post.id], (
+            'Проверьте, что посты упорядочены по активности комментариев.'
+        )
+        assert data[0]['score'] == pytest.approx(3), (
+            'Проверьте, что каждый новый комментарий увеличивает оценку.'
+        )
+        assert 'comments' not in data[0]
+        for limit in ('²', '-1', 'abc'):
+            response = user_client.get(self.url, {'limit': limit})
+            assert len(response.json()) == 2, (
+                'Проверьте, что некорректный `limit` заменяется '
+                'значением по умолчанию.'
+            )
+        assert len(user_client.get(self.url, {'limit': 1}).json()) == 1
+
+    def test_single_query(self, user_client, post, another_post):
+        self.comment(user_client, post, 2)
+        self.comment(user_client, another_post, 1)
+        user_client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            user_client.get(self.url)
+        selects = [
+            query for query in queries.captured_queries
+            if 'posts_postscore' in query['sql']
+        ]
+        assert len(selects) == 1 and len(queries) <= 2, (
+            'Проверьте, что топ читается одним запросом.'
+        )
+
+    def test_decay(self, post, another_post):
+        now = time.time()
+        PostScore.objects.create(post=post, score=8, decayed_at=now - 7200)
+        PostScore.objects.create(
+            post=another_post, score=0.015, decayed_at=now - 3600
+        )
+        deleted = decay_scores(now=now, half_life=3600, min_score=0.01)
+        assert PostScore.objects.get(post=post).score == pytest.approx(2), (
+            'Проверьте, что оценка убывает вдвое за период полураспада.'
+        )
+        assert deleted == 1 and not PostScore.objects.filter(
+            post=another_post
+        ).exists(), (
+            'Проверьте, что угасшие оценки удаляются.'
+        )
+
+    def test_rebuild(self, post, user):
+        Comment.objects.create(post=post, author=user, text='Коммент')
+        PostScore.objects.all().delete()
+        call_command('decay_trending', rebuild=True)
+        assert PostScore.objects.get(post=post).score == pytest.approx(
+            1, abs=0.01
+        ), (
+            'Проверьте, что `decay_trending --rebuild` пересчитывает '
+            'оценки по комментариям.'
+        )
+
+    def test_hidden_posts_excluded(self, user_client, post, settings):
+        self.comment(user_client, post, 1)
+        post.is_deleted = True
+        post.save(update_fields=['is_deleted'])
+        assert user_client.get(self.url).json() == []
@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from rest_framework.authentication import TokenAuthentication
+
+from posts.caching import get_cache, get_prefix
+
+User = get_user_model()
+
+# Поля в кэше. Пароль и остальные поля пользователя в файл кэша
+# не попадают и догружаются из базы при обращении.
+USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+TOKEN_FIELDS = ('key', 'user_id', 'created')
+
+
+def pack(instance, names):
+    """Значения полей names в порядке полей модели."""
+    return [
+        getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if field.attname in names
+    ]
+
+
+def unpack(model, names, values):
+    return model.from_db(model.objects.db, names, values)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, который берёт токен с пользователем из кэша.
+    Изменение или удаление токена, смена данных или блокировка
+    пользователя меняют версию пространства имён tokens.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = f'{get_prefix("tokens")}:{key}'
+        cache = get_cache()
+        cached = cache.get(cache_key)
+        # Записи старого вида (целый Token) перезаписываются.
+        if isinstance(cached, tuple):
+            return self.restore(*cached)
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, (
+            pack(token, TOKEN_FIELDS), pack(user, USER_FIELDS)
+        ))
+        return user, token
+
+    def restore(self, token_values, user_values):
+        user = unpack(User, USER_FIELDS, user_values)
+        token = unpack(self.get_model(), TOKEN_FIELDS, token_values)
+        token.user = user
+        return user, token
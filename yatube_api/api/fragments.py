@@ -0,0 +1,98 @@
+"""
+Ответы из готовых фрагментов JSON.
+
+Пост сериализуется один раз после изменения, а списки и карточка
+склеиваются из сохранённых байтов (posts.fragments). Сериализатор
+работает только для промахов, так что нагрузка на CPU при чтении
+растёт с частотой записей, а не чтений.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from posts.fragments import load_fragments, store_fragments
+from .singleflight import SingleFlight
+
+PLACEHOLDER = '\x00raw:{}\x00'
+
+fragment_flight = SingleFlight('post-fragment')
+
+
+class RawJSON(bytes):
+    """Уже отрисованный JSON, вставляется в ответ как есть."""
+
+    @classmethod
+    def array(cls, items):
+        return cls(b'[' + b','.join(items) + b']')
+
+
+class FragmentJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer, который понимает RawJSON как весь ответ или
+    как значение ключа верхнего уровня (results у пагинации).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, RawJSON):
+            return bytes(data)
+        raw = {}
+        if isinstance(data, dict):
+            raw = {
+                key: value for key, value in data.items()
+                if isinstance(value, RawJSON)
+            }
+        if not raw:
+            return super().render(data, accepted_media_type, renderer_context)
+        data = {
+            key: PLACEHOLDER.format(key) if key in raw else value
+            for key, value in data.items()
+        }
+        content = super().render(data, accepted_media_type, renderer_context)
+        for key, value in raw.items():
+            content = content.replace(
+                json.dumps(PLACEHOLDER.format(key)).encode(), value
+            )
+        return content
+
+
+def get_post_fragments(request, ids, queryset, serializer_class):
+    """
+    {id: bytes} для видимых постов из ids. Промахи загружаются из
+    queryset, сериализуются и сохраняются; один и тот же пост
+    одновременно отрисовывает только один запрос.
+    """
+    origin = request.build_absolute_uri('/')
+    fragments, stale, stamps = load_fragments(ids, origin)
+    misses = [pk for pk in ids if pk not in fragments]
+    if not misses:
+        return fragments
+    # Метка в ключе: после записи в пост начнётся новое вычисление.
+    keys = {f'{origin}|{pk}:{stamps.get(pk)}': pk for pk in misses}
+
+    def render(keys_to_render):
+        posts = queryset.in_bulk([keys[key] for key in keys_to_render])
+        renderer = JSONRenderer()
+        rendered = {}
+        for pk, post in posts.items():
+            rendered[pk] = (
+                origin if post.image else '',
+                renderer.render(
+                    serializer_class(post, context={'request': request}).data
+                )
+            )
+        store_fragments(rendered, stamps)
+        return {
+            key: rendered[keys[key]][1] if keys[key] in rendered else None
+            for key in keys_to_render
+        }
+
+    if not getattr(settings, 'FRAGMENT_STALE_WHILE_REVALIDATE', False):
+        stale = {}
+    results = fragment_flight.run(keys, render, stale={
+        key: stale[pk] for key, pk in keys.items() if pk in stale
+    })
+    for key, data in results.items():
+        if data is not None:
+            fragments[keys[key]] = data
+    return fragments
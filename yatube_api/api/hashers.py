@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    pbkdf2_sha256 с числом итераций из PASSWORD_ITERATIONS.
+    Хеш с меньшим числом пересчитывается при следующем входе,
+    с большим - остаётся как есть.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_ITERATIONS', None) or (
+            super().iterations
+        )
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return decoded['iterations'] < self.iterations or (
+            hashers.must_update_salt(decoded['salt'], self.salt_entropy)
+        )
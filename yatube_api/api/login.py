@@ -0,0 +1,176 @@
+"""
+Асинхронная выдача токена (/api/v1/api-token-auth/).
+
+PBKDF2 намеренно медленный, и в потоке запроса всплеск входов занимал
+бы весь воркер. Здесь хеш считается в отдельном пуле из
+LOGIN_HASHING['WORKERS'] потоков: hashlib отпускает GIL, так что
+остальные запросы процесса не ждут. В очереди к пулу стоят не больше
+MAX_PENDING входов, остальным сразу отвечает 503. Клиент, пришедший
+с действующим токеном, получает его обратно без проверки пароля.
+"""
+import asyncio
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password, verify_password
+from django.http import JsonResponse
+from django.utils.translation import gettext as _
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import (APIException, AuthenticationFailed,
+                                       MethodNotAllowed, Throttled)
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .authentication import CachedTokenAuthentication
+from .serializers import CredentialsSerializer
+from .throttling import AuthRateThrottle
+
+User = get_user_model()
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'MAX_PENDING': 32,
+    'RETRY_AFTER': 1,
+}
+
+
+def get_option(name):
+    return getattr(settings, 'LOGIN_HASHING', {}).get(name, DEFAULTS[name])
+
+
+class Overloaded(Exception):
+    """В очереди к пулу хеширования нет места."""
+
+
+class HashingPool:
+    """Пул потоков для хеширования паролей с ограниченной очередью."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.executor = None
+        self.owner = None
+
+    def get_executor(self):
+        # Потоки пула не переживают fork: воркер заводит свой.
+        with self.lock:
+            if self.owner != os.getpid():
+                self.executor = ThreadPoolExecutor(
+                    get_option('WORKERS'), thread_name_prefix='hashing'
+                )
+                self.owner = os.getpid()
+            return self.executor
+
+    async def run(self, func, *args):
+        executor = self.get_executor()
+        with self.lock:
+            if self.pending >= get_option('MAX_PENDING'):
+                raise Overloaded
+            self.pending += 1
+        try:
+            return await asyncio.wrap_future(executor.submit(func, *args))
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+
+hashing_pool = HashingPool()
+
+
+def check_password(password, encoded):
+    """
+    (верен ли пароль, новый хеш или None). Выполняется в пуле;
+    для несуществующего пользователя хеш всё равно считается.
+    """
+    is_correct, must_update = verify_password(password, encoded)
+    if is_correct and must_update:
+        return True, make_password(password)
+    return is_correct, None
+
+
+def error_response(error):
+    headers = {}
+    if isinstance(error, Throttled) and error.wait is not None:
+        headers['Retry-After'] = str(math.ceil(error.wait))
+    if isinstance(error, MethodNotAllowed):
+        headers['Allow'] = 'POST'
+    detail = error.detail
+    if not isinstance(detail, (dict, list)):
+        detail = {'detail': detail}
+    return JsonResponse(
+        detail, status=error.status_code, headers=headers, safe=False
+    )
+
+
+@sync_to_async
+def prepare(request):
+    """
+    Троттлинг, разбор тела и поиск пользователя:
+    (ключ токена из заголовка или None, пользователь, пароль).
+    """
+    throttle = AuthRateThrottle()
+    if not throttle.allow_request(request, None):
+        raise Throttled(throttle.wait())
+    drf_request = Request(
+        request,
+        parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+        authenticators=[CachedTokenAuthentication()]
+    )
+    serializer = CredentialsSerializer(data=drf_request.data)
+    serializer.is_valid(raise_exception=True)
+    username = serializer.validated_data['username']
+    try:
+        token = drf_request.auth
+    except AuthenticationFailed:
+        # Недействительный токен не мешает войти по паролю.
+        token = None
+    if token is not None and token.user.get_username() == username:
+        return token.key, None, None
+    try:
+        user = User._default_manager.get_by_natural_key(username)
+    except User.DoesNotExist:
+        user = None
+    return None, user, serializer.validated_data['password']
+
+
+@sync_to_async
+def issue_token(user, encoded):
+    if encoded is not None:
+        user.password = encoded
+        user.save(update_fields=['password'])
+    token, created = Token.objects.get_or_create(user=user)
+    return token.key
+
+
+@csrf_exempt
+async def obtain_auth_token(request):
+    """Токен по имени и паролю, с тем же ответом, что у ObtainAuthToken."""
+    try:
+        if request.method != 'POST':
+            raise MethodNotAllowed(request.method)
+        key, user, password = await prepare(request)
+    except APIException as error:
+        return error_response(error)
+    if key is not None:
+        return JsonResponse({'token': key})
+    try:
+        is_correct, encoded = await hashing_pool.run(
+            check_password, password, user.password if user else ''
+        )
+    except Overloaded:
+        return JsonResponse(
+            {'detail': 'Сервер перегружен, повторите запрос позже.'},
+            status=503,
+            headers={'Retry-After': str(get_option('RETRY_AFTER'))}
+        )
+    if not is_correct or not user.is_active:
+        return JsonResponse({api_settings.NON_FIELD_ERRORS_KEY: [
+            _('Unable to log in with provided credentials.')
+        ]}, status=400)
+    return JsonResponse({'token': await issue_token(user, encoded)})
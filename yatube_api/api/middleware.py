@@ -0,0 +1,323 @@
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-ndjson',
+    'image/svg+xml',
+)
+ZLIB_WBITS = {'gzip': 31, 'deflate': 15}
+
+
+def parse_accept_encoding(header):
+    """Допустимые кодировки из Accept-Encoding с их весами q."""
+    codings = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        codings[coding] = weight
+    return codings
+
+
+class ZlibEncoder:
+    def __init__(self, coding, level):
+        self.compressor = zlib.compressobj(
+            level, zlib.DEFLATED, ZLIB_WBITS[coding]
+        )
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush_block(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class ZstdEncoder:
+    def __init__(self, coding, level):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush_block(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def get_encoder(coding, level):
+    if coding == 'zstd':
+        return ZstdEncoder(coding, level)
+    return ZlibEncoder(coding, level)
+
+
+def compress_body(content, coding, level):
+    encoder = get_encoder(coding, level)
+    return encoder.compress(content) + encoder.finish()
+
+
+def compress_chunks(chunks, encoder):
+    # Каждый фрагмент выталкивается сразу: события потока (SSE)
+    # не должны задерживаться в буфере компрессора.
+    for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush_block()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+async def acompress_chunks(chunks, encoder):
+    async for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush_block()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает ответы gzip, deflate или zstd (если установлен zstandard)
+    по заголовку Accept-Encoding. Короткие тела и уже сжатые форматы
+    не трогает, потоковые ответы сжимает по мере отдачи.
+
+    Чтобы кешировать сжатую форму, ставьте middleware ниже
+    UpdateCacheMiddleware: из-за Vary: Accept-Encoding кеш хранит
+    отдельную копию ответа на каждую кодировку.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.levels = {
+            'gzip': 6, 'deflate': 6, 'zstd': 3,
+            **getattr(settings, 'COMPRESSION_LEVELS', {}),
+        }
+        self.codings = ('zstd', 'gzip', 'deflate') if zstandard else (
+            'gzip', 'deflate'
+        )
+
+    def choose_coding(self, request):
+        accepted = parse_accept_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        wildcard = accepted.get('*', 0.0)
+        best, best_weight = None, 0.0
+        # При равных весах выигрывает кодировка, стоящая раньше в списке.
+        for coding in self.codings:
+            weight = accepted.get(coding, wildcard)
+            if weight > best_weight:
+                best, best_weight = coding, weight
+        return best
+
+    def is_compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        if not 200 <= response.status_code < 300 or (
+            response.status_code == 206
+        ):
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        content_type = response.get('Content-Type', '').lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def process_response(self, request, response):
+        if not self.is_compressible(response):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = self.choose_coding(request)
+        if coding is None:
+            return response
+        level = self.levels[coding]
+
+        if response.streaming:
+            encoder = get_encoder(coding, level)
+            if response.is_async:
+                response.streaming_content = acompress_chunks(
+                    response.streaming_content, encoder
+                )
+            else:
+                response.streaming_content = compress_chunks(
+                    response.streaming_content, encoder
+                )
+            del response.headers['Content-Length']
+        else:
+            compressed = compress_body(response.content, coding, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = coding
+        return response
+
+
+HIGH = 'high'
+NORMAL = 'normal'
+LOW = 'low'
+# Страница списка больше этого считается тяжёлой.
+LARGE_PAGE = 100
+
+
+def parse_request_start(header, now):
+    """
+    Время постановки запроса в очередь из X-Request-Start,
+    который проставляет прокси: `t=<секунды, мс или мкс>`.
+    """
+    value = header.removeprefix('t=').strip()
+    try:
+        started = float(value)
+    except ValueError:
+        return None
+    # Единицы определяются по порядку величины.
+    while started > now * 100:
+        started /= 1000
+    return started
+
+
+def get_priority(request, view_func):
+    """
+    Запись и чтение одного объекта дешевы и важны - high.
+    Анонимы, опрос журнала, большие страницы списков и выгрузки
+    админки - low. Представление может задать load_priority само.
+    """
+    view_class = getattr(view_func, 'cls', view_func)
+    priority = getattr(view_class, 'load_priority', None)
+    if priority is not None:
+        return priority
+    # Действие админки - POST, но выгрузка читает таблицу целиком.
+    model_admin = getattr(view_func, 'model_admin', None)
+    if model_admin is not None and request.method == 'POST' and (
+        request.POST.get('action')
+        in getattr(model_admin, 'low_priority_actions', ())
+    ):
+        return LOW
+    if request.method not in SAFE_METHODS:
+        return HIGH
+    if 'HTTP_AUTHORIZATION' not in request.META and (
+        settings.SESSION_COOKIE_NAME not in request.COOKIES
+    ):
+        return LOW
+    action = getattr(view_func, 'actions', {}).get(request.method.lower())
+    if action == 'retrieve':
+        return HIGH
+    if action == 'list' and 'ids' not in request.GET:
+        try:
+            limit = int(request.GET['limit'])
+        except (KeyError, ValueError):
+            return LOW
+        # Без верного limit пагинация отдаёт список целиком.
+        if not 0 < limit <= LARGE_PAGE:
+            return LOW
+    return NORMAL
+
+
+class LoadSheddingMiddleware(MiddlewareMixin):
+    """
+    Отказывает 503 с Retry-After, пока процесс перегружен: запросов
+    в работе больше порога или запрос слишком долго ждал в очереди
+    перед прокси-сервером (по X-Request-Start). Пороги задаются на
+    приоритет в LOAD_SHEDDING; приоритет без порогов не отклоняется.
+
+    Если очередь ни разу не опускалась ниже TARGET_QUEUE_DELAY за
+    OVERLOAD_INTERVAL, это уже не всплеск, а стоячая очередь (как в
+    CoDel), и действуют короткие пороги OVERLOAD_QUEUE_DELAY.
+    Так задержка обслуженных запросов не растёт до длинного порога.
+
+    Под manage.py serve воркер обслуживает один запрос за раз, поэтому
+    там работают только пороги ожидания в очереди.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        config = getattr(settings, 'LOAD_SHEDDING', {})
+        self.max_in_flight = config.get('MAX_IN_FLIGHT', {})
+        self.max_queue_delay = config.get('MAX_QUEUE_DELAY', {})
+        self.overload_queue_delay = {
+            **self.max_queue_delay,
+            **config.get('OVERLOAD_QUEUE_DELAY', {}),
+        }
+        self.target = config.get('TARGET_QUEUE_DELAY', 0.05)
+        self.interval = config.get('OVERLOAD_INTERVAL', 0.5)
+        self.retry_after = config.get('RETRY_AFTER', 1)
+        self.in_flight = 0
+        self.drained_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def process_request(self, request):
+        with self.lock:
+            self.in_flight += 1
+        request._load_shedding = True
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        priority = get_priority(request, view_func)
+        limit = self.max_in_flight.get(priority)
+        if limit is not None and self.in_flight > limit:
+            return self.reject()
+        header = request.META.get('HTTP_X_REQUEST_START')
+        if not header:
+            return None
+        now = time.time()
+        started = parse_request_start(header, now)
+        if started is None:
+            return None
+        delay = now - started
+        limit = self.get_queue_delay_limit(priority, delay)
+        if limit is not None and delay > limit:
+            return self.reject()
+        return None
+
+    def get_queue_delay_limit(self, priority, delay):
+        now = time.monotonic()
+        if delay < self.target:
+            self.drained_at = now
+        if now - self.drained_at > self.interval:
+            return self.overload_queue_delay.get(priority)
+        return self.max_queue_delay.get(priority)
+
+    def process_response(self, request, response):
+        if getattr(request, '_load_shedding', False):
+            request._load_shedding = False
+            with self.lock:
+                self.in_flight -= 1
+        return response
+
+    def reject(self):
+        return JsonResponse(
+            {'detail': 'Сервер перегружен, повторите запрос позже.'},
+            status=503,
+            headers={'Retry-After': str(self.retry_after)},
+        )
@@ -0,0 +1,58 @@
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from posts.counters import count_rows
+
+
+class CountedLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Пагинация limit/offset, которая не делает COUNT(*) на каждой странице.
+    Число строк берётся из count_rows, поле `count_exact` в ответе
+    говорит, точное оно или оценочное. Без `limit` список не делится.
+    """
+    count_strategy = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.row_count = count_rows(queryset, self.count_strategy)
+        self.count = self.row_count.value
+        # Есть ли следующая страница, узнаём по лишней строке,
+        # потому что оценка числа строк может ошибаться.
+        page = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(page) > self.limit
+        if self.template is not None and (
+            self.has_next or self.offset > 0
+        ):
+            self.display_page_controls = True
+        return page[:self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'count_exact': self.row_count.exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_exact'] = {
+            'type': 'boolean',
+            'example': True,
+        }
+        return response_schema
@@ -0,0 +1,250 @@
+"""
+Профилирование отдельного запроса для сотрудников (is_staff).
+
+К запросу к /api/ добавляется ?_profile=<режим> или заголовок
+X-Profile: <режим>:
+- 1 или text - текстовый отчёт: время по слоям (DRF, ORM, SQL,
+  сериализаторы, рендереры), SQL-запросы с длительностью и функции
+  по совокупному времени;
+- pstats - файл для pstats, snakeviz, gprof2dot;
+- collapsed - стеки в формате flamegraph.pl и speedscope
+  (сэмплирование, без накладных расходов cProfile);
+- timing - обычный ответ с заголовком Server-Timing.
+
+Без параметра и заголовка стоимость - одна проверка строки запроса.
+Под ASGI запросы не профилируются.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE'
+PATH_PREFIX = '/api/'
+MODES = ('text', 'pstats', 'collapsed', 'timing')
+SAMPLE_INTERVAL = 0.001
+TOP_FUNCTIONS = 40
+
+# Слой функции по пути к файлу; проверяются по порядку.
+LAYERS = (
+    ('serializers', (
+        'rest_framework/serializers.py', 'rest_framework/fields.py',
+        'rest_framework/relations.py', 'api/serializers.py',
+    )),
+    ('renderers', ('rest_framework/renderers.py', '/json/')),
+    ('orm', ('django/db/',)),
+    ('drf', ('rest_framework/',)),
+    ('django', ('django/',)),
+)
+
+
+def get_mode(request):
+    if PARAM in request.META.get('QUERY_STRING', ''):
+        mode = request.GET.get(PARAM)
+    else:
+        mode = request.META.get(HEADER)
+    if not mode or not request.path_info.startswith(PATH_PREFIX):
+        return None
+    if mode in ('1', 'true'):
+        return 'text'
+    return mode if mode in MODES else None
+
+
+def is_staff(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        drf_request = Request(request, authenticators=[
+            authenticator()
+            for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ])
+        try:
+            user = drf_request.user
+        except APIException:
+            return False
+    return user.is_staff
+
+
+def get_layer(filename, name):
+    if 'sqlite3' in name or 'psycopg' in name:
+        return 'sql'
+    for layer, markers in LAYERS:
+        if any(marker in filename for marker in markers):
+            return layer
+    if filename.startswith(str(settings.BASE_DIR)):
+        return 'app'
+    return 'other'
+
+
+class QueryLog:
+    """Все SQL-запросы запроса с длительностью (execute_wrapper)."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - started, sql))
+
+    @property
+    def total(self):
+        return sum(duration for duration, _ in self.queries)
+
+
+class StackSampler:
+    """Снимает стек потока запроса каждые SAMPLE_INTERVAL секунд."""
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                filename = code.co_filename.rsplit('site-packages/', 1)[-1]
+                stack.append(
+                    f'{code.co_name} ({filename}:{code.co_firstlineno})'
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(
+            f'{stack} {count}\n' for stack, count in self.stacks.items()
+        )
+
+
+def split_by_layer(stats):
+    layers = defaultdict(float)
+    for (filename, _, name), (_, _, tottime, _, _) in stats.stats.items():
+        layers[get_layer(filename, name)] += tottime
+    return sorted(layers.items(), key=lambda item: -item[1])
+
+
+def text_report(request, response, elapsed, profiler, queries):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    out = stats.stream
+    out.write(
+        f'{request.method} {request.get_full_path()} -> '
+        f'{response.status_code}, {elapsed * 1000:.1f} ms '
+        '(с накладными расходами cProfile)\n\n'
+        'Время по слоям (собственное время функций):\n'
+    )
+    total = sum(seconds for _, seconds in split_by_layer(stats)) or 1
+    for layer, seconds in split_by_layer(stats):
+        out.write(
+            f'  {layer:<12} {seconds * 1000:8.1f} ms '
+            f'{seconds * 100 / total:4.0f}%\n'
+        )
+    out.write(
+        f'\nSQL: {len(queries.queries)} запросов, '
+        f'{queries.total * 1000:.1f} ms\n'
+    )
+    for duration, sql in queries.queries:
+        out.write(f'  {duration * 1000:8.2f} ms  {sql}\n')
+    out.write('\nФункции по совокупному времени:\n')
+    stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+    return HttpResponse(out.getvalue(), content_type='text/plain')
+
+
+def pstats_response(request, profiler):
+    profiler.create_stats()
+    name = request.path_info.strip('/').replace('/', '-') or 'root'
+    response = HttpResponse(
+        marshal.dumps(profiler.stats),
+        content_type='application/octet-stream'
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{name}.pstats"'
+    )
+    return response
+
+
+def add_server_timing(response, elapsed, profiler, queries):
+    stats = pstats.Stats(profiler)
+    entries = [
+        f'{layer};dur={seconds * 1000:.2f}'
+        for layer, seconds in split_by_layer(stats)
+    ]
+    entries.append(
+        f'queries;dur={queries.total * 1000:.2f};'
+        f'desc="{len(queries.queries)}"'
+    )
+    entries.append(f'total;dur={elapsed * 1000:.2f}')
+    response['Server-Timing'] = ', '.join(entries)
+    return response
+
+
+class ProfilingMiddleware:
+    """Профиль запроса по ?_profile= или X-Profile для сотрудников."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.get_response(request)
+        mode = get_mode(request)
+        if mode is None or not is_staff(request):
+            return self.get_response(request)
+        if mode == 'collapsed':
+            with StackSampler(threading.get_ident()) as sampler:
+                self.get_response(request)
+            return HttpResponse(
+                sampler.collapsed(), content_type='text/plain'
+            )
+        return self.profile(request, mode)
+
+    def profile(self, request, mode):
+        queries = QueryLog()
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            elapsed = time.perf_counter() - started
+        if mode == 'pstats':
+            return pstats_response(request, profiler)
+        if mode == 'timing':
+            return add_server_timing(response, elapsed, profiler, queries)
+        return text_report(request, response, elapsed, profiler, queries)
@@ -1,7 +1,40 @@
+from django.db import models
 from rest_framework import serializers
+from rest_framework.authtoken.serializers import AuthTokenSerializer
+from rest_framework.serializers import raise_errors_on_nested_writes
 from posts.models import Post, Group, Comment
 
 
+class ChangedFieldsMixin:
+    """
+    Изменение сохраняет только поля, значения которых поменялись
+    (save(update_fields=...)); без изменений объект не сохраняется.
+    """
+
+    def is_changed(self, instance, name, value):
+        field = instance._meta.get_field(name)
+        if field.is_relation:
+            # Сравнение по id не загружает связанный объект.
+            return getattr(instance, field.attname) != getattr(
+                value, 'pk', value
+            )
+        if isinstance(field, models.FileField):
+            return True
+        return getattr(instance, name) != value
+
+    def update(self, instance, validated_data):
+        raise_errors_on_nested_writes('update', self, validated_data)
+        changed = [
+            name for name, value in validated_data.items()
+            if self.is_changed(instance, name, value)
+        ]
+        for name in changed:
+            setattr(instance, name, validated_data[name])
+        if changed:
+            instance.save(update_fields=changed)
+        return instance
+
+
 class GroupSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -9,7 +42,7 @@ class GroupSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'slug', 'description')
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(ChangedFieldsMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
@@ -21,7 +54,7 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ('post',)
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(ChangedFieldsMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
@@ -37,3 +70,26 @@ class PostSerializer(serializers.ModelSerializer):
             'id', 'text', 'author', 'image',
             'group', 'pub_date', 'comments'
         )
+
+
+class SyncPostSerializer(PostSerializer):
+    """Пост без вложенных комментариев: они синхронизируются отдельно."""
+    comments = None
+
+    class Meta(PostSerializer.Meta):
+        fields = ('id', 'text', 'author', 'image', 'group', 'pub_date')
+
+
+class TrendingPostSerializer(SyncPostSerializer):
+    """Пост из топа с его оценкой, без вложенных комментариев."""
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(SyncPostSerializer.Meta):
+        fields = SyncPostSerializer.Meta.fields + ('score',)
+
+
+class CredentialsSerializer(AuthTokenSerializer):
+    """Поля AuthTokenSerializer; пароль проверяет api.login в пуле."""
+
+    def validate(self, attrs):
+        return attrs
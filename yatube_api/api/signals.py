@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from posts.caching import bump_versions
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+@receiver(post_delete, sender=User)
+def invalidate_tokens(sender, **kwargs):
+    bump_versions(['tokens'])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, update_fields,
+                           **kwargs):
+    # У нового пользователя токенов в кэше нет, вход обновляет
+    # только last_login.
+    if created or update_fields and set(update_fields) == {'last_login'}:
+        return
+    bump_versions(['tokens'])
@@ -0,0 +1,159 @@
+"""
+Single flight: одно вычисление на ключ одновременно.
+
+Когда запись в кэше пропадает, параллельные запросы не пересчитывают
+её все сразу. В процессе первый поток заводит Flight, остальные ждут
+его результата. Между воркерами тот же ключ защищён короткой
+блокировкой cache.add в общем кэше (SINGLE_FLIGHT['CACHE']): воркер
+без блокировки ждёт результата, который лидер кладёт в тот же кэш.
+Не дождавшись за WAIT_TIMEOUT, запрос считает значение сам.
+
+Если для ключа есть устаревшее значение, ожидающие сразу получают его
+(stale-while-revalidate), а пересчитывает только лидер.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+MISSING = object()
+DEFAULTS = {
+    'CACHE': 'default',
+    # Сколько живёт блокировка упавшего лидера.
+    'LOCK_TIMEOUT': 10,
+    'WAIT_TIMEOUT': 5,
+    'RESULT_TIMEOUT': 30,
+    'POLL_INTERVAL': 0.005,
+}
+
+
+def get_option(name):
+    return getattr(settings, 'SINGLE_FLIGHT', {}).get(name, DEFAULTS[name])
+
+
+class Flight:
+    """Вычисление одного ключа в этом процессе."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = MISSING
+
+    def resolve(self, value):
+        self.value = value
+        self.done.set()
+
+
+class SingleFlight:
+    """
+    Группа ключей с общим префиксом. run(keys, compute) возвращает
+    {ключ: значение}; compute(keys) получает только ключи, которые
+    сейчас никто больше не считает, и возвращает словарь значений.
+    Значения должны сериализоваться кэшем (pickle).
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    @property
+    def cache(self):
+        return caches[get_option('CACHE')]
+
+    def lock_key(self, key):
+        return f'flight:{self.prefix}:{key}:lock'
+
+    def result_key(self, key):
+        return f'flight:{self.prefix}:{key}'
+
+    def join(self, key):
+        """(Flight, свой ли он) для ключа."""
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self.flights[key] = Flight()
+            return flight, True
+
+    def finish(self, key, flight, value):
+        with self.lock:
+            self.flights.pop(key, None)
+        flight.resolve(value)
+
+    def claim(self, keys):
+        """
+        Делит ключи: свои с блокировкой в кэше, свои, которые считает
+        другой воркер, и чужие Flight этого процесса.
+        """
+        owned, leading, remote, waiting = {}, [], [], {}
+        for key in keys:
+            flight, own = self.join(key)
+            if not own:
+                waiting[key] = flight
+                continue
+            owned[key] = flight
+            if self.cache.add(
+                self.lock_key(key), 1, get_option('LOCK_TIMEOUT')
+            ):
+                leading.append(key)
+            else:
+                remote.append(key)
+        return owned, leading, remote, waiting
+
+    def run(self, keys, compute, stale=None):
+        stale = stale or {}
+        owned, leading, remote, waiting = self.claim(keys)
+        results = {}
+        try:
+            if leading:
+                results.update(self.compute(leading, compute))
+            for key in remote:
+                results[key] = stale.get(key, MISSING)
+                if results[key] is MISSING:
+                    results[key] = self.wait_remote(key)
+            self.compute_missing(results, compute)
+        finally:
+            for key, flight in owned.items():
+                self.finish(key, flight, results.get(key, MISSING))
+        for key, flight in waiting.items():
+            results[key] = stale.get(key, MISSING)
+            if results[key] is MISSING and flight.done.wait(
+                get_option('WAIT_TIMEOUT')
+            ):
+                results[key] = flight.value
+        self.compute_missing(results, compute)
+        return results
+
+    def compute(self, keys, compute):
+        """Лидер считает и публикует значения для других воркеров."""
+        try:
+            values = compute(keys)
+            self.cache.set_many(
+                {self.result_key(key): values.get(key) for key in keys},
+                get_option('RESULT_TIMEOUT')
+            )
+        finally:
+            self.cache.delete_many([self.lock_key(key) for key in keys])
+        return values
+
+    def compute_missing(self, results, compute):
+        # Результата не дождались или лидер упал: считаем сами.
+        missing = [key for key, value in results.items() if value is MISSING]
+        if missing:
+            results.update(compute(missing))
+
+    def wait_remote(self, key):
+        """Результат лидера из другого воркера или MISSING."""
+        deadline = time.monotonic() + get_option('WAIT_TIMEOUT')
+        interval = get_option('POLL_INTERVAL')
+        while time.monotonic() < deadline:
+            value = self.cache.get(self.result_key(key), MISSING)
+            if value is not MISSING:
+                return value
+            if self.cache.get(self.lock_key(key)) is None:
+                # Лидер закончил без результата или блокировка истекла.
+                return self.cache.get(self.result_key(key), MISSING)
+            time.sleep(interval)
+            interval = min(interval * 2, 0.1)
+        return MISSING
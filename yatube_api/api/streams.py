@@ -0,0 +1,242 @@
+"""
+Server-Sent Events с новыми комментариями поста.
+
+Поток отдаётся асинхронно и требует ASGI-сервера (yatube_api.asgi):
+под WSGI бесконечный поток занял бы поток или процесс воркера
+навсегда, а клиент не получил бы ни одного события, поэтому там
+отвечаем 501.
+Комментарии, созданные в этом процессе, рассылаются сразу через
+CommentBus. Комментарии других воркеров подхватывает один опрос базы
+на пост раз в POLL_INTERVAL секунд, сколько бы ни было подписчиков.
+"""
+import asyncio
+import json
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from posts.models import Comment, Post
+from .serializers import CommentSerializer
+
+BUFFER_SIZE = 100
+POLL_INTERVAL = 2.0
+KEEPALIVE_INTERVAL = 15.0
+# Сколько комментариев отдаётся из базы при возобновлении потока.
+RESUME_LIMIT = 500
+
+
+class Topic:
+    """Общее для всех подписчиков поста кольцо последних комментариев."""
+    __slots__ = (
+        'post_id', 'events', 'seq', 'changed', 'subscribers',
+        'polled_id', 'poller',
+    )
+
+    def __init__(self, post_id):
+        self.post_id = post_id
+        # Элементы: (локальный номер, id комментария, данные).
+        self.events = deque(maxlen=BUFFER_SIZE)
+        self.seq = 0
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.polled_id = None
+        self.poller = None
+
+    def append(self, comment_id, data):
+        if any(event[1] == comment_id for event in self.events):
+            return
+        self.seq += 1
+        self.events.append((self.seq, comment_id, data))
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def since(self, seq):
+        """События после локального номера и признак пропуска."""
+        if not self.events:
+            return [], False
+        lost = seq < self.events[0][0] - 1
+        return [event for event in self.events if event[0] > seq], lost
+
+
+async def fetch_comments(post_id, after_id, limit=RESUME_LIMIT):
+    comments = [
+        comment async for comment in Comment.objects.select_related(
+            'author'
+        ).filter(post_id=post_id, id__gt=after_id).order_by('id')[:limit]
+    ]
+    return [
+        (comment.id, CommentSerializer(comment).data)
+        for comment in comments
+    ]
+
+
+def format_event(comment_id, data):
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'id: {comment_id}\nevent: comment\ndata: {payload}\n\n'
+
+
+class Subscription:
+    """Позиция одного подписчика в кольце поста."""
+    __slots__ = ('topic', 'seq', 'last_id', 'fetched')
+
+    def __init__(self, topic, last_event_id=None):
+        self.topic = topic
+        self.seq = topic.seq
+        self.last_id = last_event_id or 0
+        # Комментарии, уже отданные из базы, в кольце пропускаются.
+        self.fetched = set()
+
+    async def backlog(self):
+        chunks = []
+        for comment_id, data in await fetch_comments(
+            self.topic.post_id, self.last_id
+        ):
+            self.fetched.add(comment_id)
+            self.last_id = comment_id
+            chunks.append(format_event(comment_id, data))
+        return chunks
+
+    async def pending(self):
+        events, lost = self.topic.since(self.seq)
+        chunks = []
+        if lost and self.last_id:
+            # Подписчик отстал больше, чем на размер кольца.
+            chunks = await self.backlog()
+        for seq, comment_id, data in events:
+            self.seq = seq
+            if comment_id in self.fetched:
+                continue
+            self.last_id = max(self.last_id, comment_id)
+            chunks.append(format_event(comment_id, data))
+        return chunks
+
+
+class CommentBus:
+    """Внутрипроцессная рассылка новых комментариев подписчикам постов."""
+
+    def __init__(self):
+        self.topics = {}
+        self.loop = None
+
+    def publish(self, post_id, comment_id, data):
+        """Потокобезопасно: вызывается из синхронных представлений."""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(
+            self._append, int(post_id), comment_id, data
+        )
+
+    def _append(self, post_id, comment_id, data):
+        topic = self.topics.get(post_id)
+        if topic is not None:
+            topic.append(comment_id, data)
+
+    def subscribe(self, post_id):
+        self.loop = asyncio.get_running_loop()
+        topic = self.topics.get(post_id)
+        if topic is None:
+            topic = self.topics[post_id] = Topic(post_id)
+            topic.poller = asyncio.create_task(self.poll(topic))
+        topic.subscribers += 1
+        return topic
+
+    def unsubscribe(self, topic):
+        topic.subscribers -= 1
+        if not topic.subscribers:
+            topic.poller.cancel()
+            del self.topics[topic.post_id]
+
+    async def poll(self, topic):
+        """Подхватывает комментарии, созданные другими воркерами."""
+        last = await Comment.objects.filter(post_id=topic.post_id).order_by(
+            '-id'
+        ).values_list('id', flat=True).afirst()
+        topic.polled_id = last or 0
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            for comment_id, data in await fetch_comments(
+                topic.post_id, topic.polled_id
+            ):
+                topic.polled_id = comment_id
+                topic.append(comment_id, data)
+
+    async def events(self, post_id, last_event_id=None):
+        topic = self.subscribe(post_id)
+        subscription = Subscription(topic, last_event_id)
+        try:
+            if last_event_id is not None:
+                for chunk in await subscription.backlog():
+                    yield chunk
+            while True:
+                changed = topic.changed
+                for chunk in await subscription.pending():
+                    yield chunk
+                try:
+                    await asyncio.wait_for(
+                        changed.wait(), KEEPALIVE_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+        finally:
+            self.unsubscribe(topic)
+
+
+comment_bus = CommentBus()
+
+
+def publish_comment(comment, data):
+    """Рассылает комментарий после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: comment_bus.publish(comment.post_id, comment.id, data)
+    )
+
+
+@sync_to_async
+def authenticate(request):
+    drf_request = Request(request, authenticators=[
+        authenticator()
+        for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    return drf_request.user
+
+
+async def comment_stream(request, post_pk):
+    """SSE-поток новых комментариев поста с поддержкой Last-Event-ID."""
+    try:
+        user = await authenticate(request)
+    except APIException as error:
+        return JsonResponse({'detail': error.detail}, status=401)
+    if not user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Учетные данные не были предоставлены.'},
+            status=401,
+            headers={'WWW-Authenticate': 'Token'}
+        )
+    if not await Post.objects.filter(pk=post_pk).aexists():
+        raise Http404
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'detail': 'Поток комментариев доступен только под ASGI.'},
+            status=501
+        )
+    last_event_id = request.headers.get(
+        'Last-Event-ID', request.GET.get('last_event_id')
+    )
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    response = StreamingHttpResponse(
+        comment_bus.events(int(post_pk), last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,172 @@
+"""
+Троттлинг по алгоритму token bucket.
+
+Ведро на пару (scope, клиент) вмещает N жетонов и пополняется со
+скоростью N за период из DEFAULT_THROTTLE_RATES ('10/min'), так что
+допускается всплеск до N запросов. Вёдра лежат в отдельном файле
+SQLite (THROTTLE_STORE_PATH), общем для всех воркеров, и не
+занимают блокировку записи основной базы. Проверка - один UPSERT
+по первичному ключу в режиме автокоммита.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Раз в столько проверок процесс удаляет заполнившиеся вёдра.
+PRUNE_EVERY = 1000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    full_at REAL NOT NULL
+) WITHOUT ROWID
+'''
+# Ведро пополняется за прошедшее время и отдаёт жетон, только если
+# в нём есть целый. Иначе строка не меняется и RETURNING пуст.
+TAKE = '''
+INSERT INTO bucket (key, tokens, updated, full_at)
+VALUES (:key, :capacity - 1, :now, :now + 1 / :rate)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = MIN(:capacity, tokens + (:now - updated) * :rate) - 1,
+    updated = :now,
+    full_at = :now + (:capacity + 1
+        - MIN(:capacity, tokens + (:now - updated) * :rate)) / :rate
+WHERE MIN(:capacity, tokens + (:now - updated) * :rate) >= 1
+RETURNING tokens
+'''
+PEEK = '''
+SELECT MIN(:capacity, tokens + (:now - updated) * :rate)
+FROM bucket WHERE key = :key
+'''
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60)."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class BucketStore:
+    """Вёдра в файле SQLite, своё соединение на поток и процесс."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.local = threading.local()
+
+    def get_path(self):
+        if self.path is None:
+            return str(getattr(
+                settings, 'THROTTLE_STORE_PATH',
+                settings.BASE_DIR / 'throttle.sqlite3'
+            ))
+        return self.path
+
+    @property
+    def connection(self):
+        # Соединение, открытое до fork, в воркере не используется.
+        owner = (os.getpid(), self.get_path())
+        if getattr(self.local, 'owner', None) != owner:
+            connection = sqlite3.connect(
+                owner[1], timeout=5, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode = WAL')
+            # Потеря вёдер при сбое питания не страшна.
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute(SCHEMA)
+            self.local.connection = connection
+            self.local.owner = owner
+            self.local.calls = 0
+        return self.local.connection
+
+    def take(self, key, capacity, rate, now=None):
+        """
+        Забирает жетон. Возвращает (разрешено, сколько секунд ждать
+        следующего жетона).
+        """
+        if now is None:
+            now = time.time()
+        params = {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+        connection = self.connection
+        self.local.calls += 1
+        if self.local.calls % PRUNE_EVERY == 0:
+            self.prune(now)
+        if connection.execute(TAKE, params).fetchone() is not None:
+            return True, 0.0
+        row = connection.execute(PEEK, params).fetchone()
+        tokens = row[0] if row else capacity
+        return False, max(0.0, (1 - tokens) / rate)
+
+    def prune(self, now=None):
+        """Полное ведро не отличается от отсутствующего."""
+        self.connection.execute(
+            'DELETE FROM bucket WHERE full_at <= ?', [now or time.time()]
+        )
+
+    def clear(self):
+        self.connection.execute('DELETE FROM bucket')
+
+
+bucket_store = BucketStore()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Ведро на пользователя, а для анонимов - на IP-адрес.
+    Частота берётся из DEFAULT_THROTTLE_RATES по scope.
+    """
+    scope = None
+    store = bucket_store
+
+    def __init__(self):
+        self.wait_time = None
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'{self.scope}:{ident}'
+
+    def allow_request(self, request, view):
+        rate = self.get_rate()
+        if rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        num, duration = parse_rate(rate)
+        allowed, self.wait_time = self.store.take(key, num, num / duration)
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+
+class AuthRateThrottle(TokenBucketThrottle):
+    """Выдача токена: хеширование пароля дорогое, ведро на IP."""
+    scope = 'auth'
+
+    def get_cache_key(self, request, view):
+        return f'{self.scope}:ip:{self.get_ident(request)}'
+
+
+class WriteRateThrottle(TokenBucketThrottle):
+    """Создание, изменение и удаление; чтение не ограничивается."""
+    scope = 'write'
+
+    def get_cache_key(self, request, view):
+        if request.method in SAFE_METHODS:
+            return None
+        return super().get_cache_key(request, view)
@@ -1,13 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework.authtoken import views
 
-from .views import PostViewSet, GroupViewSet, CommentViewSet, api_root
+from .views import (PostViewSet, GroupViewSet, CommentViewSet,
+                    CommentLookupViewSet, ChangeViewSet, activity_stats,
+                    api_root)
+from .login import obtain_auth_token
+from .streams import comment_stream
 
 # Создаем отдельный роутер для v1
 router_v1 = DefaultRouter()
 router_v1.register('posts', PostViewSet, basename='posts')
 router_v1.register('groups', GroupViewSet, basename='groups')
+router_v1.register('changes', ChangeViewSet, basename='changes')
+router_v1.register(
+    'comments', CommentLookupViewSet, basename='comments-lookup'
+)
 
 # Регистрируем комментарии с вложенным роутером
 router_v1.register(
@@ -20,13 +27,20 @@ router_v1.register(
 auth_urls_v1 = [
     path(
         'api-token-auth/',
-        views.obtain_auth_token,
+        obtain_auth_token,
         name='api_token_auth'
     ),
 ]
 
-# Группируем все маршруты v1
+# Группируем все маршруты v1. Поток стоит раньше роутера,
+# иначе `stream` совпадёт с шаблоном id комментария.
 v1_urlpatterns = [
+    path(
+        'posts/<int:post_pk>/comments/stream/',
+        comment_stream,
+        name='comments-stream'
+    ),
+    path('stats/activity/', activity_stats, name='activity-stats'),
     path('', include(router_v1.urls)),
     path('', include(auth_urls_v1)),
 ]
@@ -1,39 +1,516 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.decorators import api_view
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Prefetch
+from django.http import Http404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.shortcuts import get_object_or_404
+from rest_framework import status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 from rest_framework.reverse import reverse
-from posts.models import Post, Group, Comment
-from .serializers import PostSerializer, GroupSerializer, CommentSerializer
+from posts.activity import STEPS, bucket_start, get_activity
+from posts.archive import get_archived_post, to_comments
+from posts.caching import get_cache, get_prefix
+from posts.deletion import delete_or_defer
+from posts.models import (ActivityBucket, ArchivedComment, ArchivedPost, Post,
+                          Group, Comment, Change)
+from posts.trending import bump_score, top_scores
+from .fragments import RawJSON, get_post_fragments
+from .serializers import (PostSerializer, GroupSerializer, CommentSerializer,
+                          SyncPostSerializer, TrendingPostSerializer)
 from .permissions import IsAuthorOrReadOnly
+from .streams import publish_comment
+
+User = get_user_model()
+
+# Сколько id можно запросить одним запросом ?ids= или ?post__in=
+MAX_BATCH_SIZE = 100
+TRENDING_LIMIT = 20
+MAX_TRENDING_LIMIT = 100
+# Диапазон /stats/activity/ без from: сутки по часам, месяц по дням.
+ACTIVITY_SPANS = {
+    ActivityBucket.HOUR: timedelta(days=1),
+    ActivityBucket.DAY: timedelta(days=30),
+}
+MAX_ACTIVITY_BUCKETS = 1000
+# Годы границ диапазона: за пределами арифметика дат переполняется.
+ACTIVITY_YEARS = range(1970, 9999)
+
+
+def parse_id_list(request, param):
+    """Список id из параметра вида `1,2,3` без повторов, в порядке запроса."""
+    values = request.query_params[param].split(',')
+    # Лимит до разбора: длинная строка не должна тратить CPU.
+    if len(values) > MAX_BATCH_SIZE:
+        raise ValidationError(
+            {param: f'Можно запросить не больше {MAX_BATCH_SIZE} id.'}
+        )
+    ids = {}
+    for value in values:
+        value = value.strip()
+        if not (value.isascii() and value.isdigit()):
+            raise ValidationError(
+                {param: 'Ожидается список целых чисел через запятую.'}
+            )
+        ids[int(value)] = None
+    if not ids:
+        raise ValidationError({param: 'Список id пуст.'})
+    return list(ids)
+
+
+class ReturnPreferenceMixin:
+    """
+    Заголовок Prefer: return=minimal|representation (RFC 7240) у создания
+    и изменения. С return=minimal объект не сериализуется повторно:
+    создание отвечает 201 с id, изменение - 204, оба с Location.
+    """
+    MINIMAL = 'minimal'
+    REPRESENTATION = 'representation'
+
+    def get_return_preference(self):
+        for preference in self.request.headers.get('Prefer', '').split(','):
+            name, _, value = preference.partition('=')
+            value = value.strip().strip('"').lower()
+            if name.strip().lower() == 'return' and value in (
+                self.MINIMAL, self.REPRESENTATION
+            ):
+                return value
+        return None
+
+    def prefers_minimal(self):
+        return self.get_return_preference() == self.MINIMAL
+
+    def minimal_response(self, instance, status_code, data=None):
+        return Response(data, status=status_code, headers={
+            'Location': self.reverse_action(
+                'detail', kwargs={**self.kwargs, 'pk': instance.pk}
+            ),
+            'Preference-Applied': f'return={self.MINIMAL}',
+        })
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 300
+            and self.get_return_preference() == self.REPRESENTATION
+        ):
+            response['Preference-Applied'] = f'return={self.REPRESENTATION}'
+        return response
+
+    def create(self, request, *args, **kwargs):
+        if not self.prefers_minimal():
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return self.minimal_response(
+            serializer.instance, status.HTTP_201_CREATED,
+            {'id': serializer.instance.pk}
+        )
 
+    def update(self, request, *args, **kwargs):
+        if not self.prefers_minimal():
+            return super().update(request, *args, **kwargs)
+        instance = self.get_object()
+        serializer = self.get_serializer(
+            instance, data=request.data, partial=kwargs.get('partial', False)
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return self.minimal_response(instance, status.HTTP_204_NO_CONTENT)
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+
+class PostViewSet(ReturnPreferenceMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.select_related('author').prefetch_related(
+        Prefetch('comments', Comment.objects.select_related('author'))
+    )
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated, IsAuthorOrReadOnly]
 
+    def get_queryset(self):
+        # Ответу без тела комментарии поста не нужны.
+        if self.request.method not in SAFE_METHODS and self.prefers_minimal():
+            return Post.objects.select_related('author')
+        return super().get_queryset()
+
+    def get_fragments(self, ids):
+        """Готовый JSON постов: RawJSON-массив и id, которых нет."""
+        fragments = get_post_fragments(
+            self.request, ids, self.get_queryset(), self.get_serializer_class()
+        )
+        return (
+            RawJSON.array([fragments[pk] for pk in ids if pk in fragments]),
+            [pk for pk in ids if pk not in fragments],
+        )
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            ids = parse_id_list(request, 'ids')
+            # Фрагмент скрытого или удалённого поста может ещё лежать
+            # в кэше: отдаются только видимые посты.
+            visible = set(
+                Post.objects.filter(pk__in=ids).order_by()
+                .values_list('pk', flat=True)
+            )
+            results, missing = self.get_fragments(
+                [pk for pk in ids if pk in visible]
+            )
+            return Response({'results': results, 'missing': [
+                pk for pk in ids if pk not in visible or pk in missing
+            ]})
+        # Страница выбирается по одним id, а посты склеиваются
+        # из готовых фрагментов.
+        queryset = self.filter_queryset(
+            Post.objects.values_list('pk', flat=True)
+        )
+        page = self.paginate_queryset(queryset)
+        results, _ = self.get_fragments(
+            list(queryset) if page is None else page
+        )
+        if page is not None:
+            return self.get_paginated_response(results)
+        return Response(results)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            pk = int(kwargs['pk'])
+        except ValueError:
+            raise Http404
+        post = Post.objects.only('pk', 'author_id').filter(pk=pk).first()
+        if post is None:
+            return self.retrieve_archived(pk)
+        self.check_object_permissions(request, post)
+        fragments = get_post_fragments(
+            request, [post.pk], self.get_queryset(),
+            self.get_serializer_class()
+        )
+        if post.pk not in fragments:
+            raise Http404
+        return Response(RawJSON(fragments[post.pk]))
+
+    def retrieve_archived(self, pk):
+        # Пост, перенесённый в архив, читается без готовых фрагментов.
+        post = get_archived_post(pk)
+        if post is None:
+            raise Http404
+        self.check_object_permissions(self.request, post)
+        return Response(self.get_serializer(post).data)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(detail=False, pagination_class=None)
+    def trending(self, request):
+        """Посты с наибольшей недавней активностью комментариев."""
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = TRENDING_LIMIT
+        if limit < 1:
+            limit = TRENDING_LIMIT
+        limit = min(limit, MAX_TRENDING_LIMIT)
+        posts = []
+        for post_score in top_scores(limit):
+            post_score.post.score = post_score.score
+            posts.append(post_score.post)
+        return Response(TrendingPostSerializer(posts, many=True).data)
+
+    def perform_destroy(self, instance):
+        # Пост с большим числом комментариев скрывается сразу,
+        # а комментарии удаляются в фоне.
+        delete_or_defer(instance)
+
 
 class GroupViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_cached(self, name, serialize):
+        """JSON из кэша групп; запись в группы меняет его версию."""
+        key = f'{get_prefix("groups")}:{name}'
+        data = get_cache().get(key)
+        if data is None:
+            data = JSONRenderer().render(serialize())
+            get_cache().set(key, data)
+        return Response(RawJSON(data))
+
+    def list(self, request, *args, **kwargs):
+        # Страницы и фильтры не кэшируются.
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        return self.get_cached('list', lambda: self.get_serializer(
+            self.get_queryset(), many=True
+        ).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            pk = int(kwargs['pk'])
+        except ValueError:
+            raise Http404
+        return self.get_cached(pk, lambda: self.get_serializer(
+            self.get_object()
+        ).data)
 
-class CommentViewSet(viewsets.ModelViewSet):
+
+class CommentViewSet(ReturnPreferenceMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated, IsAuthorOrReadOnly]
 
+    def get_post(self):
+        # Скрытый в ожидании удаления пост недоступен вместе
+        # с комментариями. Комментарии поста в архиве только читаются.
+        if not hasattr(self, '_post'):
+            pk = self.kwargs.get('post_pk')
+            self._post = Post.objects.only('pk').filter(pk=pk).first()
+            self.archived = False
+            if self._post is None and self.request.method in SAFE_METHODS:
+                self._post = ArchivedPost.objects.only('pk').filter(
+                    pk=pk
+                ).first()
+                self.archived = self._post is not None
+            if self._post is None:
+                raise Http404
+        return self._post
+
     def get_queryset(self):
-        post_id = self.kwargs.get('post_pk')
-        return Comment.objects.filter(post_id=post_id)
+        return Comment.objects.select_related('author').filter(
+            post_id=self.get_post().pk
+        )
+
+    def list(self, request, *args, **kwargs):
+        post = self.get_post()
+        if not self.archived:
+            return super().list(request, *args, **kwargs)
+        queryset = ArchivedComment.objects.filter(post_id=post.pk)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(
+            to_comments(queryset if page is None else page), many=True
+        )
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        post = self.get_post()
+        if not self.archived:
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            pk = int(kwargs['pk'])
+        except ValueError:
+            raise Http404
+        comment = get_object_or_404(ArchivedComment, post_id=post.pk, pk=pk)
+        return Response(self.get_serializer(to_comments([comment])[0]).data)
 
     def perform_create(self, serializer):
-        post_id = self.kwargs.get('post_pk')
-        serializer.save(author=self.request.user, post_id=post_id)
+        comment = serializer.save(
+            author=self.request.user, post_id=self.get_post().pk
+        )
+        bump_score(comment.post_id)
+        publish_comment(comment, serializer.data)
+
+
+class CommentLookupViewSet(viewsets.GenericViewSet):
+    """
+    Комментарии сразу нескольких постов: ?post__in=1,2,3.
+    Комментарии сгруппированы по постам в порядке запроса.
+    """
+    serializer_class = CommentSerializer
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        if 'post__in' not in request.query_params:
+            raise ValidationError({'post__in': 'Обязательный параметр.'})
+        post_ids = parse_id_list(request, 'post__in')
+        found = set(
+            Post.objects.filter(pk__in=post_ids).values_list('pk', flat=True)
+        )
+        comments = {pk: [] for pk in post_ids}
+        for comment in Comment.objects.select_related('author').filter(
+            post_id__in=found
+        ):
+            comments[comment.post_id].append(comment)
+        return Response({
+            'results': self.get_serializer(
+                [comment for pk in post_ids for comment in comments[pk]],
+                many=True
+            ).data,
+            'missing': [pk for pk in post_ids if pk not in found],
+        })
+
+
+class ChangeViewSet(viewsets.ViewSet):
+    """
+    Изменения постов, комментариев и групп с номером больше `since`.
+    Несколько изменений одного объекта схлопываются в последнее,
+    удалённые объекты отдаются без данных.
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 500
+    max_limit = 1000
+    sync_models = {
+        'post': (Post, SyncPostSerializer, ('author',)),
+        'comment': (Comment, CommentSerializer, ('author',)),
+        'group': (Group, GroupSerializer, ()),
+    }
+
+    def get_int_param(self, name, default=None):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        # isdigit() пропускает и символы вроде '²', которые int() не берёт.
+        if not (value.isascii() and value.isdigit()):
+            raise ValidationError(
+                {name: 'Ожидается неотрицательное целое число.'}
+            )
+        return int(value)
+
+    def list(self, request):
+        since = self.get_int_param('since')
+        if since is None:
+            # Без `since` клиент получает текущий номер, с которого
+            # начнёт синхронизацию после полной загрузки.
+            last_seq = Change.objects.aggregate(last=Max('id'))['last']
+            return Response(
+                {'last_seq': last_seq or 0, 'has_more': False, 'changes': []}
+            )
+        limit = min(
+            self.get_int_param('limit', self.default_limit) or 1,
+            self.max_limit
+        )
+        changes = list(Change.objects.filter(id__gt=since)[:limit + 1])
+        # Разрыв перед первой записью означает, что журнал очищен
+        # командой prune_changes и часть изменений потеряна.
+        if (
+            changes and changes[0].id > since + 1
+            and not Change.objects.filter(id__lte=since).exists()
+        ):
+            return Response(
+                {'detail': 'Журнал изменений до `since` очищен, '
+                           'нужна полная синхронизация.'},
+                status=status.HTTP_410_GONE
+            )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        return Response({
+            'last_seq': changes[-1].id if changes else since,
+            'has_more': has_more,
+            'changes': self.compact(changes),
+        })
+
+    def compact(self, changes):
+        latest = {}
+        for change in changes:
+            key = (change.model, change.object_id)
+            latest.pop(key, None)
+            latest[key] = change
+        data = {}
+        for model_name, (model, serializer_class, related) in (
+            self.sync_models.items()
+        ):
+            ids = [
+                object_id for name, object_id in latest
+                if name == model_name
+            ]
+            if not ids:
+                continue
+            objects = model.objects.select_related(*related).filter(
+                pk__in=ids
+            )
+            for item in serializer_class(objects, many=True).data:
+                data[(model_name, item['id'])] = item
+        result = []
+        for key, change in latest.items():
+            entry = {
+                'seq': change.id,
+                'model': change.model,
+                'id': change.object_id,
+                'action': change.action,
+            }
+            if key in data and change.action != Change.DELETE:
+                entry['data'] = data[key]
+            else:
+                # Объект удалён - позже или в этом же окне.
+                entry['action'] = Change.DELETE
+            result.append(entry)
+        return result
+
+
+def parse_moment(request, param):
+    """Дата или дата со временем из параметра; без зоны - UTC."""
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    try:
+        moment = parse_datetime(value)
+        if moment is None and parse_date(value) is not None:
+            moment = datetime.combine(parse_date(value), time())
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError(
+            {param: 'Ожидается дата или дата со временем в ISO 8601.'}
+        )
+    if moment.year not in ACTIVITY_YEARS:
+        raise ValidationError({param: (
+            f'Ожидается дата с {ACTIVITY_YEARS.start} '
+            f'по {ACTIVITY_YEARS.stop - 1} год.'
+        )})
+    if timezone.is_naive(moment):
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    return moment
+
+
+def get_activity_scope(request):
+    group = request.query_params.get('group')
+    author = request.query_params.get('author')
+    if group is not None and author is not None:
+        raise ValidationError('Укажите group или author, но не оба.')
+    if group is not None:
+        return f'group={get_object_or_404(Group, slug=group).pk}'
+    if author is not None:
+        user = get_object_or_404(User, username=author)
+        return f'author={user.pk}'
+    return ''
+
+
+@api_view(['GET'])
+def activity_stats(request):
+    """
+    Число постов и комментариев по часам или суткам (UTC) колонками:
+    i-й элемент рядов относится к интервалу from + i * step.
+    """
+    size = request.query_params.get('bucket', ActivityBucket.HOUR)
+    if size not in STEPS:
+        raise ValidationError(
+            {'bucket': f'Ожидается одно из: {", ".join(STEPS)}.'}
+        )
+    scope = get_activity_scope(request)
+    end = parse_moment(request, 'to') or timezone.now()
+    begin = parse_moment(request, 'from') or end - ACTIVITY_SPANS[size]
+    start = bucket_start(begin.timestamp(), size)
+    end = bucket_start(end.timestamp(), size)
+    if start > end:
+        raise ValidationError({'from': 'Начало позже конца диапазона.'})
+    if (end - start) // STEPS[size] >= MAX_ACTIVITY_BUCKETS:
+        raise ValidationError(
+            f'Можно запросить не больше {MAX_ACTIVITY_BUCKETS} интервалов.'
+        )
+    return Response({
+        'bucket': size,
+        'from': datetime.fromtimestamp(start, dt_timezone.utc),
+        'to': datetime.fromtimestamp(end, dt_timezone.utc),
+        'step': STEPS[size],
+        **get_activity(size, scope, start, end),
+    })
 
 
 @api_view(['GET'])
@@ -46,6 +523,8 @@ def api_root(request, format=None):
                                   request=request, format=format),
         'posts': reverse('posts-list', request=request, format=format),
         'groups': reverse('groups-list', request=request, format=format),
+        'changes': reverse('changes-list', request=request, format=format),
+        'activity': reverse('activity-stats', request=request, format=format),
         'comments': 'http://127.0.0.1:8000/api/v1/posts/{post_id}/comments/',
         'admin': 'http://127.0.0.1:8000/admin/',
     })
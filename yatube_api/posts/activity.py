@@ -0,0 +1,140 @@
+"""
+Активность по часам и суткам (ActivityBucket).
+
+Создание и удаление поста или комментария меняют строки его часа
+и суток: всего, по группе и по автору. Чтение диапазона - проход по
+уникальному индексу (size, scope, start), строк не больше, чем
+интервалов. Группа учитывается на момент записи: после переноса
+постов между группами или загрузки в обход сигналов строки
+пересчитывает команда rebuild_activity.
+"""
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+from django.db.models import Count, F
+from django.db.models.functions import TruncDay, TruncHour
+
+from .counters import KEYS_CHUNK_SIZE
+from .models import (ActivityBucket, ArchivedComment, ArchivedPost, Comment,
+                     Post)
+
+STEPS = {ActivityBucket.HOUR: 3600, ActivityBucket.DAY: 86400}
+TRUNCATE = {ActivityBucket.HOUR: TruncHour, ActivityBucket.DAY: TruncDay}
+# Поле времени и колонка ActivityBucket для каждой модели.
+TRACKED = {
+    Post: ('pub_date', 'posts'),
+    Comment: ('created', 'comments'),
+}
+# Перенос в архив (posts.archive) рядов не меняет, пересчёт их учитывает:
+# модель -> поле времени, колонка, поле группы.
+REBUILT = {
+    Post: ('pub_date', 'posts', 'group_id'),
+    Comment: ('created', 'comments', 'post__group_id'),
+    ArchivedPost: ('pub_date', 'posts', 'group_id'),
+    ArchivedComment: ('created', 'comments', 'post__group_id'),
+}
+BATCH_SIZE = 5000
+
+
+def bucket_start(timestamp, size):
+    timestamp = int(timestamp)
+    return timestamp - timestamp % STEPS[size]
+
+
+def get_group_id(instance):
+    if isinstance(instance, Post):
+        return instance.group_id
+    if Comment.post.is_cached(instance):
+        return instance.post.group_id
+    return Post.all_objects.filter(pk=instance.post_id).values_list(
+        'group_id', flat=True
+    ).first()
+
+
+def get_scopes(instance):
+    scopes = ['', f'author={instance.author_id}']
+    group_id = get_group_id(instance)
+    if group_id is not None:
+        scopes.append(f'group={group_id}')
+    return scopes
+
+
+def change_activity(instance, delta):
+    change_activity_bulk([instance], delta)
+
+
+def change_activity_bulk(instances, delta):
+    """Меняет строки интервалов объектов: UPDATE на колонку и приращение."""
+    changes = defaultdict(lambda: defaultdict(int))
+    for instance in instances:
+        time_field, column = TRACKED[type(instance)]
+        timestamp = getattr(instance, time_field).timestamp()
+        for size in STEPS:
+            start = bucket_start(timestamp, size)
+            for scope in get_scopes(instance):
+                changes[column][(size, scope, start)] += delta
+    for column, keys in changes.items():
+        if delta > 0:
+            # Первая запись интервала заводит строку.
+            ActivityBucket.objects.bulk_create(
+                [
+                    ActivityBucket(size=size, scope=scope, start=start)
+                    for size, scope, start in keys
+                ],
+                ignore_conflicts=True
+            )
+        # Один UPDATE на приращение, интервал и срез, начала - через IN:
+        # цепочка OR по строкам упирается в глубину выражения SQLite.
+        starts = defaultdict(list)
+        for (size, scope, start), value in keys.items():
+            starts[value, size, scope].append(start)
+        for (value, size, scope), group in starts.items():
+            for offset in range(0, len(group), KEYS_CHUNK_SIZE):
+                ActivityBucket.objects.filter(
+                    size=size, scope=scope,
+                    start__in=group[offset:offset + KEYS_CHUNK_SIZE]
+                ).update(**{column: F(column) + value})
+
+
+def get_activity(size, scope, start, end):
+    """
+    Плотные ряды с start по end включительно (границы уже выровнены
+    по интервалу): {'posts': [...], 'comments': [...]}.
+    """
+    step = STEPS[size]
+    length = (end - start) // step + 1
+    series = {'posts': [0] * length, 'comments': [0] * length}
+    for bucket, posts, comments in ActivityBucket.objects.filter(
+        size=size, scope=scope, start__gte=start, start__lte=end
+    ).values_list('start', 'posts', 'comments'):
+        index = (bucket - start) // step
+        series['posts'][index] = posts
+        series['comments'][index] = comments
+    return series
+
+
+def rebuild_activity():
+    """Пересчитывает все интервалы по данным таблиц."""
+    rows = defaultdict(lambda: {'posts': 0, 'comments': 0})
+    for model, (time_field, column, group_field) in REBUILT.items():
+        for size, truncate in TRUNCATE.items():
+            for moment, author_id, group_id, total in (
+                model.objects.order_by().annotate(
+                    bucket=truncate(time_field, tzinfo=dt_timezone.utc)
+                ).values_list('bucket', 'author_id', group_field)
+                .annotate(total=Count('pk')).iterator()
+            ):
+                start = int(moment.timestamp())
+                scopes = ['', f'author={author_id}']
+                if group_id is not None:
+                    scopes.append(f'group={group_id}')
+                for scope in scopes:
+                    rows[size, scope, start][column] += total
+    ActivityBucket.objects.all().delete()
+    ActivityBucket.objects.bulk_create(
+        (
+            ActivityBucket(size=size, scope=scope, start=start, **values)
+            for (size, scope, start), values in rows.items()
+        ),
+        batch_size=BATCH_SIZE
+    )
+    return len(rows)
@@ -1,28 +1,299 @@
-from django.contrib import admin
-from .models import Post, Group, Comment
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db import models
+
+from .deletion import delete_or_defer
+from .exports import CsvFormat, NdjsonFormat, export_response
+from .models import Post, Group, Comment, Deletion
+from .paginators import CountedPaginator
+
+User = get_user_model()
+
+CURSOR_VAR = 'cursor'
+
+
+def get_cascade_models(model, found=None):
+    """Модели, строки которых удаляются каскадом вместе с model."""
+    found = set() if found is None else found
+    for relation in model._meta.related_objects:
+        related = relation.related_model
+        if relation.on_delete is models.CASCADE and related not in found:
+            found.add(related)
+            get_cascade_models(related, found)
+    return found
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Список изменений, который листает страницы по первичному ключу
+    (WHERE id < курсор) вместо OFFSET. Работает при сортировке
+    по умолчанию, при ручной сортировке - обычная пагинация.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = None
+        self.next_cursor = None
+        try:
+            self.cursor = int(request.GET.get(CURSOR_VAR))
+        except (TypeError, ValueError):
+            pass
+        super().__init__(request, *args, **kwargs)
+
+    @property
+    def keyset(self):
+        return (
+            ORDER_VAR not in self.params
+            and not self.show_all
+            and not self.list_editable
+        )
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Смена фильтров или сортировки начинает список сначала.
+        if not new_params or CURSOR_VAR not in new_params:
+            remove = [*(remove or []), CURSOR_VAR]
+        return super().get_query_string(new_params, remove)
+
+    def get_ordering(self, request, queryset):
+        if self.keyset:
+            return ['-pk']
+        return super().get_ordering(request, queryset)
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        # Действие над всем списком (POST) получает его без курсора.
+        if (
+            self.keyset and self.cursor is not None
+            and request.method != 'POST'
+        ):
+            queryset = queryset.filter(pk__lt=self.cursor)
+        return queryset
+
+    def get_results(self, request):
+        if not self.keyset:
+            return super().get_results(request)
+        self.paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+        result_list = list(self.queryset[:self.list_per_page + 1])
+        if len(result_list) > self.list_per_page:
+            result_list = result_list[:self.list_per_page]
+            self.next_cursor = result_list[-1].pk
+        self.result_list = result_list
+        self.result_count = self.paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = (
+            self.next_cursor is not None or self.cursor is not None
+        )
+        self.page_num = 1
+
+    @property
+    def first_page_url(self):
+        return self.get_query_string()
+
+    @property
+    def next_page_url(self):
+        if self.next_cursor is None:
+            return None
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Базовая админка для таблиц на миллионы строк."""
+    paginator = CountedPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class DeferredDeleteMixin:
+    """
+    Удаление через posts.deletion: объект с большим каскадом
+    скрывается, а зависимые строки удаляются в фоне.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        # Каскад не собирается: на больших объектах это дольше,
+        # чем само удаление. Право удалять зависимые строки
+        # проверяется по моделям каскада, даже если строк нет.
+        objs = list(objs)
+        perms_needed = {
+            related._meta.verbose_name
+            for related in get_cascade_models(self.model)
+            if self.admin_site.is_registered(related)
+            and not self.admin_site.get_model_admin(
+                related
+            ).has_delete_permission(request)
+        }
+        return (
+            [str(obj) for obj in objs],
+            {self.model._meta.verbose_name_plural: len(objs)},
+            perms_needed,
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        if delete_or_defer(obj) is not None:
+            self.message_user(
+                request,
+                f'«{obj}» скрыт, зависимые строки удаляются в фоне.',
+                messages.WARNING
+            )
+
+    def delete_queryset(self, request, queryset):
+        deferred = sum(
+            delete_or_defer(obj) is not None for obj in queryset
+        )
+        if deferred:
+            self.message_user(
+                request,
+                f'Скрыто объектов: {deferred}, зависимые строки '
+                'удаляются в фоне.',
+                messages.WARNING
+            )
+
+
+class ExportMixin:
+    """
+    Действия выгрузки выбранных строк в CSV и NDJSON. С «выбрать все»
+    выгружается весь отфильтрованный список, потоком (posts.exports).
+    """
+    actions = ('export_csv', 'export_ndjson')
+    # Под перегрузкой отклоняются первыми (api.middleware).
+    low_priority_actions = actions
+    # Заголовок колонки -> lookup для values_list.
+    export_fields = {}
+
+    @admin.action(description='Выгрузить в CSV', permissions=['view'])
+    def export_csv(self, request, queryset):
+        return export_response(
+            request, queryset, self.export_fields, CsvFormat
+        )
+
+    @admin.action(description='Выгрузить в NDJSON', permissions=['view'])
+    def export_ndjson(self, request, queryset):
+        return export_response(
+            request, queryset, self.export_fields, NdjsonFormat
+        )
+
+
+class PostIdFilter(admin.SimpleListFilter):
+    """Фильтр по id поста полем ввода вместо списка всех постов."""
+    title = 'пост'
+    parameter_name = 'post'
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        # Фильтр без вариантов не отображается, поэтому нужен один.
+        return (('', ''),)
+
+    def choices(self, changelist):
+        hidden_params = [
+            (name, value)
+            for name, values in changelist.filter_params.items()
+            if name not in (self.parameter_name, CURSOR_VAR)
+            for value in values
+        ]
+        yield {
+            'value': self.value() or '',
+            'parameter_name': self.parameter_name,
+            'hidden_params': hidden_params,
+        }
+
+    def queryset(self, request, queryset):
+        try:
+            post_id = int(self.value())
+        except (TypeError, ValueError):
+            return queryset
+        return queryset.filter(post_id=post_id)
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ExportMixin, DeferredDeleteMixin, LargeTableAdmin):
     list_display = ('id', 'text', 'pub_date', 'author', 'group')
     list_display_links = ('id', 'text')
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date', 'group')
+    autocomplete_fields = ('author', 'group')
     empty_value_display = '-пусто-'
+    export_fields = {
+        'id': 'id',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'pub_date': 'pub_date',
+        'text': 'text',
+    }
 
 
 @admin.register(Group)
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(ExportMixin, DeferredDeleteMixin, admin.ModelAdmin):
     list_display = ('id', 'title', 'slug', 'description')
     list_display_links = ('id', 'title')
     search_fields = ('title', 'description')
     prepopulated_fields = {'slug': ('title',)}
+    export_fields = {
+        'id': 'id',
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    }
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ExportMixin, LargeTableAdmin):
     list_display = ('id', 'author', 'post', 'text', 'created')
     list_display_links = ('id', 'text')
+    list_select_related = ('author', 'post')
     search_fields = ('text', 'author__username')
-    list_filter = ('created', 'post')
+    list_filter = ('created', PostIdFilter)
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
     empty_value_display = '-пусто-'
+    export_fields = {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'created': 'created',
+        'text': 'text',
+    }
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class UserAdmin(DeferredDeleteMixin, BaseUserAdmin):
+    pass
+
+
+@admin.register(Deletion)
+class DeletionAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'model', 'object_id', 'status', 'progress', 'created',
+        'finished'
+    )
+    list_filter = ('status', 'model')
+    readonly_fields = (
+        'model', 'object_id', 'status', 'total', 'processed', 'error',
+        'created', 'finished'
+    )
+
+    @admin.display(description='Прогресс')
+    def progress(self, obj):
+        if not obj.total:
+            return '-'
+        return f'{min(100, obj.processed * 100 // obj.total)}%'
+
+    def has_add_permission(self, request):
+        return False
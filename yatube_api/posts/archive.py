@@ -0,0 +1,150 @@
+"""
+Перенос старых постов с комментариями в архив (ArchivedPost).
+
+Посты старше ARCHIVE['AGE_DAYS'] дней уходят из горячих таблиц
+партиями (BatchSizer, как у фонового удаления), так что лента
+и комментарии ходят по индексам только свежих строк. Партия сначала
+пишется в архив, потом удаляется из горячих таблиц. Если архив в
+отдельной базе, это две транзакции: после сбоя между ними строки
+есть в обеих, и повторный запуск перезапишет архивные.
+
+Чтение по id прозрачно: API ищет пост и его комментарии в архиве,
+если их нет в горячих таблицах. Архив только для чтения. Счётчики
+строк вычитают перенесённое, а журнал изменений получает удаление
+постов и комментариев: клиенты синхронизации держат только горячие
+строки. Ряды активности не меняются: пост не удалён.
+"""
+from datetime import timedelta
+from functools import partial
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_versions
+from .counters import change_counters_bulk, get_child_counter_keys
+from .deletion import BatchSizer
+from .fragments import cache_names
+from .models import (ArchivedComment, ArchivedPost, Change, Comment,
+                     Counter, Post, PostFragment, PostScore)
+from .routers import get_archive_database
+from .signals import record_changes
+
+User = get_user_model()
+
+DEFAULTS = {
+    'AGE_DAYS': 365,
+    'BUDGET': 0.05,
+}
+MAX_BATCH_SIZE = 1000
+
+
+def get_option(name):
+    return getattr(settings, 'ARCHIVE', {}).get(name, DEFAULTS[name])
+
+
+def get_cutoff(days=None):
+    if days is None:
+        days = get_option('AGE_DAYS')
+    return timezone.now() - timedelta(days=days)
+
+
+def copy_fields(source, model):
+    """Экземпляр model с полями source, которые есть у обоих."""
+    return model(**{
+        field.attname: getattr(source, field.attname)
+        for field in model._meta.concrete_fields
+        if hasattr(source, field.attname)
+    })
+
+
+def drop_hot(posts, comments):
+    ids = [post.pk for post in posts]
+    PostFragment.objects.filter(post_id__in=ids).delete()
+    PostScore.objects.filter(post_id__in=ids).delete()
+    # Без сигналов удаления: пост перенесён, а не удалён.
+    Comment.objects.filter(post_id__in=ids)._raw_delete(Comment.objects.db)
+    Post.all_objects.filter(pk__in=ids)._raw_delete(Post.objects.db)
+    Counter.objects.filter(key__in=[
+        key for post in posts for key in get_child_counter_keys(post)
+    ]).delete()
+    change_counters_bulk(chain(posts, comments), -1)
+    record_changes(
+        Comment, [comment.pk for comment in comments], Change.DELETE
+    )
+    record_changes(Post, ids, Change.DELETE)
+    bump_versions(cache_names(ids))
+
+
+def archive_batch(cutoff, size):
+    """Переносит до size самых старых постов до cutoff."""
+    posts = list(
+        Post.objects.filter(pub_date__lt=cutoff).order_by('pk')[:size]
+    )
+    if not posts:
+        return 0
+    comments = list(Comment.objects.filter(
+        post_id__in=[post.pk for post in posts]
+    ).order_by())
+    with transaction.atomic(using=get_archive_database()):
+        for model, objects in (
+            (ArchivedPost, posts), (ArchivedComment, comments)
+        ):
+            fields = [
+                field.name for field in model._meta.concrete_fields
+                if not field.primary_key and field.name != 'archived'
+            ]
+            model.objects.bulk_create(
+                [copy_fields(instance, model) for instance in objects],
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=fields
+            )
+        drop_hot(posts, comments)
+    return len(posts)
+
+
+def archive_posts(cutoff=None, budget=None, progress=None):
+    """Переносит все посты до cutoff; возвращает их число."""
+    cutoff = cutoff or get_cutoff()
+    if budget is None:
+        budget = get_option('BUDGET')
+    sizer = BatchSizer(budget, max_size=MAX_BATCH_SIZE)
+    total = 0
+    while rows := sizer.run(partial(archive_batch, cutoff)):
+        total += rows
+        if progress:
+            progress(total)
+    return total
+
+
+def to_comments(archived_comments, post=None):
+    """Экземпляры Comment (не сохранённые) для CommentSerializer."""
+    archived_comments = list(archived_comments)
+    authors = User.objects.in_bulk(
+        {comment.author_id for comment in archived_comments}
+    )
+    comments = []
+    for archived in archived_comments:
+        comment = copy_fields(archived, Comment)
+        comment.author = authors.get(archived.author_id)
+        if post is not None:
+            comment.post = post
+        comments.append(comment)
+    return comments
+
+
+def get_archived_post(pk):
+    """Post из архива с автором и комментариями или None."""
+    archived = ArchivedPost.objects.filter(pk=pk).first()
+    if archived is None:
+        return None
+    post = copy_fields(archived, Post)
+    post.author = User.objects.get(pk=archived.author_id)
+    post._prefetched_objects_cache = {'comments': to_comments(
+        ArchivedComment.objects.filter(post_id=pk), post
+    )}
+    return post
@@ -0,0 +1,76 @@
+"""
+Версии ключей кэша.
+
+Значения кладутся под префикс с текущей версией своего пространства
+имён (фрагмент поста, группы, токены), а запись меняет версию вместо
+удаления ключей. Версия меняется сразу и ещё раз после фиксации
+транзакции: читатель, успевший между ними прочитать старые строки,
+сохранит их под версией, которую уже никто не спросит.
+"""
+import random
+import threading
+
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+
+local = threading.local()
+# Меняется вместе с настройкой CACHES.
+cache_generation = 0
+
+
+@receiver(setting_changed)
+def reset_cache(setting, **kwargs):
+    global cache_generation
+    if setting == 'CACHES':
+        cache_generation += 1
+
+
+def get_cache():
+    """
+    Кэш default этого потока. Прокси django.core.cache.cache ищет его
+    заново при каждом обращении, что дольше попадания в L1.
+    """
+    if getattr(local, 'generation', None) != cache_generation:
+        local.cache = caches['default']
+        local.generation = cache_generation
+    return local.cache
+
+
+def version_key(name):
+    return f'version:{name}'
+
+
+def get_prefixes(names):
+    """{имя: префикс ключей текущей версии}."""
+    keys = {version_key(name): name for name in names}
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        version = random.getrandbits(62)
+        if cache.add(key, version, None):
+            versions[key] = version
+        else:
+            versions[key] = cache.get(key, version)
+    return {
+        name: f'{name}:{versions[key]}' for key, name in keys.items()
+    }
+
+
+def get_prefix(name):
+    return get_prefixes([name])[name]
+
+
+def bump_versions(names):
+    keys = [version_key(name) for name in names]
+    if not keys:
+        return
+
+    def bump():
+        get_cache().set_many(
+            {key: random.getrandbits(62) for key in keys}, None
+        )
+
+    bump()
+    transaction.on_commit(bump)
@@ -0,0 +1,243 @@
+"""
+Подсчёт строк без полного COUNT(*) на больших таблицах.
+
+Стратегии:
+- exact - всегда COUNT(*);
+- counter - поддерживаемый счётчик, если он есть, иначе COUNT(*);
+- estimate - оценка по статистике для нефильтрованного списка,
+  иначе COUNT(*) не дальше предела;
+- auto - счётчик, затем COUNT(*) не дальше предела, затем оценка.
+"""
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, F
+from django.db.models.expressions import Col
+from django.db.models.lookups import Exact
+from django.db.models.sql.where import AND
+
+from .models import Counter
+
+EXACT = 'exact'
+COUNTER = 'counter'
+ESTIMATE = 'estimate'
+AUTO = 'auto'
+STRATEGIES = (EXACT, COUNTER, ESTIMATE, AUTO)
+
+# Для каких моделей ведутся счётчики: вся таблица
+# и разбивка по перечисленным внешним ключам.
+COUNTED_FIELDS = {
+    'posts.post': ('author',),
+    'posts.comment': ('post',),
+}
+# Столько ключей в одном IN: меньше лимита параметров SQLite.
+KEYS_CHUNK_SIZE = 500
+
+
+class RowCount(NamedTuple):
+    value: int
+    exact: bool
+
+
+def get_counter_keys(instance):
+    label = instance._meta.label_lower
+    return [label] + [
+        f'{label}:{field}={getattr(instance, f"{field}_id")}'
+        for field in COUNTED_FIELDS.get(label, ())
+    ]
+
+
+def get_child_counter_keys(instance):
+    """Ключи счётчиков, разбитых по внешнему ключу на этот объект."""
+    keys = []
+    for label, fields in COUNTED_FIELDS.items():
+        model = apps.get_model(label)
+        for field in fields:
+            related_model = model._meta.get_field(field).related_model
+            if isinstance(instance, related_model):
+                keys.append(f'{label}:{field}={instance.pk}')
+    return keys
+
+
+def change_counters(instance, delta):
+    Counter.objects.filter(key__in=get_counter_keys(instance)).update(
+        value=F('value') + delta
+    )
+
+
+def change_counters_bulk(instances, delta):
+    """
+    change_counters для многих объектов: один UPDATE на каждую
+    величину изменения, ключи - списком IN.
+    """
+    deltas = defaultdict(int)
+    for instance in instances:
+        for key in get_counter_keys(instance):
+            deltas[key] += delta
+    keys_by_value = defaultdict(list)
+    for key, value in deltas.items():
+        keys_by_value[value].append(key)
+    for value, keys in keys_by_value.items():
+        for start in range(0, len(keys), KEYS_CHUNK_SIZE):
+            Counter.objects.filter(
+                key__in=keys[start:start + KEYS_CHUNK_SIZE]
+            ).update(value=F('value') + value)
+
+
+def is_visibility_lookup(lookup):
+    # Скрытые объекты (is_deleted) вычитаются из счётчиков сразу при
+    # скрытии, поэтому условие VisibleManager не меняет ключ счётчика.
+    return (
+        isinstance(lookup, Exact)
+        and isinstance(lookup.lhs, Col)
+        and lookup.lhs.target.name == 'is_deleted'
+        and lookup.rhs is False
+    )
+
+
+def get_filters(query):
+    """Условия выборки без условия видимости или None, если они не AND."""
+    where = query.where
+    if where.connector != AND or where.negated:
+        return None
+    return [
+        lookup for lookup in where.children
+        if not is_visibility_lookup(lookup)
+    ]
+
+
+def is_unfiltered(queryset):
+    return get_filters(queryset.query) == []
+
+
+def get_counter_key(queryset):
+    """
+    Ключ счётчика, который точно соответствует выборке,
+    или None, если такого счётчика не ведётся.
+    """
+    query = queryset.query
+    label = queryset.model._meta.label_lower
+    if (
+        label not in COUNTED_FIELDS
+        or query.is_sliced
+        or query.distinct
+        or query.combinator
+    ):
+        return None
+    filters = get_filters(query)
+    if filters == []:
+        return label
+    if filters is None or len(filters) != 1:
+        return None
+    lookup = filters[0]
+    if (
+        isinstance(lookup, Exact)
+        and isinstance(lookup.lhs, Col)
+        and lookup.lhs.alias == query.base_table
+        and lookup.lhs.target.name in COUNTED_FIELDS[label]
+    ):
+        return f'{label}:{lookup.lhs.target.name}={lookup.rhs}'
+    return None
+
+
+def get_counter_value(queryset):
+    key = get_counter_key(queryset)
+    if key is None:
+        return None
+    return Counter.objects.filter(key=key).values_list(
+        'value', flat=True
+    ).first()
+
+
+def rebuild_counters():
+    """Пересчитывает все счётчики по данным таблиц."""
+    counters = []
+    for label, fields in COUNTED_FIELDS.items():
+        model = apps.get_model(label)
+        counters.append(Counter(key=label, value=model.objects.count()))
+        for field in fields:
+            related_model = model._meta.get_field(field).related_model
+            values = dict.fromkeys(
+                related_model.objects.values_list('pk', flat=True), 0
+            )
+            values.update(
+                model.objects.order_by().values_list(field)
+                .annotate(rows=Count('pk'))
+            )
+            counters.extend(
+                Counter(key=f'{label}:{field}={pk}', value=rows)
+                for pk, rows in values.items()
+            )
+    Counter.objects.all().delete()
+    Counter.objects.bulk_create(counters, batch_size=5000)
+    return len(counters)
+
+
+def estimate_count(model, using='default'):
+    """
+    Приблизительное число строк в таблице модели без полного COUNT(*).
+    Берётся из статистики ANALYZE, а без неё - по разбросу первичных ключей.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    pk_column = connection.ops.quote_name(model._meta.pk.column)
+    quoted_table = connection.ops.quote_name(table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone():
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [table]
+                )
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+        # Минимум и максимум по первичному ключу - это два поиска по
+        # индексу, поэтому стоимость не зависит от размера таблицы.
+        cursor.execute(
+            f'SELECT (SELECT MAX({pk_column}) FROM {quoted_table}) - '
+            f'(SELECT MIN({pk_column}) FROM {quoted_table}) + 1'
+        )
+        return cursor.fetchone()[0] or 0
+
+
+def bounded_count(queryset, limit=None):
+    """
+    COUNT(*) не дальше `limit` строк. Сверх предела - оценка
+    для нефильтрованной выборки или сам предел как нижняя граница.
+    """
+    if limit is None:
+        limit = getattr(settings, 'COUNT_EXACT_LIMIT', 10000)
+    bounded = queryset[:limit + 1].count()
+    if bounded <= limit:
+        return RowCount(bounded, True)
+    if is_unfiltered(queryset):
+        estimate = estimate_count(queryset.model, queryset.db)
+        return RowCount(max(estimate, bounded), False)
+    return RowCount(limit, False)
+
+
+def count_rows(queryset, strategy=None, limit=None):
+    """Число строк выборки и признак того, точное ли оно."""
+    if strategy is None:
+        strategy = getattr(settings, 'COUNT_STRATEGY', AUTO)
+    if strategy not in STRATEGIES:
+        raise ValueError(f'Неизвестная стратегия подсчёта: {strategy}')
+    if strategy == EXACT:
+        return RowCount(queryset.count(), True)
+    if strategy in (COUNTER, AUTO):
+        value = get_counter_value(queryset)
+        if value is not None:
+            return RowCount(value, True)
+        if strategy == COUNTER:
+            return RowCount(queryset.count(), True)
+    if strategy == ESTIMATE and is_unfiltered(queryset):
+        return RowCount(estimate_count(queryset.model, queryset.db), False)
+    return bounded_count(queryset, limit)
@@ -0,0 +1,214 @@
+"""
+Фоновое удаление объектов с большим каскадом.
+
+Пост, группа или пользователь, у которых зависимых строк больше
+DELETION_INLINE_LIMIT, не удаляются в запросе. Объект сразу
+скрывается (is_deleted у постов и групп, is_active=False у
+пользователя), а зависимые строки удаляет команда process_deletions
+партиями, каждая в своей транзакции. Размер партии подбирается так,
+чтобы транзакция держала блокировку записи не дольше DELETION_BUDGET
+секунд.
+"""
+import time
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .activity import change_activity, change_activity_bulk
+from .caching import bump_versions
+from .counters import change_counters, change_counters_bulk, count_rows
+from .fragments import invalidate_fragments
+from .models import Change, Comment, Deletion, Group, Post
+from .signals import record_changes
+
+User = get_user_model()
+
+MODELS = {
+    'post': Post,
+    'group': Group,
+    'user': User,
+}
+
+
+class BatchSizer:
+    """Размер партии, при котором транзакция укладывается в бюджет."""
+
+    def __init__(self, budget=None, size=100, max_size=10000):
+        if budget is None:
+            budget = getattr(settings, 'DELETION_BUDGET', 0.05)
+        self.budget = budget
+        self.size = size
+        self.max_size = max_size
+
+    def run(self, operation):
+        started = time.monotonic()
+        with transaction.atomic():
+            rows = operation(self.size)
+        self.adjust(time.monotonic() - started)
+        return rows
+
+    def adjust(self, elapsed):
+        if elapsed > self.budget:
+            self.size = max(1, int(self.size * self.budget / elapsed))
+        elif elapsed < self.budget / 2:
+            self.size = min(self.max_size, self.size * 2)
+
+
+def delete_batch(queryset, size):
+    ids = list(queryset.order_by().values_list('pk', flat=True)[:size])
+    if ids:
+        queryset.model._base_manager.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def unset_group_batch(group_id, size):
+    ids = list(
+        Post.all_objects.filter(group_id=group_id).order_by()
+        .values_list('pk', flat=True)[:size]
+    )
+    if ids:
+        Post.all_objects.filter(pk__in=ids).update(group=None)
+        record_changes(Post, ids, Change.UPDATE)
+        invalidate_fragments(ids)
+    return len(ids)
+
+
+def hide_posts_batch(author_id, size):
+    posts = list(Post.objects.filter(author_id=author_id).order_by()[:size])
+    if posts:
+        ids = [post.pk for post in posts]
+        Post.all_objects.filter(pk__in=ids).update(is_deleted=True)
+        change_counters_bulk(posts, -1)
+        change_activity_bulk(posts, -1)
+        invalidate_fragments(ids)
+        record_changes(Post, ids, Change.DELETE)
+    return len(posts)
+
+
+def get_stages(model_name, object_id):
+    """Партии зависимых строк в порядке обработки."""
+    if model_name == 'post':
+        return [
+            partial(delete_batch, Comment.objects.filter(post_id=object_id)),
+        ]
+    if model_name == 'group':
+        return [partial(unset_group_batch, object_id)]
+    return [
+        partial(hide_posts_batch, object_id),
+        partial(
+            delete_batch, Comment.objects.filter(post__author_id=object_id)
+        ),
+        partial(delete_batch, Comment.objects.filter(author_id=object_id)),
+        partial(delete_batch, Post.all_objects.filter(author_id=object_id)),
+    ]
+
+
+def count_dependents(instance):
+    """
+    Число зависимых строк для решения и прогресса: по счётчикам
+    или COUNT не дальше COUNT_EXACT_LIMIT.
+    """
+    pk = instance.pk
+    if isinstance(instance, Post):
+        querysets = [Comment.objects.filter(post_id=pk)]
+    elif isinstance(instance, Group):
+        querysets = [Post.all_objects.filter(group_id=pk)]
+    else:
+        querysets = [
+            Post.objects.filter(author_id=pk),
+            Comment.objects.filter(author_id=pk),
+            Comment.objects.filter(post__author_id=pk),
+        ]
+    return sum(count_rows(queryset).value for queryset in querysets)
+
+
+def hide(instance):
+    model = instance._meta.model
+    if model is User:
+        User.objects.filter(pk=instance.pk).update(is_active=False)
+        instance.is_active = False
+        bump_versions(['tokens'])
+        return
+    model.all_objects.filter(pk=instance.pk).update(is_deleted=True)
+    if model is Group:
+        bump_versions(['groups'])
+    if model is Post:
+        change_counters(instance, -1)
+        change_activity(instance, -1)
+        invalidate_fragments([instance.pk])
+    record_changes(model, [instance.pk], Change.DELETE)
+    instance.is_deleted = True
+
+
+def delete_or_defer(instance):
+    """
+    Удаляет объект сразу, если каскад мал, иначе скрывает его
+    и ставит задание на фоновое удаление. Возвращает задание или None.
+    """
+    total = count_dependents(instance)
+    if total <= getattr(settings, 'DELETION_INLINE_LIMIT', 100):
+        instance.delete()
+        return None
+    with transaction.atomic():
+        hide(instance)
+        return Deletion.objects.create(
+            model=instance._meta.model_name,
+            object_id=instance.pk,
+            total=total
+        )
+
+
+def run_stage(deletion, stage, size):
+    rows = stage(size)
+    if rows:
+        deletion.processed += rows
+        deletion.save(update_fields=['processed'])
+    return rows
+
+
+def finish(deletion, size):
+    model = MODELS[deletion.model]
+    instance = model._base_manager.filter(pk=deletion.object_id).first()
+    if instance is not None:
+        instance.delete()
+    deletion.status = Deletion.DONE
+    deletion.finished = timezone.now()
+    deletion.save(update_fields=['status', 'finished'])
+    return 1
+
+
+def run_deletion(deletion, sizer=None, progress=None):
+    """Выполняет задание партиями; после сбоя продолжает с начала."""
+    sizer = sizer or BatchSizer()
+    deletion.status = Deletion.RUNNING
+    deletion.save(update_fields=['status'])
+    try:
+        for stage in get_stages(deletion.model, deletion.object_id):
+            while sizer.run(partial(run_stage, deletion, stage)):
+                if progress:
+                    progress(deletion)
+        sizer.run(partial(finish, deletion))
+    except Exception as error:
+        deletion.status = Deletion.FAILED
+        deletion.error = repr(error)
+        deletion.save(update_fields=['status', 'error'])
+    if progress:
+        progress(deletion)
+    return deletion
+
+
+def process_deletions(sizer=None, progress=None):
+    """
+    Выполняет задания в очереди и прерванные. Обработчик на базу один:
+    задания не захватываются атомарно.
+    """
+    done = 0
+    for deletion in Deletion.objects.filter(
+        status__in=(Deletion.PENDING, Deletion.RUNNING)
+    ):
+        run_deletion(deletion, sizer, progress)
+        done += 1
+    return done
@@ -0,0 +1,78 @@
+"""
+Текстовое поле со сжатием больших значений.
+
+Текст длиннее COMPRESSED_TEXT['MIN_SIZE'] байт в UTF-8 сохраняется
+BLOB'ом: байт кодека (z - zlib, s - zstd) и сжатые данные. Остальные
+значения лежат в той же колонке обычным текстом. Распаковка идёт
+только для выбранной колонки, так что выборки с .only() и .defer()
+без текста её не платят.
+
+Сжатые тела не находятся поиском LIKE (search_fields в админке).
+"""
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULTS = {
+    'MIN_SIZE': 2048,
+    'CODEC': 'zstd',
+    'LEVEL': {'zlib': 6, 'zstd': 3},
+}
+CODEC_TAGS = {'zlib': b'z', 'zstd': b's'}
+
+
+def get_option(name):
+    return getattr(settings, 'COMPRESSED_TEXT', {}).get(name, DEFAULTS[name])
+
+
+def compress(text):
+    """BLOB для сохранения или исходная строка, если сжимать не стоит."""
+    if len(text) * 4 < get_option('MIN_SIZE'):
+        return text
+    data = text.encode()
+    if len(data) < get_option('MIN_SIZE'):
+        return text
+    codec = get_option('CODEC')
+    if codec == 'zstd' and zstandard is None:
+        codec = 'zlib'
+    level = {**DEFAULTS['LEVEL'], **get_option('LEVEL')}[codec]
+    if codec == 'zstd':
+        compressed = zstandard.ZstdCompressor(level=level).compress(data)
+    else:
+        compressed = zlib.compress(data, level)
+    # Несжимаемый текст остаётся текстом: его видит поиск.
+    if len(compressed) >= len(data) * 0.9:
+        return text
+    return CODEC_TAGS[codec] + compressed
+
+
+def decompress(value):
+    if not isinstance(value, (bytes, memoryview)):
+        return value
+    value = bytes(value)
+    if value[:1] == CODEC_TAGS['zstd']:
+        if zstandard is None:
+            raise RuntimeError(
+                'Текст сжат zstd: установите пакет zstandard.'
+            )
+        return zstandard.ZstdDecompressor().decompress(value[1:]).decode()
+    return zlib.decompress(value[1:]).decode()
+
+
+class CompressedTextField(models.TextField):
+    """TextField, который хранит большие значения сжатыми."""
+
+    def get_db_prep_save(self, value, connection):
+        value = super().get_db_prep_save(value, connection)
+        if isinstance(value, str):
+            return compress(value)
+        return value
+
+    def from_db_value(self, value, expression, connection):
+        return decompress(value)
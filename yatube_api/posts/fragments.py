@@ -0,0 +1,114 @@
+"""
+Хранилище готового JSON постов (PostFragment).
+
+Запись поста или комментария помечает фрагмент устаревшим и ставит
+новую метку, создавая строку, если её не было. Читатель запоминает метку
+до загрузки поста и сохраняет отрисованный фрагмент, только если
+метка не изменилась, а новый - только если строки всё ещё нет.
+Поэтому запись, пришедшая во время отрисовки, не оставит устаревший
+JSON.
+
+Актуальные фрагменты ещё лежат в кэше под версией поста
+(posts.caching), запись в пост меняет эту версию.
+"""
+import random
+from functools import reduce
+from operator import or_
+
+from django.db.models import BinaryField, Case, Q, Value, When
+
+from .caching import bump_versions, get_cache, get_prefixes
+from .models import PostFragment
+
+# Столько id в одном IN: меньше лимита параметров SQLite.
+CHUNK_SIZE = 500
+# Строк в одном UPDATE с CASE: по четыре параметра на строку.
+UPDATE_CHUNK_SIZE = 100
+
+
+def new_stamp():
+    return random.getrandbits(62)
+
+
+def cache_names(post_ids):
+    return {f'post-fragment:{pk}': pk for pk in post_ids}
+
+
+def invalidate_fragments(post_ids):
+    post_ids = list(post_ids)
+    PostFragment.objects.bulk_create(
+        (PostFragment(post_id=pk, stamp=new_stamp()) for pk in post_ids),
+        batch_size=CHUNK_SIZE,
+        update_conflicts=True,
+        unique_fields=['post'],
+        update_fields=['stamp', 'is_stale']
+    )
+    bump_versions(cache_names(post_ids))
+
+
+def load_fragments(ids, origin):
+    """
+    Актуальные фрагменты {id: bytes}, устаревшие фрагменты и метки
+    всех найденных строк, в том числе отрисованных для другого адреса.
+    Фрагменты из кэша приходят без меток: их не нужно отрисовывать.
+    """
+    # Ключ включает адрес запроса: фрагмент поста с изображением
+    # годится только для своего адреса.
+    names = cache_names(ids)
+    prefixes = get_prefixes(names)
+    keys = {f'{prefixes[name]}|{origin}': pk for name, pk in names.items()}
+    fragments = {
+        keys[key]: data for key, data in get_cache().get_many(keys).items()
+    }
+    misses = [pk for pk in ids if pk not in fragments]
+    stale = {}
+    stamps = {}
+    fresh = {}
+    for start in range(0, len(misses), CHUNK_SIZE):
+        for pk, stamp, row_origin, data, is_stale in (
+            PostFragment.objects.filter(
+                post_id__in=misses[start:start + CHUNK_SIZE]
+            ).values_list('post_id', 'stamp', 'origin', 'data', 'is_stale')
+        ):
+            stamps[pk] = stamp
+            if data is not None and row_origin in ('', origin):
+                (stale if is_stale else fresh)[pk] = bytes(data)
+    if fresh:
+        get_cache().set_many({
+            key: fresh[pk] for key, pk in keys.items() if pk in fresh
+        })
+        fragments.update(fresh)
+    return fragments, stale, stamps
+
+
+def store_fragments(rendered, stamps):
+    """
+    rendered - {id: (origin, bytes)}, stamps - метки из load_fragments.
+    Строка с меткой обновляется, только если метка прежняя; новая
+    строка не заменяет созданную записью за время отрисовки.
+    """
+    known = [pk for pk in rendered if pk in stamps]
+    for start in range(0, len(known), UPDATE_CHUNK_SIZE):
+        chunk = known[start:start + UPDATE_CHUNK_SIZE]
+        PostFragment.objects.filter(reduce(or_, (
+            Q(pk=pk, stamp=stamps[pk]) for pk in chunk
+        ))).update(
+            origin=Case(*(
+                When(pk=pk, then=Value(rendered[pk][0])) for pk in chunk
+            )),
+            data=Case(*(
+                When(pk=pk, then=Value(rendered[pk][1])) for pk in chunk
+            ), output_field=BinaryField()),
+            is_stale=False
+        )
+    new = [
+        PostFragment(
+            post_id=pk, stamp=new_stamp(), origin=origin, data=data,
+            is_stale=False
+        )
+        for pk, (origin, data) in rendered.items() if pk not in stamps
+    ]
+    if new:
+        PostFragment.objects.bulk_create(
+            new, batch_size=CHUNK_SIZE, ignore_conflicts=True
+        )
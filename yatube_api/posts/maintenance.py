@@ -0,0 +1,261 @@
+"""
+Обслуживание базы SQLite (manage.py dbmaintain).
+
+Каждый шаг - отдельная короткая транзакция, так что команду можно
+запускать из cron под нагрузкой: ANALYZE таблицы с ограничением
+analysis_limit и освобождение страниц PRAGMA incremental_vacuum
+партиями по DB_MAINTENANCE['STEP_BUDGET'] секунд (BatchSizer, как у
+фонового удаления). Между шагами ждущие запись запросы успевают
+пройти, а вся команда останавливается через BUDGET секунд.
+
+Отчёт по индексам таблиц posts_*: размер и доля свободного места
+(dbstat), планы, в которых индекс встречается, неиспользуемые
+и повторяющие начало другого индекса. SQLite не ведёт статистику
+использования индексов, поэтому планы берутся из журнала медленных
+запросов и EXPLAIN частых запросов API.
+"""
+import re
+import sqlite3
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection
+
+from yatube_api.slow_queries import explain, slow_query_store
+from .deletion import BatchSizer
+from .models import Comment, Post
+
+DEFAULTS = {
+    'BUDGET': 60,
+    'STEP_BUDGET': 0.05,
+    'PAUSE': 0.05,
+    'ANALYSIS_LIMIT': 1000,
+    'BLOAT_RATIO': 0.5,
+    'BLOAT_MIN_PAGES': 64,
+}
+TABLE_PREFIX = 'posts_'
+INDEX_IN_PLAN = re.compile(r'USING (?:COVERING )?INDEX (\w+)')
+
+
+def get_option(name):
+    return getattr(settings, 'DB_MAINTENANCE', {}).get(name, DEFAULTS[name])
+
+
+def pragma(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+class Deadline:
+    """Общий бюджет команды и пауза между шагами."""
+
+    def __init__(self, budget=None, pause=None):
+        self.at = time.monotonic() + (
+            get_option('BUDGET') if budget is None else budget
+        )
+        self.pause = get_option('PAUSE') if pause is None else pause
+
+    def expired(self):
+        return time.monotonic() >= self.at
+
+    def wait(self):
+        time.sleep(self.pause)
+
+
+def get_tables():
+    """Таблицы приложений, posts_* первыми."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\'"
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return sorted(names, key=lambda name: (
+        not name.startswith(TABLE_PREFIX), name
+    ))
+
+
+def analyze(deadline, progress=None):
+    """
+    ANALYZE таблиц по одной. PRAGMA optimize в SQLite до 3.46 смотрит
+    только на таблицы, прочитанные этим соединением, и из cron ничего
+    не делает. Возвращает проанализированные таблицы.
+    """
+    limit = get_option('ANALYSIS_LIMIT')
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA analysis_limit = {limit}')
+    done = []
+    for table in get_tables():
+        if deadline.expired():
+            break
+        started = time.monotonic()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE "{table}"')
+        except OperationalError as error:
+            # База занята дольше timeout: таблица подождёт следующего
+            # запуска.
+            if progress:
+                progress(f'ANALYZE {table}: {error}')
+            continue
+        done.append(table)
+        if progress:
+            elapsed = (time.monotonic() - started) * 1000
+            progress(f'ANALYZE {table}: {elapsed:.1f} ms')
+        deadline.wait()
+    return done
+
+
+def free_pages(size):
+    """
+    Один шаг incremental vacuum в своей транзакции. execute() модуля
+    sqlite3 делает один шаг оператора, то есть освобождает одну
+    страницу; executescript() выполняет его до конца.
+    """
+    if connection.in_atomic_block:
+        # executescript() сначала фиксирует открытую транзакцию.
+        raise RuntimeError('incremental vacuum выполняется вне atomic().')
+    before = pragma('freelist_count')
+    connection.ensure_connection()
+    connection.connection.executescript(
+        f'PRAGMA incremental_vacuum({int(size)})'
+    )
+    return before - pragma('freelist_count')
+
+
+def incremental_vacuum(deadline, sizer=None, progress=None):
+    """
+    Освобождает свободные страницы партиями. Возвращает число
+    освобождённых страниц или None, если auto_vacuum не incremental.
+    """
+    if pragma('auto_vacuum') != 2:
+        return None
+    sizer = sizer or BatchSizer(get_option('STEP_BUDGET'), size=64)
+    freed = 0
+    while not deadline.expired() and pragma('freelist_count'):
+        started = time.monotonic()
+        try:
+            pages = free_pages(sizer.size)
+        except sqlite3.OperationalError as error:
+            if progress:
+                progress(f'incremental_vacuum: {error}')
+            break
+        sizer.adjust(time.monotonic() - started)
+        if not pages:
+            break
+        freed += pages
+        if progress:
+            progress(f'incremental_vacuum: {pages} стр.')
+        deadline.wait()
+    return freed
+
+
+def enable_incremental_vacuum():
+    """
+    Переводит базу в auto_vacuum = INCREMENTAL. Нужен полный VACUUM:
+    он переписывает файл и держит блокировку всё это время.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+
+
+def get_hot_querysets():
+    """Частые запросы API и каскадов удаления."""
+    return [
+        Post.objects.all()[:10],
+        Post.objects.filter(group_id=1)[:10],
+        Post.objects.filter(author_id=1)[:10],
+        Comment.objects.filter(post_id=1),
+        Comment.objects.filter(author_id=1),
+        Comment.objects.filter(post__author_id=1),
+    ]
+
+
+def get_plans():
+    plans = [
+        entry['latest']['plan']
+        for entry in slow_query_store.summary(limit=-1)
+    ]
+    for queryset in get_hot_querysets():
+        sql, params = queryset.query.sql_with_params()
+        plans.append('\n'.join(explain(connection, sql, params)))
+    return plans
+
+
+def get_indexes():
+    """Индексы таблиц posts_*: имя, таблица, колонки, уникальность."""
+    indexes = []
+    with connection.cursor() as cursor:
+        for table in get_tables():
+            if not table.startswith(TABLE_PREFIX):
+                continue
+            cursor.execute(f'PRAGMA index_list("{table}")')
+            for row in cursor.fetchall():
+                name, unique = row[1], bool(row[2])
+                cursor.execute(f'PRAGMA index_info("{name}")')
+                columns = [column[2] for column in cursor.fetchall()]
+                indexes.append({
+                    'name': name,
+                    'table': table,
+                    'columns': columns,
+                    'unique': unique,
+                })
+    return indexes
+
+
+def get_size(name):
+    """(страниц, байт, свободных байт) индекса или None без dbstat."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pageno, pgsize, unused FROM dbstat '
+                'WHERE name = %s AND aggregate = 1', [name]
+            )
+            return cursor.fetchone()
+    except OperationalError:
+        return None
+
+
+def get_problems(index, indexes, uses, size):
+    problems = []
+    if not uses and not index['unique']:
+        problems.append('не используется')
+    if not index['unique'] and any(
+        other['name'] != index['name']
+        and other['table'] == index['table']
+        and other['columns'][:len(index['columns'])] == index['columns']
+        for other in indexes
+    ):
+        problems.append('повторяет начало другого индекса')
+    if size and size[0] >= get_option('BLOAT_MIN_PAGES') and (
+        size[2] / size[1] > get_option('BLOAT_RATIO')
+    ):
+        problems.append('раздут')
+    return problems
+
+
+def index_report(deadline=None):
+    """
+    Строки отчёта по индексам posts_*. Размер считается проходом по
+    страницам индекса, поэтому после исчерпания бюджета не считается.
+    """
+    plans = get_plans()
+    indexes = get_indexes()
+    report = []
+    for index in indexes:
+        uses = sum(
+            index['name'] in INDEX_IN_PLAN.findall(plan) for plan in plans
+        )
+        size = None
+        if deadline is None or not deadline.expired():
+            size = get_size(index['name'])
+        report.append({
+            **index,
+            'uses': uses,
+            'size': size[1] if size else None,
+            'free': size[2] / size[1] if size and size[1] else None,
+            'problems': get_problems(index, indexes, uses, size),
+        })
+    return report
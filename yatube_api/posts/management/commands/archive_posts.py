@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.archive import archive_posts, get_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты старше ARCHIVE["AGE_DAYS"] дней вместе '
+        'с комментариями в архив партиями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Возраст поста в днях, по умолчанию ARCHIVE["AGE_DAYS"].'
+        )
+        parser.add_argument(
+            '--budget', type=float, default=None,
+            help='Сколько секунд может длиться транзакция одной партии, '
+                 'по умолчанию ARCHIVE["BUDGET"].'
+        )
+
+    def handle(self, *args, **options):
+        self.reported = 0
+        total = archive_posts(
+            get_cutoff(options['days']), options['budget'], self.report
+        )
+        self.stdout.write(f'Перенесено в архив постов: {total}')
+
+    def report(self, total):
+        # Не чаще раза в секунду.
+        now = time.monotonic()
+        if now - self.reported >= 1:
+            self.reported = now
+            self.stdout.write(f'Перенесено: {total}')
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import maintenance
+
+
+class Command(BaseCommand):
+    help = (
+        'ANALYZE таблиц, incremental vacuum короткими шагами и отчёт '
+        'по индексам posts_*. Можно запускать из cron под нагрузкой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget', type=float, default=None,
+            help='Сколько секунд может работать команда.'
+        )
+        parser.add_argument('--skip-analyze', action='store_true')
+        parser.add_argument('--skip-vacuum', action='store_true')
+        parser.add_argument('--skip-report', action='store_true')
+        parser.add_argument(
+            '--enable-incremental-vacuum', action='store_true',
+            help='Один раз перевести базу в auto_vacuum = INCREMENTAL '
+                 'полным VACUUM. Блокирует базу, не для cron.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        if options['enable_incremental_vacuum']:
+            maintenance.enable_incremental_vacuum()
+            self.stdout.write('auto_vacuum = INCREMENTAL')
+            return
+        deadline = maintenance.Deadline(options['budget'])
+        progress = self.stdout.write if options['verbosity'] > 1 else None
+        if not options['skip_analyze']:
+            tables = maintenance.analyze(deadline, progress=progress)
+            self.stdout.write(f'Проанализировано таблиц: {len(tables)}')
+        if not options['skip_vacuum']:
+            self.vacuum(deadline, progress)
+        if not options['skip_report']:
+            for index in maintenance.index_report(deadline):
+                self.write_index(index)
+        if deadline.expired():
+            self.stdout.write(self.style.WARNING(
+                'Бюджет времени исчерпан, остальное - при следующем запуске.'
+            ))
+
+    def vacuum(self, deadline, progress):
+        freed = maintenance.incremental_vacuum(deadline, progress=progress)
+        if freed is None:
+            self.stdout.write(
+                f'Свободных страниц: {maintenance.pragma("freelist_count")}; '
+                'incremental vacuum выключен, см. '
+                '--enable-incremental-vacuum'
+            )
+        else:
+            self.stdout.write(f'Освобождено страниц: {freed}')
+
+    def write_index(self, index):
+        size = '-'
+        if index['size'] is not None:
+            size = (
+                f"{index['size'] / 1024:.0f} KiB, "
+                f"свободно {index['free']:.0%}"
+            )
+        line = (
+            f"{index['name']} {index['table']}"
+            f"({', '.join(index['columns'])}): {size}, "
+            f"в планах: {index['uses']}"
+        )
+        if index['problems']:
+            self.stdout.write(self.style.WARNING(
+                f"{line} - {', '.join(index['problems'])}"
+            ))
+        else:
+            self.stdout.write(line)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.trending import decay_scores, rebuild_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Затухание оценок популярных постов. Запускается периодически, '
+        'например раз в 10 минут; с --rebuild пересчитывает оценки '
+        'по комментариям.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true')
+        parser.add_argument(
+            '--half-life', type=float, default=None,
+            help='Период полураспада в секундах, по умолчанию '
+                 'TRENDING_HALF_LIFE.'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            with transaction.atomic():
+                total = rebuild_scores(half_life=options['half_life'])
+            self.stdout.write(f'Пересчитано оценок: {total}')
+            return
+        deleted = decay_scores(half_life=options['half_life'])
+        self.stdout.write(f'Удалено угасших оценок: {deleted}')
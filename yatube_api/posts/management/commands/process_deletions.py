@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.deletion import BatchSizer, process_deletions
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет партиями зависимые строки скрытых постов, групп и '
+        'пользователей. С --loop работает постоянно как фоновый процесс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проверками очереди в режиме --loop.'
+        )
+        parser.add_argument(
+            '--budget', type=float, default=None,
+            help='Сколько секунд может длиться транзакция одной партии, '
+                 'по умолчанию DELETION_BUDGET.'
+        )
+
+    def handle(self, *args, **options):
+        self.sizer = BatchSizer(options['budget'])
+        self.reported = 0
+        while True:
+            done = process_deletions(self.sizer, self.report)
+            if not options['loop']:
+                self.stdout.write(f'Выполнено заданий: {done}')
+                return
+            time.sleep(options['interval'])
+
+    def report(self, deletion):
+        # Не чаще раза в секунду, кроме завершения задания.
+        now = time.monotonic()
+        if deletion.status == deletion.RUNNING and now - self.reported < 1:
+            return
+        self.reported = now
+        self.stdout.write(
+            f'{deletion.model} {deletion.object_id}: {deletion.status}, '
+            f'{deletion.processed} из ~{deletion.total} строк, '
+            f'партия {self.sizer.size}'
+        )
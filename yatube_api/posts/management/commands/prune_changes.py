@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import Change
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из журнала изменения старше --days дней. Клиенты с более '
+        'старым курсором получат 410 и выполнят полную синхронизацию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    Change.objects.filter(created__lt=cutoff)
+                    .values_list('id', flat=True)[:options['batch_size']]
+                )
+                if not ids:
+                    break
+                Change.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+        self.stdout.write(f'Удалено записей журнала: {deleted}')
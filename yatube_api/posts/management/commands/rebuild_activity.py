@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.activity import rebuild_activity
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает ряды активности по часам и суткам. Нужен после '
+        'загрузки данных в обход сигналов и переноса постов между группами.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_activity()
+        self.stdout.write(f'Пересчитано интервалов: {total}')
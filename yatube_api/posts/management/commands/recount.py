@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики строк. Нужен после загрузки данных '
+        'в обход сигналов (bulk_create, прямой SQL).'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_counters()
+        self.stdout.write(f'Пересчитано счётчиков: {total}')
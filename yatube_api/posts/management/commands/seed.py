@@ -0,0 +1,254 @@
+"""Быстрое заполнение базы синтетическими данными."""
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts.activity import rebuild_activity
+from posts.counters import rebuild_counters
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+WORDS = (
+    'лето', 'город', 'кот', 'море', 'поезд', 'книга', 'утро', 'дождь',
+    'друг', 'работа', 'музыка', 'дорога', 'снег', 'чай', 'вечер', 'сад',
+    'горы', 'ветер', 'письмо', 'праздник', 'кино', 'река', 'осень', 'лес',
+)
+# Сколько пакетов вставляется в одной транзакции.
+BATCHES_PER_COMMIT = 20
+# Размер пула заранее сгенерированных текстов.
+TEXT_POOL_SIZE = 4096
+SQLITE_PRAGMAS = {
+    'synchronous': 'OFF',
+    'temp_store': 'MEMORY',
+    'cache_size': '-262144',
+}
+
+
+@contextmanager
+def auto_now_add_disabled(*fields):
+    """Позволяет задать даты вручную, минуя auto_now_add."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+@contextmanager
+def tuned_sqlite():
+    """Ослабляет гарантии долговечности SQLite на время загрузки."""
+    # Внутри транзакции SQLite не даёт менять уровень синхронизации.
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        saved = {}
+        for pragma, value in SQLITE_PRAGMAS.items():
+            saved[pragma] = cursor.execute(f'PRAGMA {pragma}').fetchone()[0]
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for pragma, value in saved.items():
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+def zipf_cum_weights(size, exponent):
+    """Накопленные веса распределения Ципфа для `size` рангов."""
+    total = 0.0
+    cum_weights = []
+    for rank in range(1, size + 1):
+        total += 1.0 / rank ** exponent
+        cum_weights.append(total)
+    return cum_weights
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами '
+        'и комментариями через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument(
+            '--seed', type=int, default=42,
+            help='Зерно генератора: одинаковое зерно даёт одинаковые данные.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения комментариев по постам '
+                 '(0 - равномерно).'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='На сколько дней назад распределяются даты публикаций.'
+        )
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--prefix', default='seed')
+
+    def handle(self, *args, **options):
+        for name in ('users', 'groups', 'posts', 'comments', 'days'):
+            if options[name] < 0:
+                raise CommandError(f'--{name} не может быть отрицательным.')
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size должен быть положительным.')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days']).total_seconds()
+        self.texts = [self.make_text() for _ in range(TEXT_POOL_SIZE)]
+
+        with tuned_sqlite(), auto_now_add_disabled(
+            Post._meta.get_field('pub_date'),
+            Comment._meta.get_field('created'),
+        ):
+            user_ids = self.seed_users(
+                options['users'], options['prefix'], options['password']
+            )
+            group_ids = self.seed_groups(options['groups'], options['prefix'])
+            posts = self.seed_posts(options['posts'], user_ids, group_ids)
+            self.seed_comments(
+                options['comments'], user_ids, posts, options['zipf']
+            )
+            # bulk_create не отправляет сигналы, счётчики и ряды
+            # активности надо пересчитать.
+            with transaction.atomic():
+                rebuild_counters()
+                rebuild_activity()
+
+    def make_text(self):
+        return ' '.join(self.rng.choices(WORDS, k=self.rng.randint(3, 40)))
+
+    def report(self, label, count, started):
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else count
+        self.stdout.write(
+            f'{label}: {count} за {elapsed:.1f} с ({rate:.0f} в секунду)'
+        )
+
+    def insert(self, model, objects, total):
+        """Вставляет объекты пакетами, фиксируя транзакцию раз в N пакетов."""
+        started = time.monotonic()
+        chunk_size = self.batch_size * BATCHES_PER_COMMIT
+        while True:
+            chunk = list(itertools.islice(objects, chunk_size))
+            if not chunk:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, batch_size=self.batch_size)
+        self.report(model._meta.verbose_name_plural, total, started)
+
+    def new_ids(self, model, floor, *fields):
+        return list(
+            model.objects.filter(pk__gt=floor)
+            .order_by('pk')
+            .values_list('pk', *fields, flat=not fields)
+        )
+
+    def seed_users(self, count, prefix, password):
+        if not count:
+            return list(User.objects.values_list('pk', flat=True))
+        # Хеш считается один раз: PBKDF2 на каждого пользователя
+        # занял бы больше времени, чем вся остальная загрузка.
+        password_hash = make_password(password)
+        offset = User.objects.filter(username__startswith=prefix).count()
+        floor = User.objects.aggregate(max_id=Max('pk'))['max_id'] or 0
+        users = (
+            User(username=f'{prefix}_user_{offset + number}',
+                 password=password_hash)
+            for number in range(count)
+        )
+        self.insert(User, users, count)
+        return self.new_ids(User, floor)
+
+    def seed_groups(self, count, prefix):
+        if not count:
+            return list(Group.objects.values_list('pk', flat=True))
+        offset = Group.objects.filter(slug__startswith=prefix).count()
+        floor = Group.objects.aggregate(max_id=Max('pk'))['max_id'] or 0
+        groups = (
+            Group(
+                title=f'Группа {offset + number}',
+                slug=f'{prefix}-group-{offset + number}',
+                description=self.rng.choice(self.texts),
+            )
+            for number in range(count)
+        )
+        self.insert(Group, groups, count)
+        return self.new_ids(Group, floor)
+
+    def seed_posts(self, count, user_ids, group_ids):
+        if not count:
+            return list(Post.objects.values_list('pk', 'pub_date'))
+        if not user_ids:
+            raise CommandError('Для постов нужен хотя бы один пользователь.')
+        floor = Post.objects.aggregate(max_id=Max('pk'))['max_id'] or 0
+        group_choices = group_ids + [None]
+        posts = (
+            Post(
+                text=self.rng.choice(self.texts),
+                author_id=self.rng.choice(user_ids),
+                group_id=self.rng.choice(group_choices),
+                pub_date=self.now - timedelta(
+                    seconds=self.rng.uniform(0, self.span)
+                ),
+            )
+            for _ in range(count)
+        )
+        self.insert(Post, posts, count)
+        return self.new_ids(Post, floor, 'pub_date')
+
+    def seed_comments(self, count, user_ids, posts, exponent):
+        if not count:
+            return
+        if not posts or not user_ids:
+            raise CommandError(
+                'Для комментариев нужны хотя бы один пост и пользователь.'
+            )
+        # Популярность не должна зависеть от возраста поста,
+        # поэтому ранги раздаются постам в случайном порядке.
+        posts = list(posts)
+        self.rng.shuffle(posts)
+        cum_weights = (
+            zipf_cum_weights(len(posts), exponent) if exponent > 0 else None
+        )
+
+        def comments():
+            remaining = count
+            while remaining:
+                size = min(self.batch_size, remaining)
+                remaining -= size
+                targets = self.rng.choices(
+                    posts, cum_weights=cum_weights, k=size
+                )
+                for post_id, pub_date in targets:
+                    age = (self.now - pub_date).total_seconds()
+                    yield Comment(
+                        post_id=post_id,
+                        author_id=self.rng.choice(user_ids),
+                        text=self.rng.choice(self.texts),
+                        created=self.now - timedelta(
+                            seconds=self.rng.uniform(0, max(age, 0))
+                        ),
+                    )
+
+        self.insert(Comment, comments(), count)
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import get_internal_wsgi_application
+
+from yatube_api.prefork import (Arbiter, default_workers,
+                                refuse_event_streams)
+from yatube_api.warmup import warm_up
+
+DEFAULT_ADDRPORT = '127.0.0.1:8000'
+
+
+def parse_addrport(addrport):
+    host, _, port = addrport.rpartition(':')
+    host = host.strip('[]') or '127.0.0.1'
+    if not (port.isascii() and port.isdigit()):
+        raise CommandError(f'Неверный адрес: {addrport}')
+    return host, int(port)
+
+
+class Command(BaseCommand):
+    help = (
+        'Многопроцессный сервер для production: приложение загружается '
+        'один раз, затем форкаются воркеры. Только стандартная библиотека. '
+        'Потоки SSE не обслуживаются (501), для них нужен ASGI.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'addrport', nargs='?', default=DEFAULT_ADDRPORT,
+            help='Адрес и порт, по умолчанию 127.0.0.1:8000.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=default_workers(),
+            help='Число воркеров, по умолчанию по числу ядер.'
+        )
+        parser.add_argument(
+            '--max-requests', type=int, default=10000,
+            help='Перезапуск воркера после стольких запросов, 0 - никогда.'
+        )
+        parser.add_argument('--max-requests-jitter', type=int, default=1000)
+        parser.add_argument(
+            '--graceful-timeout', type=float, default=30,
+            help='Сколько секунд ждать текущие запросы при остановке.'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=30,
+            help='Таймаут чтения и записи сокета клиента.'
+        )
+        parser.add_argument(
+            '--reuse-port', action='store_true',
+            help='Отдельный сокет на воркер с SO_REUSEPORT.'
+        )
+        parser.add_argument('--access-log', action='store_true')
+
+    def handle(self, *args, **options):
+        host, port = parse_addrport(options['addrport'])
+        if options['workers'] < 1:
+            raise CommandError('Нужен хотя бы один воркер.')
+        application = refuse_event_streams(get_internal_wsgi_application())
+        warm_up()
+        arbiter = Arbiter(
+            application, host, port,
+            workers=options['workers'],
+            max_requests=options['max_requests'],
+            max_requests_jitter=options['max_requests_jitter'],
+            graceful_timeout=options['graceful_timeout'],
+            request_timeout=options['timeout'],
+            reuse_port=options['reuse_port'],
+            access_log=options['access_log'],
+            log=lambda message: self.stdout.write(message),
+        )
+        try:
+            arbiter.run()
+        except OSError as error:
+            raise CommandError(error)
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from yatube_api.slow_queries import ORDERS, slow_query_store
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка журнала медленных запросов по отпечаткам SQL: число '
+        'записей, время, флаги плана, view, последний план и стек.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--sort', choices=sorted(ORDERS), default='total',
+            help='Сортировка: суммарное время, число или максимум.'
+        )
+        parser.add_argument(
+            '--since', type=float, default=None,
+            help='Только записи за последние столько часов.'
+        )
+        parser.add_argument(
+            '--flagged', action='store_true',
+            help='Только запросы с полным проходом или временной '
+                 'сортировкой.'
+        )
+        parser.add_argument(
+            '--clear', action='store_true', help='Очистить журнал.'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            slow_query_store.clear()
+            self.stdout.write('Журнал очищен')
+            return
+        since = 0
+        if options['since'] is not None:
+            since = time.time() - options['since'] * 3600
+        entries = slow_query_store.summary(
+            since, options['limit'], options['sort'], options['flagged']
+        )
+        if not entries:
+            self.stdout.write('Медленных запросов нет')
+        for entry in entries:
+            self.write_entry(entry)
+
+    def write_entry(self, entry):
+        self.stdout.write(
+            f"{entry['count']} раз, всего {entry['total'] * 1000:.1f} ms, "
+            f"максимум {entry['max'] * 1000:.1f} ms"
+        )
+        if entry['flags']:
+            self.stdout.write(self.style.WARNING(f"  {entry['flags']}"))
+        self.stdout.write(f"  view: {entry['views'] or '-'}")
+        self.stdout.write(f"  {entry['fingerprint']}")
+        for title in ('plan', 'stack'):
+            for line in entry['latest'][title].splitlines():
+                self.stdout.write(f'    {line}')
+        self.stdout.write('')
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.1 on 2026-10-19 15:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Counter = apps.get_model('posts', 'Counter')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    counters = [
+        Counter(key='posts.post', value=Post.objects.count()),
+        Counter(key='posts.comment', value=Comment.objects.count()),
+    ]
+    for label, model, field, parent in (
+        ('posts.post', Post, 'author', User),
+        ('posts.comment', Comment, 'post', Post),
+    ):
+        values = dict.fromkeys(parent.objects.values_list('pk', flat=True), 0)
+        values.update(
+            model.objects.order_by().values_list(field)
+            .annotate(rows=Count('pk'))
+        )
+        counters.extend(
+            Counter(key=f'{label}:{field}={pk}', value=rows)
+            for pk, rows in values.items()
+        )
+    Counter.objects.bulk_create(counters, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0002_auto_20251114_1618'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True, verbose_name='Ключ')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Значение')),
+            ],
+            options={
+                'verbose_name': 'Счётчик',
+                'verbose_name_plural': 'Счётчики',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
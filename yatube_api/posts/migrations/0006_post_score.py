@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-19 15:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_deferred_deletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.post', verbose_name='Пост')),
+                ('score', models.FloatField(default=0, verbose_name='Оценка')),
+                ('decayed_at', models.FloatField(verbose_name='Время затухания')),
+            ],
+            options={
+                'verbose_name': 'Оценка поста',
+                'verbose_name_plural': 'Оценки постов',
+                'indexes': [models.Index(fields=['-score'], name='score_desc_idx')],
+            },
+        ),
+    ]
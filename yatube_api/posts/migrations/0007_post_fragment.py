@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-19 16:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostFragment',
+            fields=[
+                ('post', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fragment', serialize=False, to='posts.post', verbose_name='Пост')),
+                ('stamp', models.BigIntegerField(verbose_name='Метка версии')),
+                ('origin', models.CharField(blank=True, max_length=200, verbose_name='Адрес сайта')),
+                ('data', models.BinaryField(null=True, verbose_name='JSON')),
+            ],
+            options={
+                'verbose_name': 'Фрагмент поста',
+                'verbose_name_plural': 'Фрагменты постов',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_post_fragment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postfragment',
+            name='is_stale',
+            field=models.BooleanField(default=True, verbose_name='Устарел'),
+        ),
+    ]
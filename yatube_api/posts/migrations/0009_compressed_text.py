@@ -0,0 +1,69 @@
+# Generated by Django 5.1.1 on 2026-10-19 16:28
+
+from django.db import migrations
+
+import posts.fields
+
+BATCH_SIZE = 500
+
+
+def rewrite_texts(apps, schema_editor, convert):
+    # Сырые запросы: update() через поле снова сжал бы текст.
+    connection = schema_editor.connection
+    for model_name in ('Post', 'Comment'):
+        table = connection.ops.quote_name(
+            apps.get_model('posts', model_name)._meta.db_table
+        )
+        last_id = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT id, text FROM {table} WHERE id > %s '
+                    f'ORDER BY id LIMIT %s',
+                    [last_id, BATCH_SIZE]
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                changed = []
+                for pk, text in rows:
+                    value = convert(text)
+                    if value is not text:
+                        changed.append((value, pk))
+                cursor.executemany(
+                    f'UPDATE {table} SET text = %s WHERE id = %s', changed
+                )
+
+
+def compress_texts(apps, schema_editor):
+    rewrite_texts(apps, schema_editor, lambda text: (
+        posts.fields.compress(text) if isinstance(text, str) else text
+    ))
+
+
+def decompress_texts(apps, schema_editor):
+    rewrite_texts(apps, schema_editor, lambda text: (
+        posts.fields.decompress(text) if isinstance(text, bytes) else text
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_fragment_is_stale'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='text',
+            field=posts.fields.CompressedTextField(verbose_name='Текст комментария'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='text',
+            field=posts.fields.CompressedTextField(verbose_name='Текст поста'),
+        ),
+        migrations.RunPython(compress_texts, decompress_texts),
+    ]
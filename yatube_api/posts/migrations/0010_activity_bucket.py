@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-19 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_compressed_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('hour', 'Час'), ('day', 'Сутки')], max_length=4, verbose_name='Интервал')),
+                ('scope', models.CharField(blank=True, max_length=50, verbose_name='Разбивка')),
+                ('start', models.BigIntegerField(verbose_name='Начало')),
+                ('posts', models.BigIntegerField(default=0, verbose_name='Постов')),
+                ('comments', models.BigIntegerField(default=0, verbose_name='Комментариев')),
+            ],
+            options={
+                'verbose_name': 'Активность за интервал',
+                'verbose_name_plural': 'Активность по интервалам',
+                'constraints': [models.UniqueConstraint(fields=('size', 'scope', 'start'), name='activity_bucket_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.1 on 2026-10-19 16:45
+
+import django.db.models.deletion
+import posts.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_activity_bucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPost',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('text', posts.fields.CompressedTextField(verbose_name='Текст поста')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author_id', models.BigIntegerField(db_index=True, verbose_name='Автор')),
+                ('image', models.ImageField(blank=True, null=True, upload_to='posts/', verbose_name='Изображение')),
+                ('group_id', models.BigIntegerField(db_index=True, null=True, verbose_name='Группа')),
+                ('archived', models.DateTimeField(auto_now_add=True, verbose_name='Дата переноса')),
+            ],
+            options={
+                'verbose_name': 'Пост в архиве',
+                'verbose_name_plural': 'Посты в архиве',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('author_id', models.BigIntegerField(db_index=True, verbose_name='Автор комментария')),
+                ('text', posts.fields.CompressedTextField(verbose_name='Текст комментария')),
+                ('created', models.DateTimeField(verbose_name='Дата создания')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='posts.archivedpost', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Комментарий в архиве',
+                'verbose_name_plural': 'Комментарии в архиве',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
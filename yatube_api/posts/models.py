@@ -1,9 +1,18 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .fields import CompressedTextField
+
 User = get_user_model()
 
 
+class VisibleManager(models.Manager):
+    """Объекты без отметки is_deleted, ожидающей фонового удаления."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
 class Group(models.Model):
     title = models.CharField(
         max_length=200,
@@ -14,6 +23,14 @@ class Group(models.Model):
         verbose_name='Уникальный идентификатор'
     )
     description = models.TextField(verbose_name='Описание группы')
+    is_deleted = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Удаляется'
+    )
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = 'Группа'
@@ -25,7 +42,7 @@ class Group(models.Model):
 
 
 class Post(models.Model):
-    text = models.TextField(verbose_name='Текст поста')
+    text = CompressedTextField(verbose_name='Текст поста')
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации'
@@ -50,6 +67,14 @@ class Post(models.Model):
         null=True,
         verbose_name='Группа'
     )
+    is_deleted = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Удаляется'
+    )
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = 'Пост'
@@ -76,7 +101,7 @@ class Comment(models.Model):
         related_name='comments',
         verbose_name='Пост'
     )
-    text = models.TextField(verbose_name='Текст комментария')
+    text = CompressedTextField(verbose_name='Текст комментария')
     created = models.DateTimeField(
         auto_now_add=True,
         db_index=True,
@@ -93,4 +118,277 @@ class Comment(models.Model):
         ]
 
     def __str__(self):
-        return f'Комментарий {self.author} к посту {self.post.id}'
+        return f'Комментарий {self.author} к посту {self.post_id}'
+
+
+class Counter(models.Model):
+    """Поддерживаемое сигналами число строк таблицы или её части."""
+    key = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Ключ'
+    )
+    value = models.BigIntegerField(default=0, verbose_name='Значение')
+
+    class Meta:
+        verbose_name = 'Счётчик'
+        verbose_name_plural = 'Счётчики'
+
+    def __str__(self):
+        return f'{self.key} = {self.value}'
+
+
+class Change(models.Model):
+    """
+    Запись журнала изменений для инкрементальной синхронизации.
+    Первичный ключ служит монотонным номером изменения.
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    ACTIONS = (
+        (CREATE, 'Создание'),
+        (UPDATE, 'Изменение'),
+        (DELETE, 'Удаление'),
+    )
+
+    model = models.CharField(max_length=20, verbose_name='Модель')
+    object_id = models.BigIntegerField(verbose_name='ID объекта')
+    action = models.CharField(
+        max_length=6,
+        choices=ACTIONS,
+        verbose_name='Действие'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Изменения'
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.id}: {self.action} {self.model} {self.object_id}'
+
+
+class Deletion(models.Model):
+    """Фоновое удаление объекта с большим каскадом зависимых строк."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Завершено'),
+        (FAILED, 'Ошибка'),
+    )
+
+    model = models.CharField(max_length=20, verbose_name='Модель')
+    object_id = models.BigIntegerField(verbose_name='ID объекта')
+    status = models.CharField(
+        max_length=7,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Статус'
+    )
+    total = models.BigIntegerField(
+        default=0,
+        verbose_name='Зависимых строк'
+    )
+    processed = models.BigIntegerField(
+        default=0,
+        verbose_name='Обработано строк'
+    )
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата постановки'
+    )
+    finished = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата завершения'
+    )
+
+    class Meta:
+        verbose_name = 'Удаление'
+        verbose_name_plural = 'Удаления'
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}: {self.status}'
+
+
+class PostScore(models.Model):
+    """
+    Затухающая активность комментариев поста для /posts/trending/.
+    Каждый комментарий добавляет 1, команда decay_trending
+    уменьшает оценки вдвое за каждый TRENDING_HALF_LIFE.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост'
+    )
+    score = models.FloatField(default=0, verbose_name='Оценка')
+    # Unix-время в секундах: затухание считается в SQL без функций
+    # работы с датами, своих у каждой СУБД.
+    decayed_at = models.FloatField(verbose_name='Время затухания')
+
+    class Meta:
+        verbose_name = 'Оценка поста'
+        verbose_name_plural = 'Оценки постов'
+        indexes = [
+            models.Index(fields=['-score'], name='score_desc_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.2f}'
+
+
+class PostFragment(models.Model):
+    """
+    Готовый JSON поста с автором и комментариями для списков и
+    карточки. Запись поста, его комментариев или имени автора
+    помечает data устаревшим и меняет stamp: фрагмент, отрисованный
+    по старым данным, не сохранится поверх.
+    """
+    # Без внешнего ключа в базе: при каскадном удалении поста сигналы
+    # его комментариев успевают сбросить уже удалённый фрагмент.
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        primary_key=True,
+        related_name='fragment',
+        verbose_name='Пост'
+    )
+    stamp = models.BigIntegerField(verbose_name='Метка версии')
+    # Адрес сайта для абсолютной ссылки на изображение, пусто у постов
+    # без изображения: их JSON от адреса не зависит.
+    origin = models.CharField(
+        max_length=200, blank=True, verbose_name='Адрес сайта'
+    )
+    data = models.BinaryField(null=True, verbose_name='JSON')
+    # Устаревший JSON отдаётся, только пока его пересчитывает другой
+    # запрос, и только с FRAGMENT_STALE_WHILE_REVALIDATE.
+    is_stale = models.BooleanField(default=True, verbose_name='Устарел')
+
+    class Meta:
+        verbose_name = 'Фрагмент поста'
+        verbose_name_plural = 'Фрагменты постов'
+
+    def __str__(self):
+        return str(self.post_id)
+
+
+class ActivityBucket(models.Model):
+    """
+    Число постов и комментариев за час или сутки (UTC): всего,
+    по группе или по автору. Поддерживается сигналами (posts.activity).
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+    SIZES = (
+        (HOUR, 'Час'),
+        (DAY, 'Сутки'),
+    )
+
+    size = models.CharField(
+        max_length=4,
+        choices=SIZES,
+        verbose_name='Интервал'
+    )
+    # Пусто - все записи, group=<id> или author=<id> - разбивка.
+    scope = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name='Разбивка'
+    )
+    # Unix-время начала интервала в секундах.
+    start = models.BigIntegerField(verbose_name='Начало')
+    posts = models.BigIntegerField(default=0, verbose_name='Постов')
+    comments = models.BigIntegerField(
+        default=0,
+        verbose_name='Комментариев'
+    )
+
+    class Meta:
+        verbose_name = 'Активность за интервал'
+        verbose_name_plural = 'Активность по интервалам'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['size', 'scope', 'start'],
+                name='activity_bucket_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.size} {self.scope or "all"} {self.start}'
+
+
+class ArchivedPost(models.Model):
+    """
+    Пост старше ARCHIVE['AGE_DAYS'] дней, перенесённый из Post командой
+    archive_posts вместе с комментариями (ArchivedComment). Таблицы
+    архива могут лежать в отдельной базе (posts.routers), поэтому
+    автор и группа хранятся id без внешних ключей.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    text = CompressedTextField(verbose_name='Текст поста')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+    author_id = models.BigIntegerField(
+        db_index=True,
+        verbose_name='Автор'
+    )
+    image = models.ImageField(
+        upload_to='posts/',
+        null=True,
+        blank=True,
+        verbose_name='Изображение'
+    )
+    group_id = models.BigIntegerField(
+        null=True,
+        db_index=True,
+        verbose_name='Группа'
+    )
+    archived = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата переноса'
+    )
+
+    class Meta:
+        verbose_name = 'Пост в архиве'
+        verbose_name_plural = 'Посты в архиве'
+
+    def __str__(self):
+        return self.text[:50]
+
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    author_id = models.BigIntegerField(
+        db_index=True,
+        verbose_name='Автор комментария'
+    )
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Пост'
+    )
+    text = CompressedTextField(verbose_name='Текст комментария')
+    created = models.DateTimeField(verbose_name='Дата создания')
+
+    class Meta:
+        verbose_name = 'Комментарий в архиве'
+        verbose_name_plural = 'Комментарии в архиве'
+        ordering = ('-created',)
+
+    def __str__(self):
+        return f'Комментарий {self.author_id} к посту {self.post_id}'
@@ -0,0 +1,24 @@
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .counters import count_rows
+
+
+class CountedPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц: число строк берётся из count_rows,
+    а признак точности - в count_exact.
+    """
+    count_strategy = None
+
+    @cached_property
+    def row_count(self):
+        return count_rows(self.object_list, self.count_strategy)
+
+    @property
+    def count(self):
+        return self.row_count.value
+
+    @property
+    def count_exact(self):
+        return self.row_count.exact
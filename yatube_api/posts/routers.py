@@ -0,0 +1,36 @@
+from django.conf import settings
+
+ARCHIVE_MODELS = ('archivedpost', 'archivedcomment')
+
+
+def get_archive_database():
+    return getattr(settings, 'ARCHIVE', {}).get('DATABASE', 'default')
+
+
+class ArchiveRouter:
+    """
+    Таблицы архива (posts.archive) - в базе ARCHIVE['DATABASE'],
+    остальные - в default. Связей между базами нет: автор и группа
+    архивного поста - просто id.
+    """
+
+    def is_archive(self, model):
+        return (
+            model._meta.app_label == 'posts'
+            and model._meta.model_name in ARCHIVE_MODELS
+        )
+
+    def db_for_read(self, model, **hints):
+        if self.is_archive(model):
+            return get_archive_database()
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        archive = get_archive_database()
+        if app_label == 'posts' and model_name in ARCHIVE_MODELS:
+            return db == archive
+        if archive != 'default' and db == archive:
+            return False
+        return None
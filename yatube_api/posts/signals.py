@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .activity import change_activity
+from .caching import bump_versions
+from .counters import change_counters, get_child_counter_keys
+from .fragments import invalidate_fragments
+from .models import (ActivityBucket, ArchivedComment, ArchivedPost, Change,
+                     Comment, Counter, Group, Post, PostFragment)
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def increment_counters(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_counters(instance, 1)
+        change_activity(instance, 1)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def decrement_counters(sender, instance, **kwargs):
+    # Скрытый пост уже вычтен из счётчиков в posts.deletion.hide.
+    if not getattr(instance, 'is_deleted', False):
+        change_counters(instance, -1)
+        change_activity(instance, -1)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Post)
+def start_child_counters(sender, instance, created, raw, **kwargs):
+    # У нового объекта точно нет дочерних строк, поэтому
+    # счётчик можно завести сразу, не дожидаясь пересчёта.
+    if created and not raw:
+        Counter.objects.bulk_create(
+            [Counter(key=key) for key in get_child_counter_keys(instance)],
+            ignore_conflicts=True
+        )
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Post)
+def drop_child_counters(sender, instance, **kwargs):
+    Counter.objects.filter(key__in=get_child_counter_keys(instance)).delete()
+
+
+def record_changes(model, object_ids, action):
+    Change.objects.bulk_create(
+        Change(model=model._meta.model_name, object_id=pk, action=action)
+        for pk in object_ids
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Group)
+def record_save(sender, instance, created, raw, **kwargs):
+    if not raw:
+        action = Change.CREATE if created else Change.UPDATE
+        record_changes(sender, [instance.pk], action)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Group)
+def record_delete(sender, instance, **kwargs):
+    if not getattr(instance, 'is_deleted', False):
+        record_changes(sender, [instance.pk], Change.DELETE)
+
+
+@receiver(pre_delete, sender=Group)
+def record_group_unset(sender, instance, **kwargs):
+    # SET_NULL обновляет посты группы одним UPDATE без сигналов.
+    ids = list(
+        Post.all_objects.filter(group=instance).values_list('pk', flat=True)
+    )
+    record_changes(Post, ids, Change.UPDATE)
+    invalidate_fragments(ids)
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_activity(sender, instance, **kwargs):
+    # Посты удалённой группы остаются в общих рядах и рядах авторов.
+    ActivityBucket.objects.filter(scope=f'group={instance.pk}').delete()
+
+
+@receiver(post_delete, sender=User)
+def drop_archived(sender, instance, **kwargs):
+    # Внешних ключей на пользователя у архива нет (posts.routers).
+    ArchivedComment.objects.filter(author_id=instance.pk).delete()
+    ArchivedPost.objects.filter(author_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Group)
+def unset_archived_group(sender, instance, **kwargs):
+    ArchivedPost.objects.filter(group_id=instance.pk).update(group_id=None)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_groups(sender, **kwargs):
+    bump_versions(['groups'])
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_fragment(sender, instance, **kwargs):
+    invalidate_fragments([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_fragment(sender, instance, **kwargs):
+    invalidate_fragments([instance.post_id])
+
+
+@receiver(post_delete, sender=Post)
+def drop_fragment(sender, instance, **kwargs):
+    # Фрагмент, заново созданный сигналами удалённых каскадом
+    # комментариев.
+    PostFragment.objects.filter(post_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_fragments(sender, instance, created, update_fields,
+                                **kwargs):
+    # Имя автора есть в JSON его постов и постов с его комментариями.
+    # Вход обновляет только last_login.
+    if created or update_fields and 'username' not in update_fields:
+        return
+    invalidate_fragments(
+        Post.all_objects.filter(
+            Q(author=instance) | Q(comments__author=instance)
+        ).values_list('pk', flat=True).distinct().iterator()
+    )
@@ -0,0 +1,99 @@
+"""
+Популярные посты по недавним комментариям.
+
+Оценка поста - сумма по его комментариям 0.5 ** (возраст / период
+полураспада). Комментарий прибавляет 1 к строке PostScore, а команда
+decay_trending умножает все оценки на затухание с прошлого запуска
+и удаляет угасшие. Чтение топа - один проход по индексу оценки.
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Max, Min, Value
+from django.db.models.functions import Power
+from django.utils import timezone
+
+from .models import Comment, PostScore
+
+
+def get_half_life():
+    return getattr(settings, 'TRENDING_HALF_LIFE', 6 * 3600)
+
+
+def bump_score(post_id, now=None):
+    """Учитывает новый комментарий к посту."""
+    if PostScore.objects.filter(post_id=post_id).update(
+        score=F('score') + 1
+    ):
+        return
+    _, created = PostScore.objects.get_or_create(
+        post_id=post_id,
+        defaults={'score': 1, 'decayed_at': now or time.time()}
+    )
+    if not created:
+        PostScore.objects.filter(post_id=post_id).update(
+            score=F('score') + 1
+        )
+
+
+def decay_scores(now=None, half_life=None, min_score=None, batch_size=5000):
+    """
+    Затухание всех оценок с момента их прошлого затухания. Обновление
+    идёт диапазонами ключей, каждый своим UPDATE, поэтому блокировка
+    записи держится недолго и параллельные bump_score не теряются.
+    Возвращает число удалённых угасших оценок.
+    """
+    now = now or time.time()
+    half_life = half_life or get_half_life()
+    if min_score is None:
+        min_score = getattr(settings, 'TRENDING_MIN_SCORE', 0.01)
+    bounds = PostScore.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        PostScore.objects.filter(
+            pk__gte=start, pk__lt=start + batch_size
+        ).update(
+            score=F('score') * Power(
+                Value(0.5), (Value(now) - F('decayed_at')) / half_life
+            ),
+            decayed_at=now
+        )
+    deleted, _ = PostScore.objects.filter(score__lt=min_score).delete()
+    return deleted
+
+
+def rebuild_scores(now=None, half_life=None, window=10):
+    """
+    Пересчёт по комментариям за последние `window` периодов
+    полураспада: после загрузки данных в обход API.
+    """
+    now = now or time.time()
+    half_life = half_life or get_half_life()
+    since = timezone.now() - timedelta(seconds=half_life * window)
+    scores = defaultdict(float)
+    for post_id, created in Comment.objects.filter(
+        created__gte=since
+    ).order_by().values_list('post_id', 'created').iterator():
+        age = now - created.timestamp()
+        scores[post_id] += 0.5 ** (max(age, 0) / half_life)
+    PostScore.objects.all().delete()
+    PostScore.objects.bulk_create(
+        (
+            PostScore(post_id=post_id, score=score, decayed_at=now)
+            for post_id, score in scores.items()
+        ),
+        batch_size=5000
+    )
+    return len(scores)
+
+
+def top_scores(limit):
+    """Оценки самых активных видимых постов вместе с постами."""
+    return list(
+        PostScore.objects.select_related('post__author')
+        .filter(post__is_deleted=False)
+        .order_by('-score')[:limit]
+    )
@@ -0,0 +1,21 @@
+"""
+ASGI config for yatube_api project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Needed for the asynchronous comment stream (api.streams).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube_api.settings')
+
+application = get_asgi_application()
+
+from yatube_api.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
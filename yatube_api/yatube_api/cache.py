@@ -0,0 +1,419 @@
+"""
+Двухуровневый кэш для CACHES.
+
+L1 - словарь в памяти процесса: LRU на L1_MAX_ENTRIES записей, каждая
+живёт не дольше L1_TIMEOUT секунд. Неизменяемые значения (bytes, str,
+числа) лежат в нём как есть и читаются без десериализации, остальные
+хранятся в pickle.
+
+L2 - файл SQLite на локальном диске (LOCATION), общий для воркеров.
+Каждая запись в L2 получает номер поколения. Раз в SYNC_INTERVAL
+секунд процесс читает текущее поколение и выбрасывает из L1 ключи,
+изменённые после его прошлой сверки, поэтому запись в одном воркере
+видна остальным не позже чем через SYNC_INTERVAL. Удалённые ключи
+остаются в L2 надгробиями на TOMBSTONE_TTL секунд, чтобы сверка их
+заметила.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+MISSING = object()
+# Значения этих типов не изменить на месте, их можно отдавать из L1
+# без копирования.
+IMMUTABLE_TYPES = (bytes, str, int, float, bool, type(None))
+# Раз в столько записей процесс удаляет истёкшие строки из L2.
+PRUNE_EVERY = 1000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entry (
+    key TEXT PRIMARY KEY,
+    value BLOB,
+    expires REAL,
+    version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entry_version ON entry (version);
+CREATE TABLE IF NOT EXISTS generation (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    value INTEGER NOT NULL,
+    cleared INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO generation VALUES (1, 0, 0);
+'''
+NEXT_GENERATION = (
+    'UPDATE generation SET value = value + 1 RETURNING value'
+)
+UPSERT = '''
+INSERT INTO entry (key, value, expires, version) VALUES (?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value,
+    expires = excluded.expires,
+    version = excluded.version
+'''
+# Вставка только на место отсутствующей, удалённой или истёкшей записи.
+ADD = UPSERT + '''
+WHERE entry.value IS NULL OR entry.expires <= ?
+RETURNING key
+'''
+
+
+class LocalTier:
+    """
+    LRU в памяти процесса со сроком жизни записей и статистикой.
+    Чтение идёт без блокировки: отдельные операции OrderedDict
+    атомарны под GIL, а счётчики статистики приблизительны.
+    """
+    STATS = ('hits', 'misses', 'evictions', 'expirations', 'invalidations')
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        self.expirations = self.invalidations = 0
+
+    def get(self, key, now):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        if entry[0] <= now:
+            self.expire(key, entry)
+            return MISSING
+        try:
+            self.entries.move_to_end(key)
+        except KeyError:
+            # Запись только что вытеснил другой поток.
+            pass
+        self.hits += 1
+        if entry[2]:
+            return pickle.loads(entry[1])
+        return entry[1]
+
+    def expire(self, key, entry):
+        with self.lock:
+            if self.entries.get(key) is entry:
+                del self.entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+    def set(self, key, value, expires, version, now, pickled=None):
+        """expires - время по time.time() или None."""
+        deadline = now + self.timeout
+        if expires is not None:
+            deadline = min(deadline, now + expires - time.time())
+        if type(value) in IMMUTABLE_TYPES:
+            entry = (deadline, value, False, version)
+        else:
+            if pickled is None:
+                pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            entry = (deadline, pickled, True, version)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key, version=None):
+        """Выбрасывает запись, если она старше версии version."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (version is None or entry[3] < version):
+                del self.entries[key]
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+
+    def stats(self):
+        return {name: getattr(self, name) for name in self.STATS}
+
+
+class TwoTierCache(BaseCache):
+    """Бэкенд кэша: L1 в процессе перед общим L2 в SQLite."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.sync_interval = options.get('SYNC_INTERVAL', 0.25)
+        self.tombstone_ttl = options.get('TOMBSTONE_TTL', 120)
+        self.l1 = LocalTier(
+            options.get('L1_MAX_ENTRIES', 10000),
+            options.get('L1_TIMEOUT', 30)
+        )
+        self.local = threading.local()
+        self.sync_lock = threading.Lock()
+        self.seen = None
+        self.synced_at = 0.0
+        self.next_sync = 0.0
+        self.writes = 0
+        self.l2_stats = {'hits': 0, 'misses': 0}
+
+    @property
+    def connection(self):
+        # Соединение, открытое до fork, в воркере не используется.
+        owner = os.getpid()
+        if getattr(self.local, 'owner', None) != owner:
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.executescript(SCHEMA)
+            self.local.connection = connection
+            self.local.owner = owner
+        return self.local.connection
+
+    def stats(self):
+        """Счётчики L1 и L2 этого процесса."""
+        return {
+            **self.l1.stats(),
+            'l1_size': len(self.l1.entries),
+            'l2_hits': self.l2_stats['hits'],
+            'l2_misses': self.l2_stats['misses'],
+        }
+
+    def full_key(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    def sync(self, now):
+        """Сверка с L2: изменения других процессов выбрасываются из L1."""
+        if not self.sync_lock.acquire(blocking=False):
+            return
+        try:
+            generation, cleared = self.connection.execute(
+                'SELECT value, cleared FROM generation'
+            ).fetchone()
+            if self.seen is None or cleared > self.seen or (
+                now - self.synced_at > self.tombstone_ttl
+            ):
+                # Давно не сверялись: надгробия могли уже удалить.
+                self.l1.clear()
+            elif generation != self.seen:
+                for key, version in self.connection.execute(
+                    'SELECT key, version FROM entry WHERE version > ?',
+                    [self.seen]
+                ):
+                    self.l1.discard(key, version)
+            self.seen = generation
+            self.synced_at = now
+            self.next_sync = now + self.sync_interval
+        finally:
+            self.sync_lock.release()
+
+    def local_get(self, key):
+        now = time.monotonic()
+        if now >= self.next_sync:
+            self.sync(now)
+        return self.l1.get(key, now)
+
+    def write(self, operation):
+        """Изменение L2 в одной транзакции с новым поколением."""
+        # Первая сверка до первой записи: иначе она сочтёт свежие
+        # записи этого процесса устаревшими.
+        now = time.monotonic()
+        if now >= self.next_sync:
+            self.sync(now)
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            version = connection.execute(NEXT_GENERATION).fetchone()[0]
+            result = operation(connection, version)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self.writes += 1
+        if self.writes % PRUNE_EVERY == 0:
+            self.prune()
+        return version, result
+
+    def prune(self):
+        now = time.time()
+        self.connection.execute(
+            'DELETE FROM entry WHERE expires <= ?', [now]
+        )
+        count = self.connection.execute(
+            'SELECT COUNT(*) FROM entry'
+        ).fetchone()[0]
+        if count > self._max_entries:
+            # Вытесняются записи, которым раньше всех истекать.
+            self.connection.execute(
+                'DELETE FROM entry WHERE key IN (SELECT key FROM entry '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                [count // self._cull_frequency]
+            )
+
+    def get(self, key, default=None, version=None):
+        # Горячий путь: без validate_key и лишних вызовов.
+        key = self.key_func(
+            key, self.key_prefix, self.version if version is None else version
+        )
+        now = time.monotonic()
+        if now >= self.next_sync:
+            self.sync(now)
+        value = self.l1.get(key, now)
+        if value is not MISSING:
+            return value
+        self.validate_key(key)
+        return self.get_many_l2([key]).get(key, default)
+
+    def get_many_l2(self, keys):
+        now = time.time()
+        result = {}
+        for key, value, expires, version in self.connection.execute(
+            'SELECT key, value, expires, version FROM entry '
+            f'WHERE key IN ({", ".join("?" * len(keys))})',
+            keys
+        ):
+            if value is None or (expires is not None and expires <= now):
+                continue
+            result[key] = pickle.loads(value)
+            self.l1.set(
+                key, result[key], expires, version, time.monotonic(), value
+            )
+        self.l2_stats['hits'] += len(result)
+        self.l2_stats['misses'] += len(keys) - len(result)
+        return result
+
+    def get_many(self, keys, version=None):
+        result = {}
+        misses = {}
+        for key in keys:
+            full_key = self.make_key(key, version)
+            value = self.local_get(full_key)
+            if value is MISSING:
+                self.validate_key(full_key)
+                misses[full_key] = key
+            else:
+                result[key] = value
+        keys = list(misses)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            for full_key, value in self.get_many_l2(chunk).items():
+                result[misses[full_key]] = value
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (
+                self.full_key(key, version),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                value,
+            )
+            for key, value in data.items()
+        ]
+        generation, _ = self.write(lambda connection, generation: (
+            connection.executemany(UPSERT, [
+                (key, pickled, expires, generation)
+                for key, pickled, _ in rows
+            ])
+        ))
+        now = time.monotonic()
+        for key, pickled, value in rows:
+            self.l1.set(key, value, expires, generation, now, pickled)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.full_key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        generation, added = self.write(lambda connection, generation: (
+            connection.execute(
+                ADD, [key, pickled, expires, generation, time.time()]
+            ).fetchone() is not None
+        ))
+        if added:
+            self.l1.set(
+                key, value, expires, generation, time.monotonic(), pickled
+            )
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, MISSING, version)
+        if value is MISSING:
+            return False
+        self.set(key, value, timeout, version)
+        return True
+
+    def delete(self, key, version=None):
+        return bool(self.delete_many([key], version))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.full_key(key, version) for key in keys]
+        if not keys:
+            return 0
+        expires = time.time() + self.tombstone_ttl
+
+        def tombstone(connection, generation):
+            # Надгробие ставится и без строки: ключ, вытесненный из L2,
+            # ещё может лежать в L1 других воркеров.
+            deleted = connection.execute(
+                'SELECT COUNT(*) FROM entry WHERE value IS NOT NULL '
+                'AND (expires IS NULL OR expires > ?) '
+                f'AND key IN ({", ".join("?" * len(keys))})',
+                [time.time(), *keys]
+            ).fetchone()[0]
+            connection.executemany(UPSERT, [
+                (key, None, expires, generation) for key in keys
+            ])
+            return deleted
+
+        _, deleted = self.write(tombstone)
+        for key in keys:
+            self.l1.discard(key)
+        return deleted
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version) is not MISSING
+
+    def incr(self, key, delta=1, version=None):
+        full_key = self.full_key(key, version)
+
+        def increment(connection, generation):
+            row = connection.execute(
+                'SELECT value, expires FROM entry WHERE key = ? '
+                'AND value IS NOT NULL AND (expires IS NULL OR expires > ?)',
+                [full_key, time.time()]
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(UPSERT, [
+                full_key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                row[1], generation,
+            ])
+            return value, row[1]
+
+        generation, (value, expires) = self.write(increment)
+        self.l1.set(full_key, value, expires, generation, time.monotonic())
+        return value
+
+    def clear(self):
+        self.write(lambda connection, generation: (
+            connection.execute('DELETE FROM entry'),
+            connection.execute(
+                'UPDATE generation SET cleared = ?', [generation]
+            ),
+        ))
+        self.l1.clear()
+
+    def close(self, **kwargs):
+        # Соединение с L2 живёт всё время потока, как у throttling.
+        pass
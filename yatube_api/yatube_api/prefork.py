@@ -0,0 +1,299 @@
+"""
+Предварительно форкающий WSGI-сервер на стандартной библиотеке.
+
+Мастер один раз импортирует и прогревает приложение, открывает
+слушающий сокет и форкает воркеры, которые делят с ним память по
+copy-on-write. Каждый воркер обслуживает запросы по одному (HTTP/1.0,
+без keep-alive) и заменяется новым после max_requests запросов.
+Поэтому долгие потоки (SSE, api.streams) здесь не обслуживаются:
+каждый клиент навсегда занял бы воркер. refuse_event_streams
+отвечает на них 501, поток нужно отдавать через ASGI.
+
+Сигналы мастеру: TERM и INT - мягкая остановка, HUP - замена всех
+воркеров без разрыва соединений.
+"""
+import gc
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import time
+import traceback
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+# Как часто воркер проверяет флаг остановки и жив ли мастер.
+WORKER_TICK = 1.0
+# Воркер, упавший быстрее этого, считается упавшим при старте.
+MIN_WORKER_LIFETIME = 1.0
+
+
+def default_workers():
+    """Число доступных процессу ядер."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def create_socket(host, port, reuse_port=False, backlog=2048):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    # Соединение разбирает тот воркер, что успел первым,
+    # остальные получают BlockingIOError вместо зависания в accept.
+    sock.setblocking(False)
+    return sock
+
+
+def refuse_event_streams(application):
+    """WSGI-обёртка: запросы text/event-stream получают 501."""
+    def wrapper(environ, start_response):
+        if 'text/event-stream' in environ.get('HTTP_ACCEPT', ''):
+            body = 'Потоки событий доступны только под ASGI.\n'.encode()
+            start_response('501 Not Implemented', [
+                ('Content-Type', 'text/plain; charset=utf-8'),
+                ('Content-Length', str(len(body))),
+            ])
+            return [body]
+        return application(environ, start_response)
+    return wrapper
+
+
+class RequestHandler(WSGIRequestHandler):
+
+    def setup(self):
+        self.timeout = self.server.request_timeout
+        super().setup()
+
+    def log_message(self, format, *args):
+        if self.server.access_log:
+            super().log_message(format, *args)
+
+
+class WorkerServer(WSGIServer):
+    """WSGIServer поверх уже открытого слушающего сокета."""
+
+    def __init__(self, sock, application, request_timeout=30,
+                 access_log=False):
+        super().__init__(
+            sock.getsockname()[:2], RequestHandler, bind_and_activate=False
+        )
+        self.socket.close()
+        self.socket = sock
+        self.server_name, self.server_port = sock.getsockname()[:2]
+        self.request_timeout = request_timeout
+        self.access_log = access_log
+        self.setup_environ()
+        self.set_app(application)
+
+
+class Worker:
+    """Цикл приёма соединений в дочернем процессе."""
+
+    def __init__(self, server, max_requests=0):
+        self.server = server
+        self.max_requests = max_requests
+        self.handled = 0
+        self.alive = True
+        self.master_pid = os.getppid()
+
+    def stop(self, signum, frame):
+        self.alive = False
+
+    def exhausted(self):
+        return self.max_requests and self.handled >= self.max_requests
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        sock = self.server.socket
+        while self.alive and not self.exhausted():
+            ready, _, _ = select.select([sock], [], [], WORKER_TICK)
+            if os.getppid() != self.master_pid:
+                break
+            if not ready:
+                continue
+            try:
+                request, address = sock.accept()
+            except BlockingIOError:
+                continue
+            self.handled += 1
+            self.handle(request, address)
+
+    def handle(self, request, address):
+        try:
+            self.server.finish_request(request, address)
+        except Exception:
+            self.server.handle_error(request, address)
+        finally:
+            self.server.shutdown_request(request)
+
+
+class Arbiter:
+    """Мастер-процесс: держит нужное число воркеров и управляет ими."""
+
+    def __init__(self, application, host, port, workers=None,
+                 max_requests=0, max_requests_jitter=0, graceful_timeout=30,
+                 request_timeout=30, reuse_port=False, access_log=False,
+                 log=None):
+        self.application = application
+        self.host = host
+        self.port = port
+        self.num_workers = workers or default_workers()
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.request_timeout = request_timeout
+        self.reuse_port = reuse_port
+        self.access_log = access_log
+        self.log = log or (lambda message: print(message, file=sys.stderr))
+        self.workers = {}
+        self.socket = None
+        self.stopping = False
+        self.restarting = False
+        self.wakeup = None
+
+    def listen(self):
+        self.socket = create_socket(self.host, self.port, self.reuse_port)
+        self.port = self.socket.getsockname()[1]
+        if self.reuse_port:
+            # Каждый воркер откроет свой сокет на этом порту, и ядро
+            # само распределит соединения. Сокет мастера закрывается,
+            # иначе часть соединений попадала бы в очередь, которую
+            # никто не разбирает.
+            self.socket.close()
+            self.socket = None
+
+    def install_signals(self):
+        self.wakeup = os.pipe()
+        for fd in self.wakeup:
+            os.set_blocking(fd, False)
+        signal.set_wakeup_fd(self.wakeup[1])
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_restart)
+        # Обработчик нужен только для того, чтобы будить мастера.
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    def handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def handle_restart(self, signum, frame):
+        self.restarting = True
+
+    def run(self):
+        self.listen()
+        self.install_signals()
+        # Объекты, созданные до форка, сборщик мусора больше не обходит
+        # и не копирует тем самым страницы памяти в каждый воркер.
+        gc.collect()
+        gc.freeze()
+        self.log(
+            f'Слушаю {self.host}:{self.port}, воркеров: {self.num_workers}'
+        )
+        try:
+            while not self.stopping:
+                self.reap()
+                if self.restarting:
+                    self.restarting = False
+                    self.log('Заменяю воркеры')
+                    self.kill_workers(signal.SIGTERM)
+                self.spawn_workers()
+                self.sleep()
+        finally:
+            self.shutdown()
+
+    def sleep(self, timeout=1.0):
+        ready, _, _ = select.select([self.wakeup[0]], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.wakeup[0], 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if not pid:
+                return
+            started = self.workers.pop(pid, None)
+            lifetime = time.monotonic() - (started or 0)
+            code = os.waitstatus_to_exitcode(status)
+            if code:
+                self.log(f'Воркер {pid} завершился с кодом {code}')
+                if lifetime < MIN_WORKER_LIFETIME:
+                    # Не перезапускать падающий воркер в плотном цикле.
+                    time.sleep(MIN_WORKER_LIFETIME)
+
+    def spawn_workers(self):
+        while len(self.workers) < self.num_workers and not self.stopping:
+            self.spawn_worker()
+
+    def spawn_worker(self):
+        max_requests = self.max_requests
+        if max_requests:
+            # Разброс, чтобы воркеры не перезапускались одновременно.
+            max_requests += random.randint(0, self.max_requests_jitter)
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return
+        code = 0
+        try:
+            self.run_worker(max_requests)
+        except Exception:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def run_worker(self, max_requests):
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for fd in self.wakeup:
+            os.close(fd)
+        sock = self.socket or create_socket(
+            self.host, self.port, reuse_port=True
+        )
+        server = WorkerServer(
+            sock, self.application, self.request_timeout, self.access_log
+        )
+        Worker(server, max_requests).run()
+
+    def kill_workers(self, signum):
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self.workers.pop(pid, None)
+
+    def shutdown(self):
+        """Ждёт завершения текущих запросов не дольше graceful_timeout."""
+        self.log('Останавливаюсь')
+        self.kill_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.sleep(0.1)
+            self.reap()
+        if self.workers:
+            self.kill_workers(signal.SIGKILL)
+            while self.workers:
+                self.sleep(0.1)
+                self.reap()
+        if self.socket is not None:
+            self.socket.close()
+        signal.set_wakeup_fd(-1)
+        for fd in self.wakeup:
+            os.close(fd)
@@ -1,9 +1,25 @@
-"""Django settings for yatube project."""
+"""
+Django settings for yatube project.
 
+Профиль выбирается переменной окружения YATUBE_PROFILE:
+development (по умолчанию) или production. В production только
+токенная аутентификация и JSON, без админки, сессий и CSRF.
+"""
+
+import os
 from pathlib import Path
 
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher as DjangoPBKDF2PasswordHasher
+)
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+PROFILE = os.environ.get('YATUBE_PROFILE', 'development')
+if PROFILE not in ('development', 'production'):
+    raise ImproperlyConfigured(f'Неизвестный профиль YATUBE_PROFILE: {PROFILE}')
+
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'm%(5u7nv9j2%@3xb%#c3p-$9&0$kq$j6l@9+@ogairu48a+dy+'
@@ -31,13 +47,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.LoadSheddingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'yatube_api.slow_queries.QueryContextMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube_api.urls'
@@ -66,27 +86,188 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        # Токен с пользователем из кэша; с заголовком Token до стандартного
+        # класса дело не доходит
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',  # для браузерного API
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.fragments.FragmentJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',  # включаем браузерный API
-    ]
+    ],
+    # Список делится на страницы только при переданном ?limit=
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CountedLimitOffsetPagination',
+    # Token bucket: N запросов всплеском, пополнение N за период
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.WriteRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'auth': '10/min',
+        'write': '120/min',
+    },
+    # Сколько прокси перед приложением: IP клиента для троттлинга берётся
+    # из X-Forwarded-For только на это число шагов, без прокси - из
+    # REMOTE_ADDR, иначе клиент подменил бы заголовком свой адрес
+    'NUM_PROXIES': 0,
+}
+
+# Файл с вёдрами троттлинга, общий для всех воркеров
+THROTTLE_STORE_PATH = os.environ.get(
+    'YATUBE_THROTTLE_PATH', BASE_DIR / 'throttle.sqlite3'
+)
+
+# Журнал медленных запросов (yatube_api.slow_queries): запросы дольше
+# порога в секундах и запросы с полным проходом или временной
+# сортировкой по SLOW_QUERY_TABLES; None отключает журнал. В production
+# журнал включается только порогом YATUBE_SLOW_QUERY_THRESHOLD
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_TABLES = ['posts_post', 'posts_comment']
+SLOW_QUERY_LOG_PATH = os.environ.get(
+    'YATUBE_SLOW_QUERY_PATH', BASE_DIR / 'slow_queries.sqlite3'
+)
+
+# Двухуровневый кэш (yatube_api.cache): L1 в памяти воркера перед
+# общим файлом SQLite. Запись в одном воркере видна в L1 остальных
+# не позже чем через SYNC_INTERVAL секунд
+CACHES = {
+    'default': {
+        'BACKEND': 'yatube_api.cache.TwoTierCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_PATH', BASE_DIR / 'cache.sqlite3'
+        ),
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'L1_MAX_ENTRIES': 10000,
+            'L1_TIMEOUT': 30,
+            'SYNC_INTERVAL': 0.25,
+        },
+    },
+}
+
+# Выдача токена (api.login): проверка пароля в пуле из WORKERS потоков,
+# в очереди к нему не больше MAX_PENDING запросов, остальным 503
+LOGIN_HASHING = {
+    'WORKERS': 2,
+    'MAX_PENDING': 32,
+    'RETRY_AFTER': 1,
+}
+
+# Сжатие текстов постов и комментариев в базе (posts.fields): тексты
+# от MIN_SIZE байт сжимаются CODEC (zstd без пакета zstandard - zlib)
+COMPRESSED_TEXT = {
+    'MIN_SIZE': 2048,
+    'CODEC': 'zstd',
+    'LEVEL': {'zlib': 6, 'zstd': 3},
+}
+
+# Подсчёт строк для пагинации API и админки: exact, counter, estimate, auto
+COUNT_STRATEGY = 'auto'
+# До скольких строк отфильтрованная выборка считается точно
+COUNT_EXACT_LIMIT = 10000
+
+# Сжатие ответов (api.middleware.CompressionMiddleware)
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_LEVELS = {'gzip': 6, 'deflate': 6, 'zstd': 3}
+
+# Отказ в обслуживании при перегрузке (api.middleware.LoadSheddingMiddleware):
+# пороги запросов в работе на процесс и ожидания в очереди (секунды)
+# по приоритетам high/normal/low; приоритет без порога не отклоняется.
+# Если очередь не опускалась ниже TARGET_QUEUE_DELAY весь
+# OVERLOAD_INTERVAL, действуют пороги OVERLOAD_QUEUE_DELAY
+LOAD_SHEDDING = {
+    'MAX_IN_FLIGHT': {'low': 8, 'normal': 32},
+    'MAX_QUEUE_DELAY': {'low': 0.25, 'normal': 1.0, 'high': 5.0},
+    'OVERLOAD_QUEUE_DELAY': {'low': 0.01, 'normal': 0.1, 'high': 1.0},
+    'TARGET_QUEUE_DELAY': 0.05,
+    'OVERLOAD_INTERVAL': 0.5,
+    'RETRY_AFTER': 1,
+}
+
+# Фоновое удаление (posts.deletion): каскад больше DELETION_INLINE_LIMIT
+# строк обрабатывает process_deletions партиями, транзакция партии
+# держит блокировку записи не дольше DELETION_BUDGET секунд
+DELETION_INLINE_LIMIT = 100
+DELETION_BUDGET = 0.05
+
+# Обслуживание базы (posts.maintenance, manage.py dbmaintain): команда
+# работает не дольше BUDGET секунд, шаг incremental vacuum держит
+# блокировку записи около STEP_BUDGET секунд, между шагами пауза PAUSE;
+# индекс от BLOAT_MIN_PAGES страниц со свободной долей больше
+# BLOAT_RATIO считается раздутым
+DB_MAINTENANCE = {
+    'BUDGET': 60,
+    'STEP_BUDGET': 0.05,
+    'PAUSE': 0.05,
+    'ANALYSIS_LIMIT': 1000,
+    'BLOAT_RATIO': 0.5,
+    'BLOAT_MIN_PAGES': 64,
 }
 
+# Популярные посты (posts.trending): период полураспада оценки в секундах
+# и порог, ниже которого decay_trending удаляет оценку
+TRENDING_HALF_LIFE = 6 * 3600
+TRENDING_MIN_SCORE = 0.01
+
+# Один расчёт промаха на ключ (api.singleflight): блокировки между
+# воркерами и результаты лежат в кэше CACHE, ожидание не дольше
+# WAIT_TIMEOUT секунд
+SINGLE_FLIGHT = {
+    'CACHE': 'default',
+    'LOCK_TIMEOUT': 10,
+    'WAIT_TIMEOUT': 5,
+    'RESULT_TIMEOUT': 30,
+}
+# Пока один запрос отрисовывает изменённый пост, остальные получают
+# прежний JSON вместо ожидания
+FRAGMENT_STALE_WHILE_REVALIDATE = False
+
 # Database
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('YATUBE_DB_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Архив старых постов (posts.archive, manage.py archive_posts): посты
+# старше AGE_DAYS дней с комментариями переносятся партиями, транзакция
+# партии держит блокировку записи не дольше BUDGET секунд. С
+# YATUBE_ARCHIVE_DB_PATH архив лежит в отдельном файле, который реже
+# меняется и не входит в копию основной базы; его таблицы создаёт
+# migrate --database archive
+ARCHIVE = {
+    'DATABASE': 'default',
+    'AGE_DAYS': 365,
+    'BUDGET': 0.05,
+}
+if os.environ.get('YATUBE_ARCHIVE_DB_PATH'):
+    DATABASES['archive'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['YATUBE_ARCHIVE_DB_PATH'],
+    }
+    ARCHIVE['DATABASE'] = 'archive'
+DATABASE_ROUTERS = ['posts.routers.ArchiveRouter']
+
 
 # Password validation
 
+# pbkdf2_sha256 с числом итераций PASSWORD_ITERATIONS (api.hashers);
+# хеши с меньшим числом пересчитываются при входе. Значение ниже, чем
+# у Django, допустимо только в development: production его поднимает
+PASSWORD_HASHERS = [
+    'api.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_ITERATIONS = int(
+    os.environ.get('YATUBE_PASSWORD_ITERATIONS', 100000)
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -121,3 +302,70 @@ STATIC_URL = '/static/'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+
+# Прогрев резолвера URL и ленивых импортов DRF при старте воркера
+WARM_UP_ON_BOOT = False
+
+
+if PROFILE == 'production':
+    try:
+        SECRET_KEY = os.environ['YATUBE_SECRET_KEY']
+    except KeyError:
+        raise ImproperlyConfigured(
+            'В профиле production нужна переменная YATUBE_SECRET_KEY.'
+        )
+    DEBUG = False
+    ALLOWED_HOSTS = [
+        host.strip()
+        for host in os.environ.get('YATUBE_ALLOWED_HOSTS', '').split(',')
+        if host.strip()
+    ]
+    if not ALLOWED_HOSTS:
+        raise ImproperlyConfigured(
+            'В профиле production нужна переменная YATUBE_ALLOWED_HOSTS.'
+        )
+    # Админка и браузерный API не импортируются вовсе.
+    INSTALLED_APPS = [
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+        'posts.apps.PostsConfig',
+        'rest_framework',
+        'rest_framework.authtoken',
+        'api',
+    ]
+    MIDDLEWARE = [
+        'api.middleware.LoadSheddingMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'api.middleware.CompressionMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'api.profiling.ProfilingMiddleware',
+        'yatube_api.slow_queries.QueryContextMiddleware',
+    ]
+    TEMPLATES[0]['OPTIONS']['context_processors'] = [
+        'django.template.context_processors.request',
+    ]
+    REST_FRAMEWORK = {
+        **REST_FRAMEWORK,
+        'NUM_PROXIES': int(os.environ.get('YATUBE_NUM_PROXIES', 0)),
+        'DEFAULT_AUTHENTICATION_CLASSES': [
+            'api.authentication.CachedTokenAuthentication',
+            'rest_framework.authentication.TokenAuthentication',
+        ],
+        'DEFAULT_RENDERER_CLASSES': [
+            'api.fragments.FragmentJSONRenderer',
+        ],
+        'DEFAULT_PARSER_CLASSES': [
+            'rest_framework.parsers.JSONParser',
+            'rest_framework.parsers.MultiPartParser',
+        ],
+    }
+    WARM_UP_ON_BOOT = True
+    SLOW_QUERY_THRESHOLD = os.environ.get('YATUBE_SLOW_QUERY_THRESHOLD')
+    if SLOW_QUERY_THRESHOLD is not None:
+        SLOW_QUERY_THRESHOLD = float(SLOW_QUERY_THRESHOLD)
+    # Не меньше числа итераций Django по умолчанию
+    PASSWORD_ITERATIONS = max(
+        int(os.environ.get('YATUBE_PASSWORD_ITERATIONS', 0)),
+        DjangoPBKDF2PasswordHasher.iterations
+    )
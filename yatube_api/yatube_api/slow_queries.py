@@ -0,0 +1,311 @@
+"""
+Журнал медленных SQL-запросов.
+
+Обёртка execute_wrapper ставится на каждое соединение с базой.
+Запрос дольше SLOW_QUERY_THRESHOLD секунд записывается вместе
+с view, из которого он пришёл, кратким стеком вызовов и планом
+EXPLAIN QUERY PLAN. План каждого нового вида запроса (отпечатка)
+проверяется один раз на процесс: полный проход или временное
+B-дерево для сортировки по таблицам SLOW_QUERY_TABLES записываются,
+даже если на маленькой базе запрос быстрый. Отпечатки хранятся
+в LRU на MAX_FINGERPRINTS записей.
+
+EXPLAIN и запись в журнал идут в запросе пользователя, поэтому
+в production журнал выключен, пока не задан порог
+YATUBE_SLOW_QUERY_THRESHOLD.
+
+Записи лежат в отдельном файле SQLite (SLOW_QUERY_LOG_PATH), общем
+для воркеров; сводку по отпечаткам печатает manage.py slow_queries.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+# Сколько кадров приложения сохранять в стеке.
+STACK_DEPTH = 6
+# Сколько запросов и отпечатков процесс помнит; старые вытесняются.
+MAX_FINGERPRINTS = 2000
+EXPLAINED = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS slow_query (
+    id INTEGER PRIMARY KEY,
+    at REAL NOT NULL,
+    duration REAL NOT NULL,
+    fingerprint TEXT NOT NULL,
+    sql TEXT NOT NULL,
+    view TEXT,
+    stack TEXT NOT NULL,
+    plan TEXT NOT NULL,
+    flags TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS slow_query_fingerprint
+    ON slow_query (fingerprint, at)
+'''
+SUMMARY = '''
+SELECT fingerprint, COUNT(*), SUM(duration), MAX(duration),
+       MAX(flags), GROUP_CONCAT(DISTINCT view), MAX(id)
+FROM slow_query
+WHERE at >= :since AND (:flagged = 0 OR flags != '')
+GROUP BY fingerprint
+ORDER BY {order} DESC
+LIMIT :limit
+'''
+ORDERS = {
+    'total': 'SUM(duration)',
+    'count': 'COUNT(*)',
+    'max': 'MAX(duration)',
+}
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDERS = re.compile(r'\(\s*(?:\?\s*,\s*)+\?\s*\)')
+SPACES = re.compile(r'\s+')
+# Django даёт подзапросам и повторным JOIN псевдонимы вида U0, T3.
+TABLE_ALIAS = re.compile(
+    r'(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?"?([A-Z]\d+)"?\b)?'
+)
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+TEMP_BTREE = re.compile(r'USE TEMP B-TREE FOR (.+)$')
+
+local = threading.local()
+
+
+def fingerprint(sql):
+    """Запрос без значений: одинаковые по форме запросы совпадают."""
+    sql = sql.replace('%s', '?')
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = PLACEHOLDERS.sub('(...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def get_tables(sql):
+    """Таблицы запроса по именам и псевдонимам."""
+    tables = {}
+    for table, alias in TABLE_ALIAS.findall(sql):
+        tables[table] = table
+        if alias:
+            tables[alias] = table
+    return tables
+
+
+def get_flags(sql, plan, watched):
+    """Полные проходы и временные сортировки по отслеживаемым таблицам."""
+    tables = get_tables(sql)
+    if not watched.intersection(tables.values()):
+        return []
+    flags = []
+    for detail in plan:
+        scan = FULL_SCAN.match(detail)
+        if scan and tables.get(scan[1], scan[1]) in watched:
+            flags.append(f'full scan {tables.get(scan[1], scan[1])}')
+        sort = TEMP_BTREE.search(detail)
+        if sort:
+            flags.append(f'temp b-tree {sort[1]}')
+    return flags
+
+
+def explain(connection, sql, params):
+    """EXPLAIN QUERY PLAN отдельным курсором, мимо обёрток."""
+    if connection.vendor != 'sqlite':
+        return []
+    if not sql.lstrip().upper().startswith(EXPLAINED):
+        return []
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[3] for row in cursor.fetchall()]
+    except Exception:
+        return []
+    finally:
+        cursor.close()
+
+
+def get_stack():
+    """Последние кадры кода проекта, без этого модуля."""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base_dir)
+        and frame.filename != __file__
+    ]
+    return '\n'.join(
+        f'{os.path.relpath(frame.filename, base_dir)}:{frame.lineno} '
+        f'{frame.name}'
+        for frame in frames[-STACK_DEPTH:]
+    )
+
+
+class SlowQueryStore:
+    """Записи в файле SQLite, своё соединение на поток и процесс."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.local = threading.local()
+
+    def get_path(self):
+        if self.path is None:
+            return str(getattr(
+                settings, 'SLOW_QUERY_LOG_PATH',
+                settings.BASE_DIR / 'slow_queries.sqlite3'
+            ))
+        return self.path
+
+    @property
+    def connection(self):
+        owner = (os.getpid(), self.get_path())
+        if getattr(self.local, 'owner', None) != owner:
+            connection = sqlite3.connect(
+                owner[1], timeout=5, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.executescript(SCHEMA)
+            self.local.connection = connection
+            self.local.owner = owner
+        return self.local.connection
+
+    def add(self, duration, sql, view, stack, plan, flags):
+        self.connection.execute(
+            'INSERT INTO slow_query '
+            '(at, duration, fingerprint, sql, view, stack, plan, flags) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [
+                time.time(), duration, fingerprint(sql), sql, view, stack,
+                '\n'.join(plan), ', '.join(flags),
+            ]
+        )
+
+    def summary(self, since=0, limit=20, order='total', flagged=False):
+        """Отпечатки с числом записей, временем, флагами и view."""
+        rows = self.connection.execute(
+            SUMMARY.format(order=ORDERS[order]),
+            {'since': since, 'limit': limit, 'flagged': int(flagged)}
+        ).fetchall()
+        return [
+            {
+                'fingerprint': row[0],
+                'count': row[1],
+                'total': row[2],
+                'max': row[3],
+                'flags': row[4],
+                'views': row[5] or '',
+                'latest': self.get(row[6]),
+            }
+            for row in rows
+        ]
+
+    def get(self, pk):
+        sql, stack, plan = self.connection.execute(
+            'SELECT sql, stack, plan FROM slow_query WHERE id = ?', [pk]
+        ).fetchone()
+        return {'sql': sql, 'stack': stack, 'plan': plan}
+
+    def clear(self):
+        self.connection.execute('DELETE FROM slow_query')
+
+
+slow_query_store = SlowQueryStore()
+
+
+class SlowQueryLog:
+    """Обёртка выполнения запросов для connection.execute_wrappers."""
+
+    def __init__(self, store=slow_query_store):
+        self.store = store
+        # Запрос или отпечаток -> флаги плана; общий для потоков процесса.
+        self.checked = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD', None)
+        if threshold is None:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if not many:
+                self.check(
+                    context['connection'], sql, params, duration, threshold
+                )
+
+    def recall(self, name):
+        """Флаги плана или None, если запрос ещё не проверялся."""
+        with self.lock:
+            flags = self.checked.get(name)
+            if flags is not None:
+                self.checked.move_to_end(name)
+            return flags
+
+    def remember(self, name, flags):
+        with self.lock:
+            self.checked[name] = flags
+            self.checked.move_to_end(name)
+            while len(self.checked) > MAX_FINGERPRINTS:
+                self.checked.popitem(last=False)
+
+    def check(self, connection, sql, params, duration, threshold):
+        new = self.recall(sql) is None
+        if new:
+            key = fingerprint(sql)
+            known = self.recall(key)
+            new = known is None
+            if not new:
+                self.remember(sql, known)
+        if not new and duration < threshold:
+            return
+        plan = explain(connection, sql, params)
+        flags = get_flags(
+            sql, plan, set(getattr(settings, 'SLOW_QUERY_TABLES', ()))
+        )
+        if new:
+            self.remember(sql, flags)
+            self.remember(key, flags)
+        if duration < threshold and not (flags and new):
+            return
+        try:
+            self.store.add(
+                duration, sql, getattr(local, 'view', None), get_stack(),
+                plan, flags
+            )
+        except sqlite3.Error:
+            # Журнал не должен ломать запрос пользователя.
+            pass
+
+
+slow_query_log = SlowQueryLog()
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if slow_query_log not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_log)
+
+
+def get_view_name(request, view_func):
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    action = getattr(view_func, 'actions', {}).get(request.method.lower())
+    name = f'{cls.__module__}.{cls.__name__}'
+    return f'{name}.{action}' if action else name
+
+
+class QueryContextMiddleware(MiddlewareMixin):
+    """Запоминает view запроса для записей журнала."""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        local.view = f'{request.method} {get_view_name(request, view_func)}'
+
+    def process_response(self, request, response):
+        local.view = None
+        return response
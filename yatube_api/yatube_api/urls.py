@@ -1,15 +1,19 @@
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import RedirectView
 
 urlpatterns = [
     path('', RedirectView.as_view(url='/api/', permanent=False)),
-    path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
 ]
 
+# В профиле production админка не установлена и не импортируется.
+if 'django.contrib.admin' in settings.INSTALLED_APPS:
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))
+
 if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
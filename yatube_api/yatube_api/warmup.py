@@ -0,0 +1,51 @@
+"""Прогрев процесса до первого запроса."""
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver, resolve, reverse
+from rest_framework.settings import api_settings
+
+WARM_URLS = (
+    '/api/',
+    '/api/v1/posts/',
+    '/api/v1/posts/1/',
+    '/api/v1/posts/1/comments/',
+    '/api/v1/posts/1/comments/1/',
+    '/api/v1/groups/',
+)
+DRF_SETTINGS = (
+    'DEFAULT_RENDERER_CLASSES',
+    'DEFAULT_PARSER_CLASSES',
+    'DEFAULT_AUTHENTICATION_CLASSES',
+    'DEFAULT_PERMISSION_CLASSES',
+    'DEFAULT_PAGINATION_CLASS',
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+)
+
+
+def warm_up():
+    """
+    Строит словари резолвера, импортирует классы DRF, заданные строками,
+    и собирает поля сериализаторов, чтобы первый запрос каждого воркера
+    не платил за это. Соединения с базой закрываются: после fork
+    они не должны разделяться между процессами.
+    """
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for url in WARM_URLS:
+        resolve(url)
+    reverse('api-root')
+    for name in DRF_SETTINGS:
+        getattr(api_settings, name)
+
+    from api.serializers import (CommentSerializer, GroupSerializer,
+                                 PostSerializer)
+    for serializer_class in (PostSerializer, CommentSerializer,
+                             GroupSerializer):
+        serializer_class().fields
+
+    connections.close_all()
+
+
+def warm_up_if_enabled():
+    if settings.WARM_UP_ON_BOOT:
+        warm_up()
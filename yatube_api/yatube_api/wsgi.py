@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube_api.settings')
 
 application = get_wsgi_application()
+
+from yatube_api.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()